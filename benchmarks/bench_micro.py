@@ -0,0 +1,203 @@
+"""
+Microbenchmarks of the geometry and interpolation hot paths, each over a range of input sizes.
+
+### Example:
+```
+python benchmarks/bench_micro.py --window-type none --output micro.json
+python benchmarks/bench_micro.py --only draw_path_solid draw_path_dashed --max-size 10000
+```
+"""
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+
+from common import (WINDOW_TYPES, configure, make_app, time_per_call, scratch_scene, stdout_to_stderr, metadata,
+                    write_results)
+
+GEOJSON = "models/custom.geo.json"
+
+
+def circle_points(n: int) -> list:
+    """`n` points on a circle (with a wobble, so that the path isn't planar)."""
+    from panda3d.core import Point3
+    theta = np.linspace(0.0, 2.0 * np.pi, n)
+    return [Point3(*p) for p in np.column_stack((5.0 * np.cos(theta), 5.0 * np.sin(theta),
+                                                 0.5 * np.sin(7.0 * theta))).tolist()]
+
+
+def geojson_num_points(filename: str = GEOJSON) -> int:
+    """Number of coordinates of the geojson file (the size of the input of the country boundaries)."""
+    with open(filename) as f:
+        data = json.load(f)
+    count = 0
+    for feature in data["features"]:
+        geometry = feature["geometry"]
+        polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+        count += sum(len(ring) for polygon in polygons for ring in polygon)
+    return count
+
+
+def bench_draw_path(app, linestyle: int):
+    from vibeplot.utilities import draw_path
+
+    def setup(n):
+        pts = circle_points(n)
+
+        def run():
+            draw_path(app.render, pts, linestyle=linestyle).removeNode()
+        return run
+    return setup
+
+
+def bench_create_sphere(app):
+    from vibeplot.utilities import create_sphere
+
+    def setup(num_lat):
+        return lambda: create_sphere(radius=1.0, num_lat=num_lat, num_lon=2 * num_lat)
+    return setup
+
+
+def bench_create_arrows(app):
+    from vibeplot.utilities import create_arrow_with_endpoints
+
+    def setup(n):
+        rng = np.random.default_rng(0)
+        starts = rng.uniform(-5, 5, (n, 3)).tolist()
+        ends = rng.uniform(-5, 5, (n, 3)).tolist()
+
+        def run():
+            for start, end in zip(starts, ends):
+                create_arrow_with_endpoints(start, end)
+        return run
+    return setup
+
+
+def make_path(app, spline_mode: str, n: int):
+    """A `Path` of `n` samples (or an analytic one if `spline_mode` is None), with no drawn orbit."""
+    from vibeplot.path import Path
+    if spline_mode is None:
+        return Path(app, radius=5.0, inclination_deg=30.0, show_orbit_path=False)
+    t = np.linspace(0.0, 100.0, n)
+    trajectory = {"t": t.tolist(), "x": (5.0 * np.cos(t)).tolist(), "y": (5.0 * np.sin(t)).tolist(),
+                  "z": (0.5 * np.sin(3.0 * t)).tolist()}
+    return Path(app, orbit_json=trajectory, spline_mode=spline_mode, show_orbit_path=False)
+
+
+def bench_get_orbit_state(app, spline_mode: str, num_queries: int):
+    """`num_queries` calls of `Path.get_orbit_state` on a path of `n` samples."""
+    def setup(n):
+        path = make_path(app, spline_mode, n)
+        ets = np.random.default_rng(0).uniform(0.0, 100.0, num_queries).tolist()
+
+        def run():
+            for et in ets:
+                path.get_orbit_state(et)
+        return run
+    return setup
+
+
+def bench_get_orbit_states(app, spline_mode: str, num_queries: int):
+    """One call of the vectorized `Path.get_orbit_states` for the same queries as `bench_get_orbit_state`."""
+    def setup(n):
+        path = make_path(app, spline_mode, n)
+        ets = np.random.default_rng(0).uniform(0.0, 100.0, num_queries)
+        return lambda: path.get_orbit_states(ets)
+    return setup
+
+
+def bench_lonlat_to_xyz(app):
+    from vibeplot.utilities import lonlat_to_xyz
+
+    def setup(n):
+        rng = np.random.default_rng(0)
+        lons = rng.uniform(-180, 180, n).tolist()
+        lats = rng.uniform(-90, 90, n).tolist()
+
+        def run():
+            for lon, lat in zip(lons, lats):
+                lonlat_to_xyz(lon, lat, 1.01)
+        return run
+    return setup
+
+
+def bench_draw_tube_mesh(app):
+    from vibeplot.manifold import Manifold
+
+    def setup(size):
+        num_times, num_points = size
+        theta = np.linspace(0.0, 2.0 * np.pi, num_points, endpoint=False)
+        z = np.linspace(-1.0, 1.0, num_times)
+        r = 1.0 + 0.3 * np.sin(3.0 * z)[:, np.newaxis]
+        x = r * np.cos(theta)
+        mesh = np.stack((x, r * np.sin(theta), np.broadcast_to(z[:, np.newaxis], x.shape)), axis=-1)
+        manifold = Manifold(app, mesh=mesh)
+        return manifold.draw_tube_mesh  # it replaces the previous mesh
+    return setup
+
+
+def benchmarks(app, num_queries: int) -> dict:
+    """
+    The microbenchmarks: name -> (setup, sizes, description of the size).
+
+    `setup(size)` prepares the input and returns the function to time.
+    """
+    queries = f"{num_queries} queries on a path of `size` samples"
+    return {
+        "draw_path_solid": (bench_draw_path(app, 0), [100, 1000, 10000, 100000], "points"),
+        "draw_path_dashed": (bench_draw_path(app, 1), [100, 1000, 10000, 100000], "points"),
+        "create_sphere": (bench_create_sphere(app), [8, 16, 32, 64, 128], "latitude divisions (2x longitude)"),
+        "create_arrow_with_endpoints": (bench_create_arrows(app), [1, 10, 100, 1000], "arrows"),
+        "get_orbit_state_linear": (bench_get_orbit_state(app, "linear", num_queries), [100, 1000, 10000, 100000], queries),
+        "get_orbit_state_cubic": (bench_get_orbit_state(app, "cubic", num_queries), [100, 1000, 10000, 100000], queries),
+        "get_orbit_state_analytic": (bench_get_orbit_state(app, None, num_queries), [1], f"{num_queries} queries"),
+        "get_orbit_states_linear": (bench_get_orbit_states(app, "linear", num_queries), [100, 1000, 10000, 100000], queries),
+        "get_orbit_states_cubic": (bench_get_orbit_states(app, "cubic", num_queries), [100, 1000, 10000, 100000], queries),
+        "get_orbit_states_analytic": (bench_get_orbit_states(app, None, num_queries), [1], f"{num_queries} queries"),
+        "lonlat_to_xyz": (bench_lonlat_to_xyz(app), [1000, 10000, geojson_num_points(), 1000000], "points"),
+        "draw_tube_mesh": (bench_draw_tube_mesh(app), [(10, 16), (50, 32), (100, 64), (200, 128)],
+                           "(time steps, points per ring)"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--window-type", choices=WINDOW_TYPES, default="none")
+    parser.add_argument("--only", nargs="+", help="names of the benchmarks to run (default: all)")
+    parser.add_argument("--max-size", type=int, help="skip the sizes larger than this (number of elements)")
+    parser.add_argument("--queries", type=int, default=1000, help="number of queries of the get_orbit_state(s) benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed loops")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum duration of a timed loop, in seconds")
+    parser.add_argument("--output", default="-", help="JSON file of the results (- for stdout)")
+    args = parser.parse_args()
+    output = args.output if args.output == "-" else os.path.abspath(args.output)
+
+    configure(args.window_type)
+    results = {"benchmark": "micro", "metadata": metadata(args.window_type, vars(args)), "results": {}}
+    with stdout_to_stderr():  # the progress and the messages of vibeplot, not the results
+        app = make_app()
+        all_benchmarks = benchmarks(app, args.queries)
+        for name in args.only or []:
+            if name not in all_benchmarks:
+                raise ValueError(f"unknown benchmark: {name} (must be one of {list(all_benchmarks)})")
+
+        for name, (setup, sizes, size_unit) in all_benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            entries = []
+            for size in sizes:
+                if args.max_size is not None and np.prod(size) > args.max_size:
+                    continue
+                with scratch_scene(app):
+                    timing = time_per_call(setup(size), repeat=args.repeat, min_time=args.min_time)
+                entries.append({"size": size, **timing})
+                print(f"{name:<28} {str(size):>12}  {timing['best_s'] * 1e3:10.3f} ms", file=sys.stderr)
+            results["results"][name] = {"size_unit": size_unit, "sizes": entries}
+    write_results(output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Benchmark of the scene: construction time and memory of each subsystem, and
+per-frame cost of the tasks as the number of objects grows.
+
+### Example:
+```
+python benchmarks/bench_scene.py --window-type none --sizes 1 10 100 --output scene.json
+```
+"""
+
+import os
+import sys
+import time
+import argparse
+
+from common import (WINDOW_TYPES, configure, make_app, memory_mb, time_call, scratch_scene, stdout_to_stderr,
+                    metadata, write_results)
+
+GEOJSON = "models/custom.geo.json"
+MANIFOLD = "models/manifold_dv.json"
+ORBIT_JSON = "models/test_orbit.json"
+HALO_JSON = "models/traj_20251229220000_L2_S_NREVS=20.json"
+
+
+def build_earth(app):
+    """A plain Earth (no textures, grid or boundaries), to be the central body of the orbits."""
+    from vibeplot.bodies import Body
+    return Body(app, name="Earth", radius=1.0, draw_3d_axes=False, show_label=False, lod=False)
+
+
+def construction_benchmarks(app, star_database: str, repeat: int) -> dict:
+    """
+    Time and memory of the construction of each subsystem (in an otherwise empty scene).
+
+    Returns:
+        dict: For each subsystem, its times (see `time_call`) and the memory it added, in MB.
+    """
+    from vibeplot.stars import Stars
+    from vibeplot.manifold import Manifold
+    from vibeplot.orbit import Orbit
+    from vibeplot.path import Path
+
+    def stars():
+        Stars(app, star_database=star_database)
+
+    def geojson_borders():
+        earth = build_earth(app)
+        earth.draw_country_boundaries(geojson_path=GEOJSON)
+
+    def manifold():
+        Manifold(app, mesh=MANIFOLD)
+
+    def orbit_analytic():
+        Orbit(app, name="analytic", central_body=build_earth(app), radius=5.0, inclination_deg=30.0)
+
+    def orbit_json():
+        Orbit(app, name="json", central_body=build_earth(app), orbit_json=ORBIT_JSON,
+              spline_mode="cubic", time_step=0.1)
+
+    def path_halo():
+        Path(app, orbit_json=HALO_JSON, spline_mode=None, num_segments=None)
+
+    subsystems = {"stars": stars,
+                  "geojson_borders": geojson_borders,
+                  "manifold": manifold,
+                  "orbit_analytic": orbit_analytic,
+                  "orbit_json_cubic": orbit_json,
+                  "path_halo": path_halo}
+    results = {}
+    for name, build in subsystems.items():
+        times = []
+        memory = []
+        for _ in range(repeat):
+            with scratch_scene(app):
+                before = memory_mb()
+                times.append(time_call(build)["first_s"])
+                memory.append(memory_mb() - before)
+        results[name] = {"first_s": times[0], "min_s": min(times), "mean_s": sum(times) / len(times),
+                         "repeat": repeat, "memory_mb": memory[0]}
+        print(f"{name:<20} {min(times) * 1e3:9.1f} ms  {memory[0]:7.1f} MB", file=sys.stderr)
+    return results
+
+
+def add_orbits(app, n: int):
+    from vibeplot.orbit import Orbit
+    earth = build_earth(app)
+    for i in range(n):
+        Orbit(app, name=f"orbit{i}", central_body=earth, radius=1.5 + 4.0 * i / max(n, 1),
+              inclination_deg=180.0 * i / max(n, 1), speed=1.0 + i % 3)
+
+
+def add_particles(app, n: int):
+    from vibeplot.sites import Site
+    # the particles are connected to the site on the Earth, as in the demo
+    app.site = Site(parent=app, name="site", central_body=build_earth(app), lat_deg=28.57, lon_deg=-80.65,
+                    radius_offset=0.001, radius=0.01)
+    app.site_lines_np = None
+    app.add_particles(num_particles=n)
+
+
+def add_traced_bodies(app, n: int):
+    from vibeplot.bodies import Body
+    from vibeplot.utilities import simple_propagator
+
+    def propagator(radius, inclination_deg, speed):
+        return lambda et: simple_propagator(radius, inclination_deg, et, speed)
+
+    for i in range(n):
+        Body(app, name=f"body{i}", radius=0.1, trajectory_mode=0, trace_length=200,
+             get_position_vector=propagator(2.0 + 4.0 * i / max(n, 1), 180.0 * i / max(n, 1), 0.5),
+             draw_3d_axes=False, show_label=False, lod=False)
+
+
+SCENARIOS = {"orbits": add_orbits,
+             "particles": add_particles,
+             "traced_bodies": add_traced_bodies}
+
+
+def frame_benchmarks(app, sizes: list, frames: int, warmup: int, render: bool) -> dict:
+    """
+    Per-frame cost of the tasks of N objects of each kind (orbits, particles, traced bodies).
+
+    Returns:
+        dict: For each kind and N, the construction time, the memory added, the mean time of
+            each task and of all of them per frame, and (if `render`) of a whole rendered frame.
+    """
+    results = {}
+    for kind, build in SCENARIOS.items():
+        results[kind] = []
+        for n in sizes:
+            with scratch_scene(app):
+                before = memory_mb()
+                build_s = time_call(lambda: build(app, n))["first_s"]
+                memory = memory_mb() - before
+                for _ in range(warmup):
+                    app.run_tasks()
+                timings = {}
+                start = time.perf_counter()
+                for _ in range(frames):
+                    app.run_tasks(timings)
+                task_ms = (time.perf_counter() - start) / frames * 1e3
+                result = {"n": n, "build_s": build_s, "memory_mb": memory, "task_ms": task_ms,
+                          "tasks_ms": {name: t / frames * 1e3 for name, t in sorted(timings.items())}}
+                if render:
+                    app.render_frame()
+                    start = time.perf_counter()
+                    for _ in range(frames):
+                        app.render_frame()
+                    result["frame_ms"] = (time.perf_counter() - start) / frames * 1e3
+            results[kind].append(result)
+            frame = f"  frame {result['frame_ms']:8.2f} ms" if render else ""
+            print(f"{kind:<14} n={n:<6} tasks {task_ms:8.2f} ms{frame}  {memory:7.1f} MB", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--window-type", choices=WINDOW_TYPES, default="offscreen",
+                        help="offscreen renders the frames, none only runs the tasks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100],
+                        help="numbers of objects of the per-frame benchmarks")
+    parser.add_argument("--frames", type=int, default=60, help="number of timed frames")
+    parser.add_argument("--warmup", type=int, default=5, help="number of frames run before timing")
+    parser.add_argument("--repeat", type=int, default=3, help="number of constructions of each subsystem")
+    parser.add_argument("--star-database", default="models/Stars_HYGv3.txt")
+    parser.add_argument("--skip-construction", action="store_true")
+    parser.add_argument("--skip-frames", action="store_true")
+    parser.add_argument("--output", default="-", help="JSON file of the results (- for stdout)")
+    args = parser.parse_args()
+    output = args.output if args.output == "-" else os.path.abspath(args.output)
+
+    configure(args.window_type)
+    results = {"benchmark": "scene", "metadata": metadata(args.window_type, vars(args))}
+    with stdout_to_stderr():  # the progress and the messages of the app, not the results
+        memory_start = memory_mb()
+        start = time.perf_counter()
+        app = make_app()
+        results["app"] = {"init_s": time.perf_counter() - start, "memory_mb": memory_mb() - memory_start}
+
+        if not args.skip_construction:
+            results["construction"] = construction_benchmarks(app, args.star_database, args.repeat)
+        if not args.skip_frames:
+            results["frames"] = frame_benchmarks(app, args.sizes, args.frames, args.warmup,
+                                                 render=app.win is not None)
+        results["memory"] = {"start_mb": memory_start, "end_mb": memory_mb()}
+    write_results(output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Shared tools of the benchmarks: a headless host app, timers, memory use and JSON results.
+
+The benchmarks can be run from any directory: `configure` adds the root of the
+repository to the model path of Panda3D (for the shaders and models loaded by
+Panda3D) and makes it the working directory (for the data files read by Python), e.g.:
+
+    python benchmarks/bench_scene.py --window-type none --output scene.json
+"""
+
+import os
+import sys
+import json
+import time
+import timeit
+import platform
+import datetime
+import subprocess
+from contextlib import contextmanager, redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+WINDOW_TYPES = ("offscreen", "none")
+
+
+def configure(window_type: str = "offscreen"):
+    """
+    Configure Panda3D for a headless run. Call it before creating the app.
+
+    Args:
+        window_type (str, optional): "offscreen" (an offscreen buffer: the frames are rendered)
+            or "none" (no window: only the tasks run). Defaults to "offscreen".
+    """
+    if window_type not in WINDOW_TYPES:
+        raise ValueError(f"invalid window type: {window_type} (must be one of {WINDOW_TYPES})")
+    from panda3d.core import loadPrcFileData, Filename
+    loadPrcFileData("", f"window-type {window_type}")
+    # the `models/...` paths are resolved on the model path, not in the working directory
+    loadPrcFileData("", f"model-path {Filename.fromOsSpecific(ROOT).getFullpath()}")
+    loadPrcFileData("", "audio-library-name null")
+    loadPrcFileData("", "notify-level-device fatal")  # no input devices when headless
+    loadPrcFileData("", "sync-video false")
+    os.chdir(ROOT)
+
+
+def check_shaders():
+    """
+    Load the shaders of the app, and raise if one can't be found: vibeplot then falls
+    back to drawing without it (e.g. solid instead of dashed lines), which would
+    silently time something else.
+    """
+    from panda3d.core import Shader
+    from vibeplot.utilities import LINE_STYLE_SHADER, THICK_LINE_SHADER
+    from vibeplot.instancing import GLYPH_SHADER
+    for files in (LINE_STYLE_SHADER, THICK_LINE_SHADER, GLYPH_SHADER):
+        if Shader.load(Shader.SL_GLSL, *files) is None:
+            raise FileNotFoundError(f"could not load the shader {files} (model path: {ROOT})")
+
+
+def make_app():
+    """
+    Create the host app of the benchmarks (see `BenchApp`). Only one can be created per process.
+
+    Raises:
+        FileNotFoundError: If a shader of the app can't be loaded (see `check_shaders`).
+    """
+    from direct.showbase.ShowBase import ShowBase
+    from panda3d.core import AmbientLight, DirectionalLight, Camera, PerspectiveLens
+    from vibeplot.main import EarthOrbitApp
+    from vibeplot.timesystem import TimeSystem, FRAME_TIME
+    from vibeplot.statecache import StateCache
+    from vibeplot.labels import get_label_manager
+
+    class BenchApp(ShowBase):
+        """
+        A minimal `EarthOrbitApp`: the same task list, timeline and particles, but an empty scene,
+        so that each subsystem can be built and run on its own. It also works without a window.
+        """
+
+        add_task = EarthOrbitApp.add_task
+        remove_task = EarthOrbitApp.remove_task
+        main_task = EarthOrbitApp.main_task
+        get_et = EarthOrbitApp.get_et
+        sim_time = EarthOrbitApp.sim_time
+        add_particles = EarthOrbitApp.add_particles
+        particle_positions = EarthOrbitApp.particle_positions
+        particles_orbit_task = EarthOrbitApp.particles_orbit_task
+        line_intersects_sphere = EarthOrbitApp.line_intersects_sphere
+
+        def __init__(self):
+            super().__init__()
+            if self.camera is None:
+                # window-type none: a camera for the tasks that follow it
+                self.camLens = PerspectiveLens()
+                self.camera = self.render.attachNewNode("camera")
+                self.cam = self.camera.attachNewNode(Camera("cam", self.camLens))
+            self.camera.setPos(0, -30, 0)
+            self.task_list = []
+            self.paused = False
+            self._step_pending = False
+            self.use_slider_time = False
+            self.time_system = TimeSystem()
+            self.state_cache = StateCache(self)
+            self.bodies = []
+            self.orbits = []
+            self.dlnp = self.render.attachNewNode(DirectionalLight("sunlight"))
+            self.arrow_ambient = AmbientLight("arrow_ambient")
+            self.label_manager = get_label_manager(self)
+            self.taskMgr.add(self.main_task, "MainTask")
+
+        def run_tasks(self, timings: dict = None):
+            """
+            Advance the time by a frame and run the tasks once (without rendering).
+
+            Args:
+                timings (dict, optional): Time of each task (by name) is added to it, in seconds.
+            """
+            et = self.time_system.advance(FRAME_TIME)
+            for func, name, _ in list(self.task_list):
+                start = time.perf_counter()
+                func(et)
+                if timings is not None:
+                    timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+        def render_frame(self):
+            """Advance the time by a frame and run a whole frame (the tasks and the rendering)."""
+            self.time_system.advance(FRAME_TIME)
+            self.taskMgr.step()
+
+    app = BenchApp()
+    check_shaders()
+    return app
+
+
+def memory_mb() -> float:
+    """Resident memory of the process, in MB."""
+    import psutil
+    return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+
+def time_call(func, repeat: int = 1) -> dict:
+    """
+    Time a function.
+
+    Args:
+        func (Callable): The function (no arguments).
+        repeat (int, optional): Number of calls. Defaults to 1.
+    Returns:
+        dict: The time of the first call and the min/mean of all of them, in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"first_s": times[0], "min_s": min(times), "mean_s": sum(times) / len(times), "repeat": repeat}
+
+
+def time_per_call(func, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """
+    Time a fast function: it's called in loops of at least `min_time` seconds (see `timeit.Timer.autorange`).
+
+    Args:
+        func (Callable): The function (no arguments).
+        repeat (int, optional): Number of loops. Defaults to 5.
+        min_time (float, optional): Minimum duration of a loop, in seconds. Defaults to 0.2.
+    Returns:
+        dict: The best and median time per call, in seconds, and the number of calls per loop.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+    times = sorted(t / number for t in [elapsed] + timer.repeat(repeat - 1, number))
+    return {"best_s": times[0], "median_s": times[len(times) // 2], "number": number, "repeat": repeat}
+
+
+@contextmanager
+def scratch_scene(app):
+    """
+    Remove what is added to the app in the block: the nodes under `render` and the camera,
+    the tasks, the bodies and orbits, and the labels.
+    """
+    parents = (app.render, app.camera)
+    nodes = {parent: set(parent.getChildren()) for parent in parents}
+    tasks = {name for _, name, _ in app.task_list}
+    num_bodies = len(app.bodies)
+    num_orbits = len(app.orbits)
+    labels = list(app.label_manager.labels)
+    occluders = list(app.label_manager.occluders)
+    try:
+        yield app
+    finally:
+        for _, name, _ in list(app.task_list):
+            if name not in tasks:
+                app.remove_task(name)
+        for label in list(app.label_manager.labels):
+            if label not in labels:
+                app.label_manager.remove(label)
+        app.label_manager.occluders = occluders
+        del app.bodies[num_bodies:]
+        del app.orbits[num_orbits:]
+        for parent in parents:
+            for child in parent.getChildren():
+                if child not in nodes[parent]:
+                    child.removeNode()
+
+
+def stdout_to_stderr():
+    """
+    Send what is printed to stdout to stderr in the block (e.g. the messages of vibeplot),
+    so that stdout is only the JSON results (see `write_results`).
+    """
+    return redirect_stdout(sys.stderr)
+
+
+def metadata(window_type: str, args: dict = None) -> dict:
+    """Description of the run (versions, commit, machine), to compare results across commits."""
+    import numpy as np
+    from panda3d.core import PandaSystem
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "window_type": window_type,
+            "python": platform.python_version(),
+            "panda3d": PandaSystem.getVersionString(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "args": args or {}}
+
+
+def write_results(filename: str, results: dict):
+    """Write the results as JSON (to stdout if `filename` is None or "-": the only output on stdout)."""
+    text = json.dumps(results, indent=2)
+    if filename in (None, "-"):
+        print(text)
+    else:
+        with open(filename, "w") as f:
+            f.write(text + "\n")
+        print(f"Results written to {filename}", file=sys.stderr)
@@ -0,0 +1,5 @@
+#version 120
+varying vec4 color;
+void main() {
+    gl_FragColor = color;
+}
@@ -0,0 +1,36 @@
+#version 120
+// Glyphs drawn with hardware instancing (see vibeplot/instancing.py).
+// The +Y axis of the mesh is rotated onto instance_axis.xyz.
+attribute vec4 p3d_Vertex;
+attribute vec4 instance_position;  // xyz: position
+attribute vec4 instance_axis;      // xyz: unit direction, w: length
+attribute vec4 instance_color;
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform vec4 p3d_ColorScale;
+uniform vec4 glyph_params;  // x: length scale, y: arrow width, z: arrow head length (<= 0: no head), w: 1 for arrows (0: uniform scaling)
+varying vec4 color;
+void main() {
+    vec3 y = instance_axis.xyz;
+    vec3 x = normalize(cross(abs(y.z) < 0.9 ? vec3(0.0, 0.0, 1.0) : vec3(1.0, 0.0, 0.0), y));
+    vec3 z = cross(x, y);
+    float len = instance_axis.w * glyph_params.x;
+    float along;
+    float width;
+    if (glyph_params.w > 0.0) {
+        // arrow: the shaft (y <= 1) is stretched, the head (y > 1) keeps its length
+        float head = glyph_params.z <= 0.0 ? 0.0 : (len >= glyph_params.z ? glyph_params.z : 0.3 * len);
+        float shaft = len - head;
+        along = p3d_Vertex.y <= 1.0 ? p3d_Vertex.y * shaft : shaft + (p3d_Vertex.y - 1.0) * head;
+        width = glyph_params.y;
+        // no head: the head (and its base, of radius 2) is collapsed onto the tip
+        if (head <= 0.0 && (p3d_Vertex.y > 1.0 || length(p3d_Vertex.xz) > 1.5)) {
+            width = 0.0;
+        }
+    } else {
+        along = p3d_Vertex.y * len;
+        width = len;
+    }
+    vec3 pos = instance_position.xyz + p3d_Vertex.x * width * x + along * y + p3d_Vertex.z * width * z;
+    gl_Position = p3d_ModelViewProjectionMatrix * vec4(pos, 1.0);
+    color = instance_color * p3d_ColorScale;
+}
@@ -0,0 +1,16 @@
+#version 120
+// Dashes of the lines drawn with line_style.vert or thick_line.vert.
+uniform vec4 dash_pattern;  // lengths of (dash, gap, dash, gap), zero padded
+uniform float dash_start;   // position in the pattern where the arc length is 0 (per node)
+uniform float dash_offset;  // animated offset of the pattern
+varying vec4 color;
+varying float arc;
+void main() {
+    float period = dash_pattern.x + dash_pattern.y + dash_pattern.z + dash_pattern.w;
+    float s = mod(arc + dash_start + dash_offset, period);
+    if ((s >= dash_pattern.x && s < dash_pattern.x + dash_pattern.y) ||
+        s >= dash_pattern.x + dash_pattern.y + dash_pattern.z) {
+        discard;
+    }
+    gl_FragColor = color;
+}
@@ -0,0 +1,15 @@
+#version 120
+// Line styles (see LINE_STYLES and set_line_style in vibeplot/utilities.py).
+// The dashes are cut in the fragment shader from the arc length along the line.
+attribute vec4 p3d_Vertex;
+attribute vec4 p3d_Color;
+attribute float arc_length;
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform vec4 p3d_ColorScale;
+varying vec4 color;
+varying float arc;
+void main() {
+    gl_Position = p3d_ModelViewProjectionMatrix * p3d_Vertex;
+    color = p3d_Color * p3d_ColorScale;
+    arc = arc_length;
+}
@@ -0,0 +1,32 @@
+#version 120
+// Screen-space thick lines (see thick_lines_node in vibeplot/utilities.py).
+// Each segment is a quad whose vertices are pushed sideways on the screen,
+// so the lines have the same width in pixels at any distance.
+// The fragments are drawn by line_style.frag (for the dashes).
+attribute vec4 p3d_Vertex;
+attribute vec4 p3d_Color;
+attribute vec3 line_other;   // the other end of the segment
+attribute vec4 line_params;  // x: side (-1 or 1), y: width in pixels, z: arc length
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform vec4 p3d_ColorScale;
+uniform vec2 line_viewport;  // size of the window in pixels
+varying vec4 color;
+varying float arc;
+void main() {
+    vec4 p = p3d_ModelViewProjectionMatrix * p3d_Vertex;
+    vec4 q = p3d_ModelViewProjectionMatrix * vec4(line_other, 1.0);
+    // move an end that is behind the camera along the segment, so its direction on the screen is right
+    const float min_w = 1e-4;
+    if (p.w < min_w && q.w >= min_w) {
+        p = mix(p, q, (min_w - p.w) / (q.w - p.w));
+    } else if (q.w < min_w && p.w >= min_w) {
+        q = mix(q, p, (min_w - q.w) / (p.w - q.w));
+    }
+    vec2 dir = (q.xy / q.w - p.xy / p.w) * line_viewport;
+    float len = length(dir);
+    vec2 normal = len > 0.0 ? vec2(-dir.y, dir.x) / len : vec2(0.0, 1.0);
+    p.xy += normal * (line_params.x * line_params.y) / line_viewport * p.w;
+    gl_Position = p;
+    color = p3d_Color * p3d_ColorScale;
+    arc = line_params.z;
+}
@@ -12,7 +12,7 @@ from panda3d.core import AntialiasAttrib
 
 ###############################################
 
-app = EarthOrbitApp()
+app = EarthOrbitApp(scene_cache="cache")  # static geometry is cached in the cache directory
 
 # example reading trajectory from JSON file;
 # app.orbit_from_json_np = app.add_orbit_from_json("traj.json", color=(1, 0, 1, 1), thickness=2.0)
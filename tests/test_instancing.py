@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from panda3d.core import NodePath
+
+from vibeplot.instancing import InstancedGlyphs, arrow_glyph_mesh, sphere_glyph_mesh
+
+
+def shader_vertex(vertex, position, axis, length, glyph_params) -> np.ndarray:
+    """`main` of models/instanced_glyph.vert, line by line: the position of one vertex of one instance."""
+    y = np.asarray(axis, dtype=float)
+    x = np.cross((0.0, 0.0, 1.0) if abs(y[2]) < 0.9 else (1.0, 0.0, 0.0), y)
+    x /= np.linalg.norm(x)
+    z = np.cross(x, y)
+    length = length * glyph_params[0]
+    if glyph_params[3] > 0.0:
+        head = 0.0 if glyph_params[2] <= 0.0 else (glyph_params[2] if length >= glyph_params[2] else 0.3 * length)
+        shaft = length - head
+        along = vertex[1] * shaft if vertex[1] <= 1.0 else shaft + (vertex[1] - 1.0) * head
+        width = glyph_params[1]
+        if head <= 0.0 and (vertex[1] > 1.0 or np.hypot(vertex[0], vertex[2]) > 1.5):
+            width = 0.0
+    else:
+        along = vertex[1] * length
+        width = length
+    return position + vertex[0] * width * x + along * y + vertex[2] * width * z
+
+
+def make_glyphs(mesh: tuple, head_length: float) -> InstancedGlyphs:
+    parent = SimpleNamespace(render=NodePath("render"), win=None)
+    return InstancedGlyphs(parent, mesh, head_length=head_length, thickness=0.05, use_instancing=False)
+
+
+@pytest.mark.parametrize("mesh, head_length", [(arrow_glyph_mesh(), 0.2),
+                                               (arrow_glyph_mesh(), 0.0),
+                                               (arrow_glyph_mesh(), -1.0),
+                                               (sphere_glyph_mesh(), None)])
+def test_cpu_transform_matches_shader(mesh, head_length):
+    glyphs = make_glyphs(mesh, head_length)
+    glyphs.set_scale(2.0)
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-5.0, 5.0, (6, 3))
+    directions = np.vstack((rng.normal(size=(4, 3)), (0, 0, 1), (0, 0, -1)))  # both sides of the helper switch
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+    lengths = np.array([0.0, 0.05, 0.1, 0.5, 1.0, 3.0])  # shorter and longer than the head
+    vertices = glyphs._transform(positions, directions, lengths)
+    expected = np.array([[shader_vertex(v, p, d, l, glyphs._glyph_params()) for v in glyphs.mesh[0]]
+                         for p, d, l in zip(positions, directions, lengths)])
+    assert np.allclose(vertices, expected)
+
+
+@pytest.mark.parametrize("head_length", [0.0, -1.0])
+def test_no_head(head_length):
+    glyphs = make_glyphs(arrow_glyph_mesh(), head_length)
+    vertices = glyphs._transform(np.zeros((1, 3)), np.array([[0.0, 1.0, 0.0]]), np.array([2.0]))[0]
+    # a full-length shaft, no wider than the thickness
+    assert np.isclose(vertices[:, 1].max(), 2.0)
+    assert np.hypot(vertices[:, 0], vertices[:, 2]).max() <= 0.05 + 1e-12
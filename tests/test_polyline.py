@@ -0,0 +1,46 @@
+import numpy as np
+from panda3d.core import NodePath
+
+from vibeplot.polyline import ChunkedPolyline
+
+WHITE = (1, 1, 1, 1)
+RED = (1, 0, 0, 1)
+
+
+def point_colors(polyline: ChunkedPolyline) -> np.ndarray:
+    """The colors of the points (0-255), read back from the vertex data of the chunks."""
+    colors = np.zeros((polyline.num_points, 4))
+    for index in range(len(polyline.chunks)):
+        rows = polyline._read_chunk(index)
+        chunk_start = index * polyline.chunk_size
+        colors[chunk_start:chunk_start + len(rows)] = rows['color']
+    return colors
+
+
+def make_polyline(num_points: int, chunk_size: int) -> ChunkedPolyline:
+    theta = np.linspace(0.0, 2.0 * np.pi, num_points)
+    points = np.column_stack((np.cos(theta), np.sin(theta), np.zeros(num_points)))
+    return ChunkedPolyline(NodePath("root"), points, WHITE, chunk_size=chunk_size)
+
+
+def check_recolor(polyline: ChunkedPolyline, start: int, stop: int):
+    expected = point_colors(polyline)
+    polyline.set_colors(RED, start, stop)
+    expected[start:stop] = np.array(RED) * 255
+    assert np.array_equal(point_colors(polyline), expected)
+    # the colors kept to extend the last chunk are updated too
+    tail_points, tail_colors = polyline._tail
+    assert np.array_equal(tail_colors * 255, expected[polyline.num_points - len(tail_points):])
+
+
+def test_recolor_middle_of_single_chunk():
+    polyline = make_polyline(100, chunk_size=4096)
+    assert len(polyline.chunks) == 1
+    check_recolor(polyline, 10, 20)
+
+
+def test_recolor_middle_of_multiple_chunks():
+    polyline = make_polyline(100, chunk_size=16)
+    assert len(polyline.chunks) > 1
+    check_recolor(polyline, 10, 40)   # across chunks
+    check_recolor(polyline, 90, 98)   # into the last chunk, stopping before its end
@@ -1,17 +1,45 @@
-from .main import EarthOrbitApp
+# the submodules (and their dependencies) are only imported when first accessed,
+# so that `import vibeplot` stays cheap.
+import importlib
 
-from . import antipode
-from . import bodies
-from . import draggable_vector
-from . import manifold
-from . import orbit
-from . import path
-from . import sites
-from . import stars
-from . import utilities
-from . import planes
-from . import clouds
-from . import geodesics
+_SUBMODULES = ['antipode',
+               'bodies',
+               'draggable_vector',
+               'manifold',
+               'orbit',
+               'path',
+               'sites',
+               'stars',
+               'utilities',
+               'planes',
+               'clouds',
+               'geodesics',
+               'ephemeris',
+               'batching',
+               'scene_cache',
+               'profiling',
+               'textures',
+               'tiles',
+               'lod',
+               'labels',
+               'instancing',
+               'polyline',
+               'origin',
+               'timesystem',
+               'statecache',
+               'fire',
+               'main']
 
-from . import fire
+__all__ = ['EarthOrbitApp'] + _SUBMODULES
 
+
+def __getattr__(name):
+    if name == 'EarthOrbitApp':
+        return importlib.import_module('.main', __name__).EarthOrbitApp
+    if name in _SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,6 +1,6 @@
-from panda3d.core import TextNode
 from direct.task import Task
-from .utilities import create_arrow_with_endpoints
+from .utilities import EndpointArrow
+from .labels import get_label_manager, label_pixels
 
 
 class BodyToBodyArrow:
@@ -19,14 +19,27 @@ class BodyToBodyArrow:
         self.color = color
         self.thickness = thickness
         self.head_size = head_size
-        self.arrow_np = None
         self.name = name
         self.label_text = label_text
         self.label_color = label_color
         self.label_scale = label_scale
-        self.label_np = None
+        self.label = None
         self.always_on_top = always_on_top
 
+        # the arrow geometry is built once; each frame only moves it
+        self.arrow = EndpointArrow(self.app.render, color=self.color, thickness=self.thickness,
+                                   head_size=self.head_size, name=self.name)
+        self.arrow_np = self.arrow.root
+        self.arrow_np.setLightOff()
+        self.arrow_np.setTransparency(True)
+
+        if self.label_text:
+            # the label follows this node, which is moved to the end of the arrow
+            self.label_anchor = self.app.render.attachNewNode(f"{self.name}_label")
+            self.label = get_label_manager(app).add(self.label_text, self.label_anchor, color=self.label_color,
+                                                    size=label_pixels(self.label_scale), priority=40,
+                                                    occlude=not self.always_on_top)
+
         # Start the update task
         self.app.add_task(self.update_task, f"Update_{self.name}")
 
@@ -40,47 +53,20 @@ class BodyToBodyArrow:
         length = (pos_b - pos_a).length() + self.body_b.radius * self.extension
         end_pos = pos_a + direction * length
 
-        # Remove previous arrow
-        if self.arrow_np:
-            self.arrow_np.removeNode()
+        self.arrow.set_endpoints(pos_a, end_pos)
 
-        # Draw new arrow
-        self.arrow_np = create_arrow_with_endpoints(
-            start=pos_a,
-            end=end_pos,
-            color=self.color,
-            thickness=self.thickness,
-            head_size=self.head_size
-        )
-        self.arrow_np.reparentTo(self.app.render)
-        self.arrow_np.setLightOff()
-        self.arrow_np.setTransparency(True)
-
-        # Draw label if requested
-        if self.label_text:
-            if self.label_np is None:
-                label_node = TextNode(f"{self.name}_label")
-                label_node.setText(self.label_text)
-                label_node.setTextColor(*self.label_color)
-                label_node.setAlign(TextNode.ACenter)
-                self.label_np = self.app.render.attachNewNode(label_node)
-                self.label_np.setScale(self.label_scale)
-                self.label_np.setBillboardPointEye()
-                self.label_np.setLightOff()
-                if self.always_on_top:
-                    self.label_np.setBin('fixed', 100)
-                    self.label_np.setDepthTest(False)
-                    self.label_np.setDepthWrite(False)
-            # move the label to the end of the arrow
-            self.label_np.setPos(end_pos)
+        # move the label to the end of the arrow
+        if self.label:
+            self.label_anchor.setPos(end_pos)
 
         return Task.cont
 
     def destroy(self):
         if self.arrow_np:
-            self.arrow_np.removeNode()
+            self.arrow.remove()
             self.arrow_np = None
-        if self.label_np:
-            self.label_np.removeNode()
-            self.label_np = None
+        if self.label:
+            self.label.remove()
+            self.label_anchor.removeNode()
+            self.label = None
         self.app.remove_task(f"Update_{self.name}")
\ No newline at end of file
@@ -0,0 +1,217 @@
+from panda3d.core import NodePath, Loader, Filename, ShaderAttrib
+
+STATIC_TAG = "vibeplot_static"  # tag marking geometry that never changes once created
+BATCH_PARENT_TAG = "vibeplot_batch_parent"  # path of the parent of a saved batch
+SHADER_OFF_TAG = "vibeplot_shader_off"  # where a saved batch had its shader turned off
+
+
+def mark_static(node_path: NodePath, cacheable: bool = True) -> NodePath:
+    """
+    Mark a NodePath as static geometry that can be merged by `StaticBatcher.bake`.
+
+    Only tag geometry that is never moved, recolored, hidden or otherwise modified
+    after creation (grids, axes, planes, markers, ...). Billboarded nodes
+    (e.g. labels) should not be tagged since they can't be flattened.
+
+    Args:
+        node_path (NodePath): The node to mark.
+        cacheable (bool, optional): If True, the geometry can also be saved to a
+            scene cache (see `vibeplot.scene_cache`). Set to False for nodes whose
+            render state references other parts of the scene (e.g. specific lights),
+            and which must therefore always be built. Defaults to True.
+    Returns:
+        NodePath: The same node, for chaining.
+    """
+    node_path.setTag(STATIC_TAG, "cache" if cacheable else "nocache")
+    return node_path
+
+
+def static_cached(parent) -> bool:
+    """
+    Returns True if the cacheable static geometry of the app `parent` is going to
+    be restored from a scene cache, in which case it should not be built.
+    """
+    batcher = getattr(parent, "static_batcher", None)
+    return batcher is not None and batcher.use_cache
+
+
+def _strip_shader_off(node_path: NodePath) -> bool:
+    """
+    ShaderAttribs can't be written to a bam file, so remove the "shader off"
+    attribs from `node_path` and its descendants and record them in tags instead.
+
+    Returns:
+        bool: False if an actual shader was found (which can't be saved).
+    """
+    shader_off = ShaderAttrib.makeOff()
+    for np_ in [node_path] + list(node_path.findAllMatches("**")):
+        node = np_.node()
+        states = [(-1, node.getState())]
+        if np_.node().isGeomNode():
+            states += [(i, node.getGeomState(i)) for i in range(node.getNumGeoms())]
+        removed = []
+        for i, state in states:
+            if not state.hasAttrib(ShaderAttrib):
+                continue
+            if state.getAttrib(ShaderAttrib).compareTo(shader_off) != 0:
+                return False
+            removed.append(f"{i}:{state.getOverride(ShaderAttrib)}")
+            state = state.removeAttrib(ShaderAttrib)
+            if i < 0:
+                node.setState(state)
+            else:
+                node.setGeomState(i, state)
+        if removed:
+            np_.setTag(SHADER_OFF_TAG, ";".join(removed))
+    return True
+
+
+def _restore_shader_off(node_path: NodePath):
+    """Inverse of `_strip_shader_off`."""
+    shader_off = ShaderAttrib.makeOff()
+    for np_ in node_path.findAllMatches(f"**/={SHADER_OFF_TAG}"):
+        node = np_.node()
+        for item in np_.getTag(SHADER_OFF_TAG).split(";"):
+            i, priority = map(int, item.split(":"))
+            if i < 0:
+                node.setState(node.getState().addAttrib(shader_off, priority))
+            else:
+                node.setGeomState(i, node.getGeomState(i).addAttrib(shader_off, priority))
+        np_.clearTag(SHADER_OFF_TAG)
+
+
+class StaticBatcher:
+    """
+    Merges the static geometry of a scene into as few Geoms as possible.
+
+    `bake` collects all the nodes marked with `mark_static`, groups them by their
+    parent node, copies each group under a single batch node per parent and
+    flattens it, so that geometry sharing a render state ends up in one Geom.
+    The original nodes are stashed (not removed), so `unbake` restores the scene
+    exactly. `bake` can be called again at any time (e.g. after static objects
+    have been added or removed) and rebuilds all the batches from scratch.
+
+    The cacheable batches can be written to a `.bam` file with `save` and
+    restored on a later run with `load` (see `vibeplot.scene_cache`).
+    """
+
+    def __init__(self, root: NodePath):
+        """
+        Args:
+            root (NodePath): Root of the scene graph to bake (e.g. `render`).
+        """
+        self.root = root
+        self.batches = []  # list of (batch NodePath, [stashed original NodePaths], cacheable)
+        self.restored = []  # batches loaded from a scene cache
+        self.use_cache = False  # set when the cacheable geometry will be restored with `load`
+
+    def bake(self) -> int:
+        """
+        (Re)build the static batches.
+
+        Returns:
+            int: The number of nodes that were merged.
+        """
+        self.unbake()
+
+        # group the tagged nodes by parent. nodes under another tagged node are
+        # merged along with it, and hidden nodes are left alone.
+        groups = {}
+        for node_path in self.root.findAllMatches(f"**/={STATIC_TAG}"):
+            parent = node_path.getParent()
+            if node_path.isHidden() or not parent.findNetTag(STATIC_TAG).isEmpty():
+                continue
+            cacheable = node_path.getTag(STATIC_TAG) == "cache"
+            groups.setdefault((parent, cacheable), []).append(node_path)
+
+        num_merged = 0
+        for (parent, cacheable), node_paths in groups.items():
+            batch = parent.attachNewNode(f"{parent.getName()}_static_batch")
+            for node_path in node_paths:
+                node_path.copyTo(batch).clearTag(STATIC_TAG)
+                node_path.stash()
+            batch.flattenStrong()
+            self.batches.append((batch, node_paths, cacheable))
+            num_merged += len(node_paths)
+        return num_merged
+
+    def unbake(self):
+        """Remove the batches and restore the original nodes."""
+        for batch, node_paths, _ in self.batches:
+            batch.removeNode()
+            for node_path in node_paths:
+                if not node_path.isEmpty() and node_path.hasParent():  # it may have been removed in the meantime
+                    node_path.unstash()
+        self.batches = []
+
+    def _parent_path(self, node_path: NodePath) -> str:
+        """
+        Path from the root to `node_path`, as "name#i" items
+        (the i-th child with that name), separated by "/".
+        """
+        items = []
+        while node_path != self.root:
+            name = node_path.getName()
+            siblings = [c for c in node_path.getParent().getChildren() if c.getName() == name]
+            items.append(f"{name}#{siblings.index(node_path)}")
+            node_path = node_path.getParent()
+        return "/".join(reversed(items))
+
+    def _find_parent(self, path: str) -> NodePath:
+        """Inverse of `_parent_path`. Returns an empty NodePath if it isn't found."""
+        node_path = self.root
+        for item in path.split("/") if path else []:
+            name, i = item.rsplit("#", 1)
+            matches = [c for c in node_path.getChildren() if c.getName() == name]
+            if int(i) >= len(matches):
+                return NodePath()
+            node_path = matches[int(i)]
+        return node_path
+
+    def save(self, filename: str) -> int:
+        """
+        Write the cacheable batches (including restored ones) to a `.bam` file.
+
+        Args:
+            filename (str): The file to write.
+        Returns:
+            int: The number of batches written.
+        """
+        scene = NodePath("static_scene")
+        batches = [batch for batch, _, cacheable in self.batches if cacheable] + self.restored
+        num_saved = 0
+        for batch in batches:
+            copy = batch.copyTo(scene)
+            if not _strip_shader_off(copy):
+                print(f"Warning: {batch} uses a shader and can't be cached")
+                copy.removeNode()
+                continue
+            copy.setTag(BATCH_PARENT_TAG, self._parent_path(batch.getParent()))
+            num_saved += 1
+        scene.writeBamFile(Filename.fromOsSpecific(filename))
+        return num_saved
+
+    def load(self, filename: str) -> int:
+        """
+        Read the batches written by `save` and attach them to their parents.
+
+        Batches whose parent no longer exists in the scene are skipped.
+
+        Args:
+            filename (str): The file to read.
+        Returns:
+            int: The number of batches attached.
+        """
+        node = Loader.getGlobalPtr().loadSync(Filename.fromOsSpecific(filename))
+        if node is None:
+            raise ValueError(f"Could not read scene cache {filename}")
+        for batch in NodePath(node).getChildren():
+            parent = self._find_parent(batch.getTag(BATCH_PARENT_TAG))
+            if parent.isEmpty():
+                print(f"Warning: no parent {batch.getTag(BATCH_PARENT_TAG)!r} for cached static geometry")
+                continue
+            batch.clearTag(BATCH_PARENT_TAG)
+            _restore_shader_off(batch)
+            batch.reparentTo(parent)
+            self.restored.append(batch)
+        return len(self.restored)
@@ -2,17 +2,28 @@ import numpy as np
 import math
 import json
 from direct.showbase.ShowBase import ShowBase
-from panda3d.core import Point3, Vec3, Mat3, Quat, LineSegs, TextNode, TextureStage, Shader, LVector3, Material, BitMask32
+from panda3d.core import Point3, Vec3, Mat3, Quat, LineSegs, TextureStage, Shader, LVector3, Material, BitMask32
 from direct.task import Task
 import csv
 
 from .utilities import (create_sphere,
+                        GEOMETRY_CACHE,
                         lonlat_to_xyz,
                         create_body_fixed_arrow,
                         draw_path,
-                        simple_propagator)
+                        simple_propagator,
+                        use_thick_lines,
+                        thick_lines_node,
+                        set_line_style)
 from .path import Path
 from .clouds import CloudLayer
+from .batching import mark_static, static_cached
+from .textures import get_texture_loader
+from .tiles import TiledSurface
+from .lod import LODSphere
+from .labels import get_label_manager, label_pixels
+from .origin import get_floating_origin
+from .statecache import get_state_cache, STATE_CACHE_SAMPLES
 
 EARTH_RADIUS = 2.0  # Default radius for Earth-like bodies, can be adjusted
 # ... need to avoid setting this here ...
@@ -45,6 +56,8 @@ class Body:
                  et_step: float = 1.0,
                  num_segments: int = 500,
                  time_step: float = None,
+                 path_tolerance: float = 1e-4,
+                 path_screen_tolerance: float = None,
                  spline_mode: str = "cubic",  # "linear" or "cubic"
                  get_position_vector = None,
                  get_rotation_matrix = None,
@@ -56,6 +69,7 @@ class Body:
                  thickness: float = 2.0,
                  trajectory_mode: int = 1,  # 0: trace, 1: full trajectory
                  trace_length: int = 200,
+                 trace_step: float = None,
                  trace_color=(0.7, 0.7, 1, 1),
                  geojson_path : str = None,
                  lon_rotate : str = 0.0,
@@ -77,7 +91,9 @@ class Body:
                  cloud_opacity: float = 0.8,
                  cloud_scale: float = 1.02,
                  cloud_rotate_rate: float = 1.0,
-                 two_sided: bool = False):
+                 two_sided: bool = False,
+                 tile_pyramid: str = None,
+                 lod: bool = True):
         """Initializes a celestial body with various visual and physical properties.
 
         Args:
@@ -93,6 +109,9 @@ class Body:
             sun_dir (LVector3, optional): Direction of the sun for lighting. Defaults to (0, 0, 1).
             thickness (float, optional): Thickness of the orbit path line. Defaults to 2.0.
             trace_length (int, optional): Length of the trace path. Defaults to 200.
+            trace_step (float, optional): Time between the points of the trace (it covers the last
+                `trace_length * trace_step` of the timeline). Defaults to None (the spacing of the
+                keyframes of the state cache, so the trace scales with the span of the timeline).
             trace_color (tuple, optional): RGBA color of the trace. Defaults to (0.7, 0.7, 1, 1).
             geojson_path (str, optional): Path to the GeoJSON file for country boundaries. Defaults to None.
             lon_rotate (float, optional): Longitude rotation offset. Defaults to 0.0.
@@ -104,11 +123,15 @@ class Body:
             marker_color (tuple, optional): RGBA color of orbit markers. Defaults to (0, 1, 1, 1).
             show_label (bool, optional): Whether to show the body's label. Defaults to True.
             label_on_top (bool, optional): Label is always visible even when behind other objects. Defaults to False.
-            label_scale (float, optional): Scale of the label. Defaults to 0.4.
+            label_scale (float, optional): Size of the label (1 is about 40 pixels). Defaults to 0.4.
             material (Material, optional): Material properties for the body. Defaults to None.
             is_sun (bool, optional): Whether the body is the sun. Defaults to False.
             two_sided (bool, optional): Whether the body is two-sided (meaning the texture is also
                 drawn on the inside of the sphere). Defaults to False.
+            tile_pyramid (str, optional): Directory of a tile pyramid (see `vibeplot.tiles`) for a
+                high-resolution surface, paged in when the camera is centered on the body. Defaults to None.
+            lod (bool, optional): Use a view-dependent mesh for the sphere (see `vibeplot.lod`), if the
+                app has an `lod_manager`. Defaults to True.
         """
 
         self.name = name
@@ -134,6 +157,8 @@ class Body:
 
         self.num_segments = num_segments
         self.time_step = time_step
+        self.path_tolerance = path_tolerance
+        self.path_screen_tolerance = path_screen_tolerance
         self.et0 = et0
         self.etf = etf
         self.et_step = et_step
@@ -151,6 +176,7 @@ class Body:
         #self._rotator = self._body.attachNewNode(f"{name}_rotator")
         self._rotator = self.parent.render.attachNewNode(f"{name}_rotator")
         self._rotator.setPos(0, 0, 0)
+        self.position = np.zeros(3)  # absolute position of the rotator, in double precision
 
         self._body = create_sphere(radius, num_lat=24, num_lon=48, color=color)
         self._body.reparentTo(self._rotator)
@@ -158,14 +184,17 @@ class Body:
         self._body.setLightOff()
         self._body.setLight(self.parent.dlnp)
         self._body.setTwoSided(self.two_sided)
+        # textures are loaded in the background. they start as a placeholder
+        # color and are filled in when they are ready.
+        texture_loader = get_texture_loader(parent)
         if texture is not None:
-            tex = parent.loader.loadTexture(texture)
+            tex = texture_loader.load(texture, placeholder_color=color)
             self._body.setTexture(tex, 1)
         elif day_tex is not None and night_tex is not None:
             # Load and apply Earth texture
-            day_tex = parent.loader.loadTexture(day_tex)
+            day_tex = texture_loader.load(day_tex, placeholder_color=color)
             self.day_tex = day_tex  # save it
-            night_tex = parent.loader.loadTexture(night_tex)
+            night_tex = texture_loader.load(night_tex, placeholder_color=(0, 0, 0, 1))
             self.night_tex = night_tex  # save it
             self._body.setTexture(day_tex, 1)
             self._apply_daynight_shader(sun_dir)
@@ -201,10 +230,11 @@ class Body:
         if material is not None:
             self._body.setMaterial(material)  # Apply the material!
 
-        if geojson_path:
+        # [the thick boundaries have a shader, so they aren't in the scene cache]
+        if geojson_path and (use_thick_lines(self.parent) or not static_cached(self.parent)):
             self.draw_country_boundaries(geojson_path=geojson_path, lon_rotate=lon_rotate)
 
-        if draw_grid:
+        if draw_grid and not static_cached(self.parent):
             self.draw_lat_lon_grid()
 
         self.parent.add_task(self.orbit_task, f"{self.name}OrbitTask")
@@ -217,13 +247,13 @@ class Body:
             #self.draw_trajectory(None, color=self.color)
             #TODO add the trace code to this class as an option ...
             #pts = []
-            orbit_json = {'t': [], 'x': [], 'y': [], 'z': []}
-            for et in np.arange(self.et0, self.etf, self.et_step):
-                r = self.get_position_vector(et)
-                orbit_json['t'].append(et)
-                orbit_json['x'].append(r[0])
-                orbit_json['y'].append(r[1])
-                orbit_json['z'].append(r[2])
+            ets = np.arange(self.et0, self.etf, self.et_step)
+            if getattr(self.get_position_vector, 'vectorized', False):
+                # e.g. an ephemeris kernel lookup: sample all the times in one call
+                rs = np.asarray(self.get_position_vector(ets))
+            else:
+                rs = np.array([self.get_position_vector(et) for et in ets])
+            orbit_json = {'t': ets.tolist(), 'x': rs[:, 0].tolist(), 'y': rs[:, 1].tolist(), 'z': rs[:, 2].tolist()}
             self.path = Path(parent = self.parent,
                              spline_mode = self.spline_mode,
                              color = self.color,
@@ -231,6 +261,8 @@ class Body:
                              orbit_json = orbit_json,
                              num_segments = self.num_segments,
                              time_step = self.time_step,
+                             tolerance = self.path_tolerance,
+                             screen_tolerance = self.path_screen_tolerance,
                              show_orbit_path = self.show_orbit_path,
                              trace_mode = self.trace_mode,
                              trace_dt = self.trace_dt)
@@ -238,6 +270,7 @@ class Body:
             self.path = None
             # draw trajectory using the fading trace
             self.trace_length = trace_length  # Number of points to keep in the moon's trace
+            self.trace_step = trace_step
             if self.trace_length:
                 self._trace = []
                 self._trace_node = self.parent.render.attachNewNode(f"{self._body}_trace")
@@ -248,25 +281,15 @@ class Body:
 
         # Add body label above the z-axis
         if show_label:
-            label_node = TextNode(f"{self.name}_label")
-            label_node.setText(self.name)
-            label_node.setTextColor(1, 1, 1, 1)
-            label_node.setAlign(TextNode.ACenter)
-            label_np = self._body.attachNewNode(label_node)
-            label_np.setScale(self.label_scale)
             if draw_3d_axes:
-                label_np.setPos(0, 0, self.radius * 2.3 + 0.01)  # Slightly above the axis
+                label_pos = (0, 0, self.radius * 2.3 + 0.01)  # Slightly above the axis
             else:
-                label_np.setPos(0, 0, self.radius + 0.31)  # Slightly above the body
-            label_np.setBillboardPointEye()
-            label_np.setLightOff()
-
-            self.body_label_np = label_np  # Store reference if you want to hide/show later
-
-            if label_on_top:
-                self.body_label_np.setBin('fixed', 100)  # Draw in a high-priority bin
-                self.body_label_np.setDepthTest(False)   # Don't test against the depth buffer
-                self.body_label_np.setDepthWrite(False)  # Don't write to the depth buffer
+                label_pos = (0, 0, self.radius + 0.31)  # Slightly above the body
+            # (`label_on_top` labels are not hidden behind the other bodies)
+            self.body_label = get_label_manager(parent).add(self.name, self._body, label_pos,
+                                                            size=label_pixels(self.label_scale),
+                                                            priority=100, occlude=not label_on_top)
+        get_label_manager(parent).add_occluder(self._body, self.radius)
 
         self.is_sun = is_sun
         if self.is_sun:
@@ -279,6 +302,22 @@ class Body:
 
         self.reparent_to_rotator()
 
+        # the sphere geometry is replaced by a view-dependent mesh. it stays under
+        # self._body so that it keeps the body's textures, shader and lights.
+        self.lod_sphere = None
+        lod_manager = getattr(self.parent, "lod_manager", None)
+        if lod and lod_manager is not None:
+            self.lod_sphere = LODSphere(self._body, radius, color=color, name=f"{self.name}_lod_sphere")
+            self._body.node().removeAllGeoms()
+            lod_manager.add(self.lod_sphere)
+
+        self.tiled_surface = None
+        if tile_pyramid is not None:
+            try:
+                self.tiled_surface = TiledSurface(self, tile_pyramid)
+            except ValueError as e:
+                print(f"Warning: {e}")
+
         # add to the list of bodies in the scene:
         self.parent.bodies.append(self)
 
@@ -312,11 +351,11 @@ class Body:
         Args:
             show (bool): If True, show the label; if False, hide it.
         """
-        if hasattr(self, 'body_label_np'):
+        if hasattr(self, 'body_label'):
             if show:
-                self.body_label_np.show()
+                self.body_label.show()
             else:
-                self.body_label_np.hide()
+                self.body_label.hide()
 
     def _apply_daynight_shader(self, sun_dir=None):
         """Apply the day/night shader and textures to this body."""
@@ -401,7 +440,8 @@ class Body:
             NodePath: The NodePath containing the 3D axes.
         """
         arrow_ambient_np = self.parent.render.attachNewNode(self.parent.arrow_ambient)
-        axes_np = self._rotator.attachNewNode("axes")
+        # not cacheable since the arrows are lit by specific lights
+        axes_np = mark_static(self._rotator.attachNewNode("axes"), cacheable=False)
         axes_np.setPos(0, 0, 0)
         x_arrow = create_body_fixed_arrow(self.radius)
         x_arrow.setHpr(90, 0, 0)    # +X axis
@@ -436,7 +476,11 @@ class Body:
         # Get the rotation matrix from your function
         # Assuming it returns a 3x3 numpy matrix or similar
         rotation_matrix = self.get_rotation_matrix(et)
+        self._rotator.setQuat(self._matrix_to_quat(rotation_matrix))
 
+    @staticmethod
+    def _matrix_to_quat(rotation_matrix) -> Quat:
+        """Convert a rotation matrix (as returned by `get_rotation_matrix`) to a Panda3D Quat."""
         # Convert to Panda3D's Mat3
         mat3 = Mat3(
             rotation_matrix[0, 0], rotation_matrix[0, 1], rotation_matrix[0, 2],
@@ -445,7 +489,76 @@ class Body:
         )
         quat = Quat()
         quat.setFromMatrix(mat3)
-        self._rotator.setQuat(quat)
+        return quat
+
+    def _evaluate_positions(self, ets) -> np.ndarray:
+        """Positions of the rotator at the times `ets`, from the trajectory or `get_position_vector`."""
+        if self.path:
+            return self.path.get_orbit_states(ets)
+        if getattr(self.get_position_vector, 'vectorized', False):
+            return np.asarray(self.get_position_vector(ets), dtype=float)
+        return np.array([self.get_position_vector(et) for et in ets], dtype=float)
+
+    def get_trace_step(self) -> float:
+        """
+        Time between the points of the trace: `trace_step`, or if it isn't set, the spacing of the
+        keyframes of the state cache (e.g. 0.05 on a timeline of 100 seconds, 5 minutes on one of a week).
+        """
+        if self.trace_step is not None:
+            return self.trace_step
+        time_system = getattr(self.parent, "time_system", None)
+        if time_system is None:
+            return 0.05
+        cache = getattr(self.parent, "state_cache", None)
+        num_samples = cache.num_samples if cache is not None else STATE_CACHE_SAMPLES
+        return time_system.span / (num_samples - 1)
+
+    def trace_positions(self, ets) -> np.ndarray:
+        """Absolute positions of the body at the times `ets` (for its trace).
+
+        They are interpolated from the keyframes of the app's `StateCache` if it has one, so that
+        drawing a trace costs no evaluation of the trajectory.
+
+        Args:
+            ets (np.ndarray): The times.
+
+        Returns:
+            np.ndarray: (n, 3) positions.
+        """
+        cache = getattr(self.parent, "state_cache", None)
+        positions = cache.positions_at(self, ets) if cache is not None else None
+        return self._evaluate_positions(ets) if positions is None else positions
+
+    def trace_orientations(self, ets) -> np.ndarray:
+        """Orientations of the body at the times `ets`, as (n, 4) quaternions in Panda3D order (see `trace_positions`)."""
+        cache = getattr(self.parent, "state_cache", None)
+        quats = cache.orientations_at(self, ets) if cache is not None else None
+        if quats is None:
+            quats = np.array([tuple(self._matrix_to_quat(self.get_rotation_matrix(et))) for et in ets])
+        return quats
+
+    def sample_states(self, ets) -> tuple:
+        """Positions and orientations of the body at the times `ets` (for the `StateCache`).
+
+        Args:
+            ets (np.ndarray): The times.
+
+        Returns:
+            tuple: (positions (n, 3), quaternions (n, 4) in Panda3D order), or None for a site
+                (it moves with its central body).
+        """
+        if self.__class__.__name__ == 'Site':
+            return None
+        positions = self._evaluate_positions(ets)
+        if getattr(self.get_rotation_matrix, 'vectorized', False):
+            matrices = self.get_rotation_matrix(ets)
+        else:
+            matrices = [self.get_rotation_matrix(et) for et in ets]
+        quats = np.array([tuple(self._matrix_to_quat(m)) for m in matrices])
+        # q and -q are the same rotation: pick the signs so that consecutive keyframes interpolate
+        flips = np.cumsum(np.sum(quats[1:] * quats[:-1], axis=1) < 0) % 2
+        quats[1:][flips == 1] *= -1
+        return positions, quats
 
     def _get_position_vector(self, et: float):
         """Calculates the position vector of the body.
@@ -615,19 +728,12 @@ class Body:
         if hasattr(self, "city_marker_nodes"):
             for node in self.city_marker_nodes:
                 node.removeNode()
-        if hasattr(self, "city_label_nodes"):
-            for node in self.city_label_nodes:
-                node.removeNode()
+        if hasattr(self, "city_labels"):
+            for label in self.city_labels:
+                label.remove()
         self.city_marker_nodes = []
-        self.city_label_nodes = []
-
-        # Create a single marker model to copy for each city
-        base_marker = create_sphere(radius=marker_radius, num_lat=8, num_lon=16, color=marker_color)
-        base_marker.setLightOff()
-        base_marker.setTransparency(True)
-        base_marker.setTextureOff()
-        base_marker.setShaderOff()
-        base_marker.hide()  # Hide the base marker itself
+        self.city_labels = []
+        label_manager = get_label_manager(self.parent)
 
         # Read cities from CSV
         with open(cities_csv_path, newline='', encoding='utf-8') as csvfile:
@@ -638,27 +744,23 @@ class Body:
                 lon = float(row['lon']) + 180 # for some reason the texture map is rotated? TODO
                 x, y, z = lonlat_to_xyz(lon, lat, self.radius + 0.01)
 
-                # Copy the base marker for this city
-                marker = base_marker.copyTo(self._body)
-                marker.setPos(x, y, z)
-                marker.show()
-                self.city_marker_nodes.append(marker)
-
-                # Create label
-                label_node = TextNode(f"city_label_{name}")
-                label_node.setText(name)
-                label_node.setTextColor(*label_color)
-                label_node.setAlign(TextNode.ACenter)
-                label_np = self._body.attachNewNode(label_node)
-                # Offset label above marker
-                label_np.setPos(x, y, z + marker_radius * 2.2)
-                label_np.setScale(label_scale)
-                label_np.setBillboardPointEye()
-                label_np.setLightOff()
-                label_np.setTransparency(True)
-                label_np.setTextureOff()
-                label_np.setShaderOff()
-                self.city_label_nodes.append(label_np)
+                # Each marker shares the cached sphere geometry
+                # [unless they are restored from the scene cache]
+                if not static_cached(self.parent):
+                    marker = GEOMETRY_CACHE.sphere(radius=marker_radius, num_lat=8, num_lon=16, color=marker_color)
+                    marker.reparentTo(self._body)
+                    mark_static(marker)
+                    marker.setPos(x, y, z)
+                    marker.setLightOff()
+                    marker.setTransparency(True)
+                    marker.setTextureOff()
+                    marker.setShaderOff()
+                    self.city_marker_nodes.append(marker)
+
+                # Create label, offset above the marker
+                self.city_labels.append(label_manager.add(name, self._body, (x, y, z + marker_radius * 2.2),
+                                                          label_color, size=label_pixels(label_scale),
+                                                          priority=10))
 
     def draw_country_boundaries(self, geojson_path : str, lon_rotate : float = 0.0, radius_pad : float = 0.02, thickness: float = 1.2, color = (1, 1, 1, 0.5)):
         """Draws country boundaries on the body using a GeoJSON file.
@@ -672,10 +774,7 @@ class Body:
         with open(geojson_path, 'r') as f:
             data = json.load(f)
 
-        segs = LineSegs()
-        segs.setThickness(thickness)
-        segs.setColor(color)
-
+        lines = []
         for feature in data['features']:
             for coords in feature['geometry']['coordinates']:
                 # Handle MultiPolygon and Polygon
@@ -684,17 +783,30 @@ class Body:
                 else:
                     rings = coords
                 for ring in rings:
-                    first = True
-                    for lon, lat in ring:
-                        lon = lon + lon_rotate
-                        x, y, z = lonlat_to_xyz(lon, lat, self.radius + radius_pad)
-                        if first:
-                            segs.moveTo(x, y, z)
-                            first = False
-                        else:
-                            segs.drawTo(x, y, z)
-
-        self.boundaries_np = self._body.attachNewNode(segs.create())
+                    lon, lat = np.radians(np.asarray(ring, dtype=float)[:, :2].T)
+                    lon += math.radians(lon_rotate)
+                    r = self.radius + radius_pad
+                    lines.append(np.column_stack((r * np.cos(lat) * np.cos(lon),
+                                                  r * np.cos(lat) * np.sin(lon),
+                                                  r * np.sin(lat))))
+
+        if use_thick_lines(self.parent):
+            # all the boundaries in one Geom, with a width in pixels
+            # [not cacheable: a shader can't be saved in the scene cache]
+            self.boundaries_np = mark_static(self._body.attachNewNode(
+                thick_lines_node("boundaries", lines, color, thickness)), cacheable=False)
+            self.boundaries_np.setTransparency(True)
+            self.boundaries_np.setTwoSided(True)
+            set_line_style(self.boundaries_np, 0, thick=True)
+        else:
+            segs = LineSegs()
+            segs.setThickness(thickness)
+            segs.setColor(color)
+            for line in lines:
+                segs.moveTo(*line[0])
+                for point in line[1:]:
+                    segs.drawTo(*point)
+            self.boundaries_np = mark_static(self._body.attachNewNode(segs.create()))
         self.boundaries_np.setLightOff()
         self.boundaries_np.setBin('transparent', 10)
 
@@ -718,26 +830,40 @@ class Body:
         if self.path:
             self.path.update_trace(et)
 
+        origin = get_floating_origin(self.parent)
+
         # Skip updates for sites    ---- this needs to be moved somewhere else....
         if self.__class__.__name__ != 'Site':
             # don't update the rotator if it's a site
-            self.set_orientation(et)
-            if self.path:
-                r = self.path.get_orbit_state(et)    # use the path class
+            cache = get_state_cache(self.parent)
+            r = cache.position(self, et) if cache is not None else None
+            if r is not None:
+                # scrubbing the timeline: interpolate the keyframes
+                self._rotator.setQuat(cache.orientation(self, et))
             else:
-                r = self.get_position_vector(et)
+                self.set_orientation(et)
+                if self.path:
+                    r = self.path.get_orbit_states([et])[0]    # use the path class
+                else:
+                    r = self.get_position_vector(et)
             # Get the new position
-            new_pos = Point3(r[0], r[1], r[2])
-            self._rotator.setPos(new_pos)
+            self.position = np.asarray(r, dtype=float)
+            if origin is not None:
+                origin.set_position(self._rotator, self.position)
+            else:
+                self._rotator.setPos(Point3(*self.position))
 
         if self.trace_length:
-            # Update body trace
-            body_pos = self._body.getPos(self.parent.render)
-            self._trace.append(body_pos)
-
-            # Trim trace if needed
-            if self.trace_length and len(self._trace) > self.trace_length:
-                self._trace.pop(0)
+            # Update body trace [absolute positions]. it's the window of the trajectory before `et`
+            # (rather than a history of the frames), so it's right after a jump or in reverse.
+            body_pos = np.array(self._body.getPos(self.parent.render))
+            if origin is not None:
+                body_pos = origin.to_world(body_pos)
+            ets = et - self.get_trace_step() * np.arange(self.trace_length - 1, 0, -1)
+            time_system = getattr(self.parent, "time_system", None)
+            if time_system is not None:
+                ets = ets[ets >= time_system.start]
+            self._trace = list(self.trace_positions(ets)) + [body_pos]
 
             # Draw the trace and markers
             self._trace_node.node().removeAllChildren()
@@ -748,10 +874,8 @@ class Body:
                     marker.removeNode()
                 self.marker_nodes = []
 
-            # Clear existing marker labels
-            if hasattr(self, 'marker_labels'):
-                for label in self.marker_labels:
-                    label.removeNode()
+            # the marker labels are reused from frame to frame
+            marker_labels = self.marker_labels
             self.marker_labels = []
 
             # Create marker parent if needed
@@ -762,27 +886,27 @@ class Body:
 
             # Draw trace and add markers
             if len(self._trace) > 1:
-                segs = LineSegs()
-                segs.setThickness(self.thickness)
+                # they are drawn relative to the last point (so they're precise with a floating origin)
+                anchor = self._trace[-1]
+                for node in (self._trace_node, self.orbit_markers_np):
+                    if origin is not None:
+                        origin.set_position(node, anchor)
+                    else:
+                        node.setPos(*anchor)
+                trace = np.array(self._trace) - anchor
+                trace_colors = []
 
                 # Decide how many markers to create
                 marker_interval = max(1, len(self._trace) // (self.trace_length // self.marker_interval))
 
                 marker_count = 0  # For numbering markers
 
-                for i, pt in enumerate(self._trace):
+                for i, pt in enumerate(trace):
                     # Alpha increases from oldest to newest point
                     alpha = i / (len(self._trace) - 1)
 
                     # Set color for trace segment
-                    color = (self.trace_color[0], self.trace_color[1], self.trace_color[2], alpha)
-                    segs.setColor(color)
-
-                    # Start or continue line
-                    if i == 0:
-                        segs.moveTo(pt)
-                    else:
-                        segs.drawTo(pt)
+                    trace_colors.append((self.trace_color[0], self.trace_color[1], self.trace_color[2], alpha))
 
                     # Add marker at regular intervals
                     if self.orbit_markers and i % marker_interval == 0:
@@ -795,49 +919,44 @@ class Body:
                             self.marker_color[3] * alpha
                         )
 
-                        marker = create_sphere(
+                        marker = GEOMETRY_CACHE.sphere(
                             radius=self.marker_size,
                             num_lat=8,
                             num_lon=16,
                             color=marker_color
                         )
                         marker.reparentTo(self.orbit_markers_np)
-                        marker.setPos(pt)
+                        marker.setPos(*pt)
                         marker.setLightOff()
                         marker.setTransparency(True)
                         self.marker_nodes.append(marker)
 
-                        # Create numbered label for this marker
-                        label_text = TextNode(f'marker_label_{marker_count}')
-                        label_text.setText(f"{marker_count}")
-                        label_text.setTextColor(
-                            self.marker_color[0],
-                            self.marker_color[1],
-                            self.marker_color[2],
-                            self.marker_color[3] * alpha  # Same opacity as marker
-                        )
-                        label_text.setAlign(TextNode.ACenter)
-                        label_np = self.orbit_markers_np.attachNewNode(label_text)
-
-                        # Position the label next to the marker
-                        label_offset = self.marker_size * 2.5
-                        label_np.setPos(pt[0], pt[1], pt[2] + label_offset)
-                        label_np.setScale(0.2)  # Scale the label appropriately
-                        label_np.setBillboardPointEye()  # Make the label always face the camera
-                        # Apply same properties as marker
-                        label_np.setLightOff()
-                        label_np.setTransparency(True)
-                        # Store for cleanup
-                        self.marker_labels.append(label_np)
-
-                # Create the trace line
-                self._trace_node.attachNewNode(segs.create())
+                        # Numbered label for this marker, next to it and with the same opacity
+                        label_pos = (pt[0], pt[1], pt[2] + self.marker_size * 2.5)
+                        if marker_labels:
+                            label = marker_labels.pop(0)
+                            label.set_anchor(self.orbit_markers_np, label_pos)
+                            label.color = marker_color
+                        else:
+                            label = get_label_manager(self.parent).add(f"{marker_count}", self.orbit_markers_np,
+                                                                       label_pos, marker_color,
+                                                                       size=label_pixels(0.2))
+                        self.marker_labels.append(label)
+
+                # Create the trace line (as a thick line, if supported)
+                width = self.thickness if use_thick_lines(self.parent) else None
+                trace_np = draw_path(self._trace_node, trace, colors=trace_colors, width=width)
+                trace_np.setRenderModeThickness(self.thickness)
                 self._trace_node.setTransparency(True)
                 self._trace_node.setLightOff()  # Add this line to disable lighting
                 self._trace_node.setTwoSided(True)  # Also add this for better visibility
 
                 self._trace_node.reparentTo(self.parent.render)  # wrt to base frame
 
+            # remove the labels of the markers that are gone
+            for label in marker_labels:
+                label.remove()
+
         return Task.cont
 
     def draw_lat_lon_grid(self, num_lat=10, num_lon=16, radius_pad=0.015, color=(1, 1, 1, 1), thickness=2.0):
@@ -885,7 +1004,7 @@ class Body:
                     grid.drawTo(x, y, z)
 
         # the shader is effecting the grid lines, so do this:
-        self.grid_np = self._body.attachNewNode(grid.create())
+        self.grid_np = mark_static(self._body.attachNewNode(grid.create()))
         self.grid_np.setShaderOff()
         self.grid_np.setLightOff()
         self.grid_np.setDepthOffset(3)
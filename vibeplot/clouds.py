@@ -1,7 +1,8 @@
 from panda3d.core import LVector3, ColorBlendAttrib, TransparencyAttrib, NodePath
 from direct.showbase.ShowBase import ShowBase
 from direct.task import Task
-from .utilities import create_sphere
+from .utilities import GEOMETRY_CACHE
+from .textures import get_texture_loader
 
 class CloudLayer:
     def __init__(
@@ -38,9 +39,10 @@ class CloudLayer:
         self.rotate_rate = rotate_rate
         self.name = name
 
-        self.cloud_np = create_sphere(self.radius * self.scale, num_lat=24, num_lon=48, color=(1,1,1,self.opacity))
+        self.cloud_np = GEOMETRY_CACHE.sphere(self.radius * self.scale, num_lat=24, num_lon=48, color=(1,1,1,self.opacity))
         if self.texture:
-            tex = self.parent.loader.loadTexture(self.texture)
+            # black is transparent, so there are no clouds until the texture is loaded
+            tex = get_texture_loader(self.parent).load(self.texture, placeholder_color=(0, 0, 0, 1))
             # self.cloud_np.setTexture(tex, 1)
             # Make all black pixels (0,0,0) fully transparent
             # tex.setFormat(tex.F_srgb_alpha)  # Ensure alpha channel is present
@@ -4,7 +4,8 @@ from direct.showbase.DirectObject import DirectObject
 import math
 import numpy as np
 
-from .utilities import create_arrow_with_endpoints, create_circle, random_rgba
+from .utilities import create_arrow_with_endpoints, GEOMETRY_CACHE, random_rgba
+from .origin import world_frame
 
 LENGTH_FACTOR = 0.7  # size of the gizmo relative to the vector length
 
@@ -28,7 +29,7 @@ class DraggableVector(DirectObject):
                  name: str = "DraggableVector"):
 
         self.parent = parent
-        self.root = parent.render.attachNewNode(name)
+        self.root = world_frame(parent).attachNewNode(name)
         self.root.setPos(*pos)
         self.length = length
         self.color = color
@@ -72,12 +73,12 @@ class DraggableVector(DirectObject):
         self.hide_rotation_gizmo()
 
         # Create a single node to serve as the rigid gizmo.
-        self.gizmo_node = self.parent.render.attachNewNode("gizmo_node")
+        self.gizmo_node = world_frame(self.parent).attachNewNode("gizmo_node")
         self.gizmo_node.setPos(pos)
 
         # Create the two circles as children of the gizmo node.
         # RA circle: intended normal (in its own local space) is along local Z.
-        c1 = create_circle(radius=self.length*LENGTH_FACTOR,
+        c1 = GEOMETRY_CACHE.circle(radius=self.length*LENGTH_FACTOR,
                            color=self.gizmo_circle_styles['ra']['color'],
                            axis='z',
                            thickness=self.gizmo_circle_styles['ra']['thickness'])
@@ -85,7 +86,7 @@ class DraggableVector(DirectObject):
         c1.reparentTo(self.gizmo_node)
 
         # Dec circle: intended normal is along local X.
-        c2 = create_circle(radius=self.length*LENGTH_FACTOR,
+        c2 = GEOMETRY_CACHE.circle(radius=self.length*LENGTH_FACTOR,
                            color=self.gizmo_circle_styles['dec']['color'],
                            axis='x',
                            thickness=self.gizmo_circle_styles['dec']['thickness'])
@@ -95,9 +96,8 @@ class DraggableVector(DirectObject):
         self.gizmo_nodes = [c1, c2]
 
         # Add precise collision shapes using CollisionPolygon
-        for c, axis, radius in zip(self.gizmo_nodes, ['z', 'x'],
-                                   [self.length * LENGTH_FACTOR,
-                                    self.length * LENGTH_FACTOR]):
+        # (unit radius, since the circles are scaled to their radius)
+        for c, axis, radius in zip(self.gizmo_nodes, ['z', 'x'], [1.0, 1.0]):
             col_node = CollisionNode(f"gizmo_{axis}_col")
             num_segments = 32  # Number of segments to approximate the circle
             for i in range(num_segments):
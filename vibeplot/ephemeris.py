@@ -0,0 +1,387 @@
+import numpy as np
+
+KERNEL_MAGIC = b"VPEPHEM1"
+KERNEL_VERSION = 1
+
+# segment data types (numbered after the analogous SPICE types)
+SEGMENT_POSITION = 2     # Chebyshev position (x, y, z), like SPK type 2
+SEGMENT_ORIENTATION = 3  # Chebyshev 3-1-3 Euler angles (phi, delta, w), like binary PCK type 2
+
+_HEADER_DTYPE = np.dtype([("magic", "S8"),
+                          ("version", "<u4"),
+                          ("num_segments", "<u4"),
+                          ("directory_offset", "<u8")])
+
+_SEGMENT_DTYPE = np.dtype([("target", "<i4"),
+                           ("center", "<i4"),
+                           ("data_type", "<i4"),
+                           ("degree", "<i4"),
+                           ("start", "<f8"),
+                           ("stop", "<f8"),
+                           ("init", "<f8"),
+                           ("interval", "<f8"),
+                           ("num_records", "<u8"),
+                           ("data_offset", "<u8")])
+
+
+class EphemerisKernel:
+    """A local binary ephemeris kernel made of Chebyshev segments.
+
+    The file is memory-mapped, so only the records needed for a lookup are
+    ever read from disk. Segments are indexed by target and start time, and
+    lookups over arrays of times use a binary search into that index.
+
+    ### File layout (little-endian)
+
+    ```
+    header      magic "VPEPHEM1", version (u4), num_segments (u4), directory_offset (u8)
+    records     float64 coefficient records for each segment
+    directory   one entry per segment: target, center, data_type, degree,
+                start, stop, init, interval, num_records, data_offset
+    ```
+
+    Each record covers `interval` time units starting at `init + k * interval` and
+    holds `[mid, radius, cx_0..cx_n, cy_0..cy_n, cz_0..cz_n]` (as in SPK type 2).
+    For orientation segments the three components are the 3-1-3 Euler angles
+    `(phi, delta, w)` of the inertial-to-body-fixed rotation (as in binary PCK type 2).
+
+    ### Example
+
+    ```python
+    kernel = EphemerisKernel("models/demo.eph")
+    moon = Body(app, name="Moon", radius=0.5,
+                get_position_vector=kernel.position_function(MOON, observer=EARTH),
+                get_rotation_matrix=kernel.rotation_function(MOON))
+    ```
+    """
+
+    def __init__(self, filename: str):
+        """
+        Open and index a kernel file.
+
+        Args:
+            filename (str): Path to the kernel file (see `write_kernel`).
+
+        Raises:
+            ValueError: If the file is not a valid kernel, or if the segments for
+                one target do not all share the same center.
+        """
+        self.filename = filename
+        self._map = np.memmap(filename, dtype=np.uint8, mode="r")
+
+        if self._map.size < _HEADER_DTYPE.itemsize:
+            raise ValueError(f"{filename} is too small to be an ephemeris kernel")
+        header = np.frombuffer(self._map, dtype=_HEADER_DTYPE, count=1)[0]
+        if header["magic"] != KERNEL_MAGIC:
+            raise ValueError(f"{filename} is not an ephemeris kernel")
+        if header["version"] != KERNEL_VERSION:
+            raise ValueError(f"unsupported ephemeris kernel version {header['version']}")
+
+        self.segments = np.frombuffer(self._map,
+                                      dtype=_SEGMENT_DTYPE,
+                                      count=int(header["num_segments"]),
+                                      offset=int(header["directory_offset"]))
+
+        # views into the mapped file (nothing is read until a record is used)
+        self._records = []
+        for seg in self.segments:
+            record_size = 2 + 3 * (int(seg["degree"]) + 1)
+            self._records.append(np.ndarray((int(seg["num_records"]), record_size),
+                                            dtype="<f8",
+                                            buffer=self._map,
+                                            offset=int(seg["data_offset"])))
+
+        # segment index: (data_type, target) -> (starts, stops, segment numbers) sorted by start
+        self._index = {}
+        self._centers = {}
+        keys = {(int(s["data_type"]), int(s["target"])) for s in self.segments}
+        for key in keys:
+            data_type, target = key
+            ids = np.flatnonzero((self.segments["data_type"] == data_type) &
+                                 (self.segments["target"] == target))
+            ids = ids[np.argsort(self.segments["start"][ids], kind="stable")]
+            self._index[key] = (self.segments["start"][ids].copy(),
+                                self.segments["stop"][ids].copy(),
+                                ids)
+            if data_type == SEGMENT_POSITION:
+                centers = np.unique(self.segments["center"][ids])
+                if len(centers) != 1:
+                    raise ValueError(f"segments for target {target} have different centers: {centers.tolist()}")
+                self._centers[target] = int(centers[0])
+
+    @property
+    def targets(self) -> list:
+        """Targets that have position data in this kernel."""
+        return sorted(self._centers)
+
+    def coverage(self, target: int, data_type: int = SEGMENT_POSITION) -> tuple:
+        """Returns the (start, stop) time span covered by a target's segments."""
+        starts, stops, _ = self._lookup_index(data_type, target)
+        return float(starts[0]), float(stops.max())
+
+    def _lookup_index(self, data_type: int, target: int):
+        try:
+            return self._index[(data_type, target)]
+        except KeyError:
+            kind = "position" if data_type == SEGMENT_POSITION else "orientation"
+            raise ValueError(f"no {kind} data for target {target} in {self.filename}") from None
+
+    def _evaluate(self, data_type: int, target: int, ets: np.ndarray) -> np.ndarray:
+        """Evaluate one target's segments at an array of times. Returns an (N, 3) array."""
+        starts, stops, ids = self._lookup_index(data_type, target)
+
+        # binary search for the segment covering each time
+        k = np.searchsorted(starts, ets, side="right") - 1
+        valid = k >= 0
+        valid[valid] = ets[valid] <= stops[k[valid]]
+        if not np.all(valid):
+            bad = ets[~valid][0]
+            raise ValueError(f"time {bad} is not covered by the segments for target {target}")
+
+        result = np.empty((len(ets), 3))
+        for j in np.unique(k):
+            mask = k == j
+            seg_id = ids[j]
+            seg = self.segments[seg_id]
+            records = self._records[seg_id]
+            t = ets[mask]
+            n = int(seg["degree"]) + 1
+            rec = np.floor((t - seg["init"]) / seg["interval"]).astype(np.int64)
+            rec = np.clip(rec, 0, len(records) - 1)
+            data = records[rec]  # only these rows are paged in
+            x = (t - data[:, 0]) / data[:, 1]
+            coeffs = data[:, 2:].reshape(-1, 3, n)
+            result[mask] = _chebyshev(coeffs, x)
+        return result
+
+    def _position_wrt_root(self, target: int, ets: np.ndarray):
+        """Chains segments from the target up to the root of its center tree."""
+        pos = np.zeros((len(ets), 3))
+        body = target
+        while body in self._centers:
+            pos += self._evaluate(SEGMENT_POSITION, body, ets)
+            body = self._centers[body]
+        return pos, body
+
+    def position(self, target: int, ets, observer: int = None) -> np.ndarray:
+        """
+        Position of a target at one or more times.
+
+        Args:
+            target (int): Target id.
+            ets (float | array): Time or array of times.
+            observer (int, optional): Id of the body to return the position relative to.
+                Segments are chained through their centers as needed.
+                Defaults to the target's own segment center.
+
+        Returns:
+            np.ndarray: shape (3,) for a scalar time, otherwise (N, 3).
+
+        Raises:
+            ValueError: If a time is not covered or the target and observer are not connected.
+        """
+        scalar = np.ndim(ets) == 0
+        ets = np.atleast_1d(np.asarray(ets, dtype=np.float64))
+
+        if observer is None:
+            pos = self._evaluate(SEGMENT_POSITION, target, ets)
+        else:
+            pos_t, root_t = self._position_wrt_root(target, ets)
+            pos_o, root_o = self._position_wrt_root(observer, ets)
+            if root_t != root_o:
+                raise ValueError(f"targets {target} and {observer} do not share a common center")
+            pos = pos_t - pos_o
+
+        return pos[0] if scalar else pos
+
+    def rotation(self, target: int, ets) -> np.ndarray:
+        """
+        Body-fixed to inertial rotation matrix of a target at one or more times.
+
+        This is the same convention as `Body.get_rotation_matrix`.
+
+        Returns:
+            np.ndarray: shape (3, 3) for a scalar time, otherwise (N, 3, 3).
+        """
+        scalar = np.ndim(ets) == 0
+        ets = np.atleast_1d(np.asarray(ets, dtype=np.float64))
+        angles = self._evaluate(SEGMENT_ORIENTATION, target, ets)
+        mats = np.swapaxes(_euler313_to_matrix(angles), 1, 2)  # inertial->body, transposed
+        return mats[0] if scalar else mats
+
+    def position_function(self, target: int, observer: int = None, scale: float = 1.0):
+        """Returns a callable for `Body(get_position_vector=...)`. See `EphemerisFunction`."""
+        return EphemerisFunction(lambda ets: self.position(target, ets, observer) * scale)
+
+    def rotation_function(self, target: int):
+        """Returns a callable for `Body(get_rotation_matrix=...)`."""
+        return EphemerisFunction(lambda ets: self.rotation(target, ets))
+
+    def orbit_json(self, target: int, ets, observer: int = None, scale: float = 1.0) -> dict:
+        """
+        Sample a target into the trajectory dict accepted by `Path(orbit_json=...)`.
+
+        Args:
+            target (int): Target id.
+            ets (array): Times to sample.
+            observer (int, optional): Body to return positions relative to.
+            scale (float, optional): Multiplier applied to the positions (e.g. 1/1000 for km to scene units).
+        """
+        ets = np.asarray(ets, dtype=np.float64)
+        pos = self.position(target, ets, observer) * scale
+        return {"t": ets.tolist(), "x": pos[:, 0].tolist(), "y": pos[:, 1].tolist(), "z": pos[:, 2].tolist()}
+
+    def close(self):
+        """Release the memory map."""
+        self._records = []
+        self.segments = None
+        self._map = None
+
+
+class EphemerisFunction:
+    """A kernel lookup usable as a `Body` position or rotation hook.
+
+    It can be called with a single time (as `Body` does every frame) or with
+    an array of times, in which case the whole array is evaluated in one
+    batched lookup (`vectorized` is checked by `Body` when it samples its trajectory).
+    """
+
+    vectorized = True
+
+    def __init__(self, func):
+        self._func = func
+
+    def __call__(self, et):
+        return self._func(et)
+
+
+def _chebyshev(coeffs: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Clenshaw evaluation of (M, 3, n) coefficients at M points in [-1, 1]."""
+    x = x[:, np.newaxis]
+    b1 = np.zeros(coeffs.shape[:2])
+    b2 = np.zeros(coeffs.shape[:2])
+    for j in range(coeffs.shape[2] - 1, 0, -1):
+        b1, b2 = 2.0 * x * b1 - b2 + coeffs[:, :, j], b1
+    return x * b1 - b2 + coeffs[:, :, 0]
+
+
+def _euler313_to_matrix(angles: np.ndarray) -> np.ndarray:
+    """Inertial to body-fixed matrices R3(w) R1(delta) R3(phi) for (N, 3) angles."""
+    phi, delta, w = angles[:, 0], angles[:, 1], angles[:, 2]
+    cp, sp = np.cos(phi), np.sin(phi)
+    cd, sd = np.cos(delta), np.sin(delta)
+    cw, sw = np.cos(w), np.sin(w)
+    m = np.empty((len(angles), 3, 3))
+    m[:, 0, 0] = cw * cp - sw * cd * sp
+    m[:, 0, 1] = cw * sp + sw * cd * cp
+    m[:, 0, 2] = sw * sd
+    m[:, 1, 0] = -sw * cp - cw * cd * sp
+    m[:, 1, 1] = -sw * sp + cw * cd * cp
+    m[:, 1, 2] = cw * sd
+    m[:, 2, 0] = sd * sp
+    m[:, 2, 1] = -sd * cp
+    m[:, 2, 2] = cd
+    return m
+
+
+def _matrix_to_euler313(mats: np.ndarray) -> np.ndarray:
+    """Inverse of `_euler313_to_matrix` for (N, 3, 3) inertial to body-fixed matrices."""
+    delta = np.arccos(np.clip(mats[:, 2, 2], -1.0, 1.0))
+    phi = np.arctan2(mats[:, 2, 0], -mats[:, 2, 1])
+    w = np.arctan2(mats[:, 0, 2], mats[:, 1, 2])
+    # at the singularity (delta = 0 or pi) put the whole rotation in phi
+    singular = np.abs(np.sin(delta)) < 1e-12
+    phi[singular] = np.arctan2(mats[singular, 0, 1], mats[singular, 0, 0])
+    w[singular] = 0.0
+    return np.stack([phi, delta, w], axis=1)
+
+
+def fit_segment(func,
+                target: int,
+                start: float,
+                stop: float,
+                center: int = 0,
+                num_records: int = 16,
+                degree: int = 12,
+                data_type: int = SEGMENT_POSITION) -> dict:
+    """
+    Fit a function of time with Chebyshev records to make a kernel segment.
+
+    Args:
+        func (Callable): Function of time. For position segments it returns a 3-vector,
+            for orientation segments a body-fixed to inertial 3x3 rotation matrix
+            (i.e. the same as the `Body` position and rotation hooks).
+        target (int): Target id.
+        start (float): Start time of the segment.
+        stop (float): Stop time of the segment.
+        center (int, optional): Center id the positions are relative to. Defaults to 0.
+        num_records (int, optional): Number of equal-length records. Defaults to 16.
+        degree (int, optional): Chebyshev polynomial degree. Defaults to 12.
+        data_type (int, optional): `SEGMENT_POSITION` or `SEGMENT_ORIENTATION`.
+
+    Returns:
+        dict: The segment, for `write_kernel`.
+    """
+    if stop <= start:
+        raise ValueError("segment stop must be after start")
+    n = degree + 1
+    interval = (stop - start) / num_records
+    radius = interval / 2.0
+    nodes = -np.cos(np.pi * (np.arange(n) + 0.5) / n)  # ascending in [-1, 1]
+
+    records = np.empty((num_records, 2 + 3 * n))
+    for k in range(num_records):
+        mid = start + (k + 0.5) * interval
+        ts = mid + radius * nodes
+        values = np.array([func(t) for t in ts], dtype=np.float64)
+        if data_type == SEGMENT_ORIENTATION:
+            # angles of the inertial->body rotation, unwrapped across the record
+            values = _matrix_to_euler313(np.swapaxes(values, 1, 2))
+            values = np.unwrap(values, axis=0)
+        coeffs = np.polynomial.chebyshev.chebfit(nodes, values, degree)  # (n, 3)
+        records[k, 0] = mid
+        records[k, 1] = radius
+        records[k, 2:] = coeffs.T.ravel()
+
+    return {"target": target,
+            "center": center,
+            "data_type": data_type,
+            "degree": degree,
+            "start": start,
+            "stop": stop,
+            "init": start,
+            "interval": interval,
+            "records": records}
+
+
+def write_kernel(filename: str, segments: list) -> None:
+    """
+    Write segments (see `fit_segment`) to a kernel file readable by `EphemerisKernel`.
+
+    Args:
+        filename (str): Output file name.
+        segments (list): List of segment dicts.
+    """
+    directory = np.zeros(len(segments), dtype=_SEGMENT_DTYPE)
+    offset = _HEADER_DTYPE.itemsize
+    for i, seg in enumerate(segments):
+        records = np.ascontiguousarray(seg["records"], dtype="<f8")
+        if records.shape[1] != 2 + 3 * (seg["degree"] + 1):
+            raise ValueError("segment records do not match the segment degree")
+        for name in ("target", "center", "data_type", "degree", "start", "stop", "init", "interval"):
+            directory[i][name] = seg[name]
+        directory[i]["num_records"] = records.shape[0]
+        directory[i]["data_offset"] = offset
+        offset += records.nbytes
+
+    header = np.zeros(1, dtype=_HEADER_DTYPE)
+    header["magic"] = KERNEL_MAGIC
+    header["version"] = KERNEL_VERSION
+    header["num_segments"] = len(segments)
+    header["directory_offset"] = offset
+
+    with open(filename, "wb") as f:
+        f.write(header.tobytes())
+        for seg in segments:
+            f.write(np.ascontiguousarray(seg["records"], dtype="<f8").tobytes())
+        f.write(directory.tobytes())
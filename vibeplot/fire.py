@@ -1,8 +1,5 @@
 from panda3d.core import Point3, Vec4, NodePath
-from direct.particles.ParticleEffect import ParticleEffect
-from direct.particles.Particles import Particles
 from direct.showbase.ShowBase import ShowBase
-from panda3d.physics import BaseParticleRenderer, BaseParticleEmitter
 
 class FireEffect:
     def __init__(
@@ -36,6 +33,8 @@ class FireEffect:
         self.intensity = intensity
 
         if self.parent.enable_particles:
+            # the particle system is only imported when it is used
+            from direct.particles.ParticleEffect import ParticleEffect
             self.effect = ParticleEffect()
             self._setup_particles()
         else:
@@ -46,6 +45,9 @@ class FireEffect:
         """
         Sets up and starts the fire particle effect.
         """
+        from direct.particles.Particles import Particles
+        from panda3d.physics import BaseParticleRenderer, BaseParticleEmitter
+
         particles = Particles('fire')
         particles.setFactory("PointParticleFactory")
         particles.setRenderer("SpriteParticleRenderer")
@@ -0,0 +1,301 @@
+import numpy as np
+from panda3d.core import (GeomVertexFormat, GeomVertexArrayFormat, GeomVertexData, GeomTriangles, GeomNode,
+                          Geom, NodePath, Shader, BoundingSphere, Point3, InternalName)
+
+from .utilities import make_geom_node, _arrow_shaft_mesh, _arrow_head_mesh, _sphere_mesh
+
+GLYPH_SHADER = ("models/instanced_glyph.vert", "models/instanced_glyph.frag")
+
+
+def arrow_glyph_mesh(segments: int = 12) -> tuple:
+    """
+    Mesh of an arrow glyph for `InstancedGlyphs`: a shaft of radius 1 from y=0 to
+    y=1, and a head of radius 2 from y=1 to y=2 (so the shaft can be stretched
+    while the head keeps its length).
+
+    Returns:
+        tuple: ((n, 3) vertices, (m, 3) triangles)
+    """
+    shaft_vertices, _, shaft_tris = _arrow_shaft_mesh(1.0, 1.0, segments)
+    head_vertices, _, head_tris = _arrow_head_mesh(1.0, 2.0, segments)
+    return (np.vstack((shaft_vertices, head_vertices + (0, 1, 0))),
+            np.vstack((shaft_tris, head_tris + len(shaft_vertices))))
+
+
+def sphere_glyph_mesh(num_lat: int = 8, num_lon: int = 16) -> tuple:
+    """
+    Mesh of a unit sphere glyph for `InstancedGlyphs`.
+
+    Returns:
+        tuple: ((n, 3) vertices, (m, 3) triangles)
+    """
+    vertices, _, tris = _sphere_mesh(num_lat, num_lon)
+    return vertices, tris
+
+
+class InstancedGlyphs:
+    """
+    Many copies of one small mesh (arrows, markers, ...) drawn as a single Geom.
+
+    Each instance has a position, a direction (the +Y axis of the mesh is
+    rotated onto it), a length and a color, given as NumPy arrays. With
+    hardware instancing, the mesh is uploaded once and the instances are a
+    per-instance vertex array read by a vertex shader, so:
+
+      * `set_scale` (a multiplier of the lengths) and `set_thickness` only change
+        shader inputs, and the node's color scale (`root.setColorScale`) tints
+        all the glyphs,
+      * `set_filter` (which instances are drawn) only rewrites the instance array.
+
+    In both cases no node is created or removed. Without shader support, the
+    instances are expanded into a single regular Geom on the CPU instead (which
+    is rebuilt when one of the above changes).
+
+    There are two kinds of glyphs:
+
+      * `head_length=None`: the mesh is scaled uniformly by the length (e.g. a
+        sphere of radius `length`),
+      * `head_length` given: arrows. The mesh must be like `arrow_glyph_mesh`:
+        the part below y=1 (the shaft) is stretched to `length - head_length`,
+        the part above (the head) keeps the length `head_length`, and the width
+        is `thickness`. Arrows shorter than the head are split 70/30 between the
+        shaft and the head, like `create_arrow_with_endpoints`. With
+        `head_length <= 0` the arrows have no head: the shaft is the whole
+        length and the head of the mesh is collapsed onto the tip.
+    """
+
+    def __init__(self, parent, mesh: tuple, head_length: float = None, thickness: float = 1.0,
+                 name: str = "glyphs", node: NodePath = None, use_instancing: bool = None):
+        """
+        Args:
+            parent (ShowBase): The app.
+            mesh (tuple): (vertices, triangles) of the glyph, pointing along +Y.
+            head_length (float, optional): Length of the arrow heads (<= 0 for no heads), or None for uniformly
+                scaled glyphs. Defaults to None.
+            thickness (float, optional): Width of the arrows (ignored for uniformly scaled glyphs). Defaults to 1.0.
+            name (str, optional): Name of the node. Defaults to "glyphs".
+            node (NodePath, optional): Node to attach the glyphs to (the positions are in its
+                coordinate system). Defaults to None (`parent.render`).
+            use_instancing (bool, optional): Use hardware instancing. Defaults to None
+                (if the graphics card supports it).
+        """
+        self.mesh = (np.asarray(mesh[0], dtype=float), np.asarray(mesh[1]))
+        self.head_length = head_length
+        self.thickness = thickness
+        self.scale = 1.0
+        self.name = name
+        self.root = (parent.render if node is None else node).attachNewNode(name)
+        if head_length is not None:
+            self.root.setTwoSided(True)  # the shafts are open cylinders
+        self.positions = np.zeros((0, 3))
+        self.directions = np.zeros((0, 3))
+        self.lengths = np.zeros(0)
+        self.colors = np.zeros((0, 4))
+        self.mask = None  # the instances drawn (None: all)
+        self._node = None
+
+        if use_instancing is None:
+            gsg = parent.win.getGsg() if parent.win is not None else None
+            use_instancing = gsg is not None and gsg.getSupportsGlsl() and gsg.getSupportsGeometryInstancing()
+        shader = Shader.load(Shader.SL_GLSL, *GLYPH_SHADER) if use_instancing else None
+        if use_instancing and shader is None:
+            print(f"Warning: could not load {GLYPH_SHADER[0]}, {name} are not instanced")
+        self.use_instancing = shader is not None
+        if self.use_instancing:
+            self._create_instanced_node(shader)
+
+    def _create_instanced_node(self, shader: Shader):
+        """The mesh (array 0) plus an empty per-instance array (array 1)."""
+        instance_array = GeomVertexArrayFormat()
+        instance_array.addColumn(InternalName.make("instance_position"), 4, Geom.NT_float32, Geom.C_other)
+        instance_array.addColumn(InternalName.make("instance_axis"), 4, Geom.NT_float32, Geom.C_other)
+        instance_array.addColumn(InternalName.make("instance_color"), 4, Geom.NT_float32, Geom.C_other)
+        instance_array.setDivisor(1)
+        vertex_format = GeomVertexFormat()
+        vertex_format.addArray(GeomVertexFormat.getV3().getArray(0))
+        vertex_format.addArray(instance_array)
+        vertex_format = GeomVertexFormat.registerFormat(vertex_format)
+
+        vertices, triangles = self.mesh
+        vdata = GeomVertexData(self.name, vertex_format, Geom.UHStatic)
+        vdata.uncleanSetNumRows(len(vertices))
+        vdata.modifyArrayHandle(0).copyDataFrom(np.ascontiguousarray(vertices, dtype=np.float32))
+        prim = GeomTriangles(Geom.UHStatic)
+        prim.setIndexType(Geom.NT_uint32)
+        indices = np.ascontiguousarray(triangles, dtype=np.uint32).ravel()
+        index_array = prim.modifyVertices()
+        index_array.uncleanSetNumRows(len(indices))
+        index_array.modifyHandle().copyDataFrom(indices)
+        geom = Geom(vdata)
+        geom.addPrimitive(prim)
+        node = GeomNode(self.name)
+        node.addGeom(geom)
+
+        self._node = self.root.attachNewNode(node)
+        self._node.setShader(shader)
+        self._update_shader_inputs()
+
+    def set_instances(self, positions, directions=None, lengths=None, colors=(1, 1, 1, 1)):
+        """
+        Replace all the instances. This clears the filter.
+
+        Args:
+            positions (array-like): (n, 3) positions.
+            directions (array-like, optional): (n, 3) directions (normalized here; +Z for zero vectors).
+                Defaults to None (+Z).
+            lengths (array-like, optional): (n,) lengths, or a single value. Defaults to None (1).
+            colors (array-like, optional): (n, 4) RGBA colors, or a single color. Defaults to white.
+        """
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        n = len(self.positions)
+        if directions is None:
+            directions = np.broadcast_to((0.0, 0.0, 1.0), (n, 3))
+        directions = np.asarray(directions, dtype=float).reshape(-1, 3)
+        norms = np.linalg.norm(directions, axis=1)[:, None]
+        self.directions = np.where(norms > 0, directions / np.where(norms > 0, norms, 1.0), (0.0, 0.0, 1.0))
+        self.lengths = np.broadcast_to(np.asarray(1.0 if lengths is None else lengths, dtype=float), (n,)).copy()
+        self.colors = np.broadcast_to(np.asarray(colors, dtype=float), (n, 4)).copy()
+        self.mask = None
+        self._update()
+
+    def set_filter(self, mask=None):
+        """
+        Choose which instances are drawn.
+
+        Args:
+            mask (array-like, optional): (n,) bool array, or None to draw all the instances.
+        """
+        self.mask = None if mask is None else np.asarray(mask, dtype=bool)
+        self._update()
+
+    def set_colors(self, colors):
+        """
+        Change the colors of the instances.
+
+        Args:
+            colors (array-like): (n, 4) RGBA colors, or a single color.
+        """
+        self.colors = np.broadcast_to(np.asarray(colors, dtype=float), (len(self.positions), 4)).copy()
+        self._update()
+
+    def set_scale(self, scale: float):
+        """Multiply all the lengths by `scale`."""
+        self.scale = scale
+        if self.use_instancing:
+            self._update_shader_inputs()
+            self._update_bounds()
+        else:
+            self._update()
+
+    def set_thickness(self, thickness: float):
+        """Set the width of the arrows."""
+        self.thickness = thickness
+        if self.use_instancing:
+            self._update_shader_inputs()
+            self._update_bounds()
+        else:
+            self._update()
+
+    def remove(self):
+        self.root.removeNode()
+
+    @property
+    def num_drawn(self) -> int:
+        """Number of instances drawn."""
+        return len(self.positions) if self.mask is None else int(self.mask.sum())
+
+    def _selected(self) -> tuple:
+        """Positions, directions, lengths and colors of the instances drawn."""
+        if self.mask is None:
+            return self.positions, self.directions, self.lengths, self.colors
+        return self.positions[self.mask], self.directions[self.mask], self.lengths[self.mask], self.colors[self.mask]
+
+    def _glyph_params(self) -> tuple:
+        """The `glyph_params` input of the shader."""
+        if self.head_length is None:
+            return (self.scale, self.thickness, 0.0, 0.0)
+        return (self.scale, self.thickness, max(self.head_length, 0.0), 1.0)
+
+    def _update_shader_inputs(self):
+        self._node.setShaderInput("glyph_params", self._glyph_params())
+
+    def _update(self):
+        if self.use_instancing:
+            self._update_instances()
+        else:
+            self._update_geometry()
+
+    def _update_instances(self):
+        """Rewrite the per-instance array."""
+        positions, directions, lengths, colors = self._selected()
+        data = np.zeros((len(positions), 12), dtype=np.float32)
+        data[:, 0:3] = positions
+        data[:, 3] = 1.0
+        data[:, 4:7] = directions
+        data[:, 7] = lengths
+        data[:, 8:12] = colors
+        instance_array = self._node.node().modifyGeom(0).modifyVertexData().modifyArray(1)
+        instance_array.uncleanSetNumRows(len(data))
+        instance_array.modifyHandle().copyDataFrom(data)
+        self._node.setInstanceCount(len(data))
+        # (an instance count of 0 would mean "not instanced")
+        if len(data):
+            self._node.show()
+        else:
+            self._node.hide()
+        self._update_bounds()
+
+    def _update_bounds(self):
+        """The bounds of the mesh alone don't cover the instances, so they are set explicitly."""
+        positions, _, lengths, _ = self._selected()
+        if not len(positions):
+            return
+        center = positions.mean(axis=0)
+        extent = np.abs(self.mesh[0]).max() * max(self.thickness, 1.0)
+        radius = np.linalg.norm(positions - center, axis=1).max() + (lengths.max() * self.scale + 1.0) * extent
+        self._node.node().setBounds(BoundingSphere(Point3(*center), float(radius)))
+
+    def _transform(self, positions, directions, lengths) -> np.ndarray:
+        """The vertices of all the instances, (num instances, num mesh vertices, 3). Same math as the shader."""
+        y = directions
+        helper = np.where((np.abs(y[:, 2]) < 0.9)[:, None], (0.0, 0.0, 1.0), (1.0, 0.0, 0.0))
+        x = np.cross(helper, y)
+        x /= np.linalg.norm(x, axis=1)[:, None]
+        z = np.cross(x, y)
+        v = self.mesh[0]
+        lengths = lengths * self.scale
+        if self.head_length is None:
+            along = v[None, :, 1] * lengths[:, None]
+            width = lengths[:, None]
+        else:
+            if self.head_length > 0:
+                head = np.where(lengths >= self.head_length, self.head_length, 0.3 * lengths)[:, None]
+            else:
+                head = np.zeros_like(lengths[:, None])
+            shaft = lengths[:, None] - head
+            along = np.where(v[None, :, 1] <= 1.0, v[None, :, 1] * shaft, shaft + (v[None, :, 1] - 1.0) * head)
+            # no head: the head (and its base, of radius 2) is collapsed onto the tip
+            in_head = (v[:, 1] > 1.0) | (np.hypot(v[:, 0], v[:, 2]) > 1.5)
+            width = np.where((head <= 0.0) & in_head[None, :], 0.0, self.thickness)
+        return (positions[:, None, :]
+                + (v[None, :, 0] * width)[:, :, None] * x[:, None, :]
+                + along[:, :, None] * y[:, None, :]
+                + (v[None, :, 2] * width)[:, :, None] * z[:, None, :])
+
+    def _update_geometry(self):
+        """CPU fallback: expand all the instances into one Geom."""
+        if self._node is not None:
+            self._node.removeNode()
+            self._node = None
+        positions, directions, lengths, colors = self._selected()
+        if not len(positions):
+            return
+        vertices = self._transform(positions, directions, lengths)
+        num_vertices = self.mesh[0].shape[0]
+        triangles = (self.mesh[1][None, :, :] + num_vertices * np.arange(len(positions))[:, None, None]).reshape(-1, 3)
+        node = make_geom_node(self.name, GeomVertexFormat.getV3c4(),
+                              {'vertex': vertices.reshape(-1, 3),
+                               'color': np.repeat(colors, num_vertices, axis=0)},
+                              triangles)
+        self._node = self.root.attachNewNode(node)
+
@@ -0,0 +1,320 @@
+import numpy as np
+from direct.task import Task
+from panda3d.core import (TextNode, NodePath, GeomVertexFormat, TextureAttrib, TransparencyAttrib)
+
+from .utilities import make_geom_node
+
+PIXELS_PER_LABEL_SCALE = 40  # label size in pixels for a `label_scale` of 1
+MIN_LABEL_PIXELS = 10  # smallest label size, in pixels
+
+
+def label_pixels(label_scale: float) -> float:
+    """Convert a `label_scale` (the scale of the former billboarded labels) to a text size in pixels."""
+    return max(MIN_LABEL_PIXELS, label_scale * PIXELS_PER_LABEL_SCALE)
+
+
+class Label:
+    """
+    A text label drawn by a `LabelManager` at a point of the scene.
+
+    Created with `LabelManager.add`. The attributes can be changed at any time,
+    except the anchor, which is changed with `set_anchor`.
+    """
+
+    def __init__(self, manager, text: str, node: NodePath, point, color, size: float, priority: float,
+                 pixel_offset, occlude: bool):
+        self.manager = manager
+        self.text = text
+        self.node = node
+        self.point = tuple(point)
+        self.color = tuple(color)
+        self.size = size
+        self.priority = priority
+        self.pixel_offset = tuple(pixel_offset)
+        self.occlude = occlude
+        self.enabled = True
+
+    def set_anchor(self, node: NodePath, point=(0, 0, 0)):
+        """Attach the label to `point`, in the coordinate system of `node`."""
+        self.node = node
+        self.point = tuple(point)
+        self.manager._dirty = True
+
+    def show(self):
+        self.enabled = True
+
+    def hide(self):
+        self.enabled = False
+
+    def remove(self):
+        self.manager.remove(self)
+
+
+class LabelManager:
+    """
+    Draws the text labels of the scene in screen space.
+
+    Rather than one billboarded `TextNode` per label, all the labels are handled
+    by one task every frame:
+
+      * the anchor points are projected to the screen, in one vectorized pass
+        per anchor node (e.g. all the star names at once),
+      * labels outside the window, behind the camera, or hidden behind one of
+        the occluders (the bodies' spheres) are culled,
+      * the remaining labels are placed in order of priority, skipping the ones
+        that would overlap a label already placed (using a grid of screen
+        cells), up to `max_labels`,
+      * the survivors are drawn as a single Geom per font texture.
+
+    The labels have a constant size in pixels, and keep being updated while the
+    scene is paused.
+
+    Use `get_label_manager` to get the manager of an app.
+    """
+
+    def __init__(self, parent, max_labels: int = 150, cell_size: int = 64, padding: int = 2):
+        """
+        Args:
+            parent (ShowBase): The app.
+            max_labels (int, optional): Maximum number of labels drawn. Defaults to 150.
+            cell_size (int, optional): Size of the cells of the overlap grid, in pixels. Defaults to 64.
+            padding (int, optional): Minimum gap between labels, in pixels. Defaults to 2.
+        """
+        self.parent = parent
+        self.max_labels = max_labels
+        self.cell_size = cell_size
+        self.padding = padding
+        self.labels = []
+        self.occluders = []  # list of (NodePath, radius)
+        self.visible = True
+        self.visible_labels = []  # the labels drawn in the last frame
+        self.root = parent.pixel2d.attachNewNode("labels")
+        self.root.setTransparency(TransparencyAttrib.MAlpha)
+        self.root.setBin("fixed", 100)
+        self.root.setDepthTest(False)
+        self.root.setDepthWrite(False)
+        self._text_node = TextNode("label_text")
+        self._text_node.setAlign(TextNode.ACenter)
+        self._glyphs = {}  # text -> (vertices, texcoords, triangles, texture, width, top, bottom)
+        self._groups = []  # list of (anchor node, [labels], (n, 4) points)
+        self._dirty = True
+        self._geom_nodes = []
+        parent.add_task(self.update_task, "LabelManagerTask", nopause=True)
+
+    def add(self, text: str, node: NodePath, point=(0, 0, 0), color=(1, 1, 1, 1), size: float = 14,
+            priority: float = 0.0, pixel_offset=(0, 0), occlude: bool = True) -> Label:
+        """
+        Add a label.
+
+        Args:
+            text (str): The text.
+            node (NodePath): The node the label is attached to (it follows it).
+            point (tuple, optional): Position of the label in the coordinate system of `node`. Defaults to (0, 0, 0).
+            color (tuple, optional): RGBA color. Defaults to (1, 1, 1, 1).
+            size (float, optional): Height of the text, in pixels. Defaults to 14.
+            priority (float, optional): Labels with a higher priority are placed first. Defaults to 0.
+            pixel_offset (tuple, optional): Offset of the text from the projected point, in
+                pixels (x right, y up). Defaults to (0, 0) (centered on the point).
+            occlude (bool, optional): Hide the label when it is behind an occluder. Defaults to True.
+        Returns:
+            Label: The label.
+        """
+        label = Label(self, text, node, point, color, size, priority, pixel_offset, occlude)
+        self.labels.append(label)
+        self._dirty = True
+        return label
+
+    def remove(self, label: Label):
+        """Remove a label."""
+        if label in self.labels:
+            self.labels.remove(label)
+            self._dirty = True
+
+    def add_occluder(self, node: NodePath, radius: float):
+        """Labels behind the sphere of radius `radius` centered on `node` are hidden."""
+        self.occluders.append((node, radius))
+
+    def remove_occluder(self, node: NodePath):
+        self.occluders = [(n, r) for n, r in self.occluders if n != node]
+
+    def set_visible(self, visible: bool):
+        """Show or hide all the labels."""
+        self.visible = visible
+
+    def _update_groups(self):
+        """Group the labels by anchor node, so they are projected together."""
+        groups = {}
+        for label in self.labels:
+            groups.setdefault(label.node, []).append(label)
+        self._groups = [(node, labels, np.array([(*l.point, 1.0) for l in labels]))
+                        for node, labels in groups.items()]
+        self._dirty = False
+
+    def _glyph_geometry(self, text: str) -> tuple:
+        """The triangles of a text, with a height of 1 (cached)."""
+        glyphs = self._glyphs.get(text)
+        if glyphs is None:
+            self._text_node.setText(text)
+            text_np = NodePath(self._text_node.generate())
+            text_np.flattenStrong()
+            vertices, texcoords, triangles, texture = np.zeros((0, 2)), np.zeros((0, 2)), np.zeros((0, 3), int), None
+            geom_nodes = text_np.findAllMatches("**/+GeomNode")
+            if text_np.node().isGeomNode():
+                geom_nodes = [text_np] + list(geom_nodes)
+            for geom_np in geom_nodes:
+                geom_node = geom_np.node()
+                if geom_node.getNumGeoms() == 0:
+                    continue
+                geom = geom_node.getGeom(0).decompose()
+                array_format = geom.getVertexData().getFormat().getArray(0)
+                data = np.frombuffer(memoryview(geom.getVertexData().getArray(0)), dtype=np.float32)
+                data = data.reshape(-1, array_format.getStride() // 4)
+                vertex = array_format.getColumn("vertex").getStart() // 4
+                texcoord = array_format.getColumn("texcoord").getStart() // 4
+                prim = geom.getPrimitive(0)
+                triangles = np.array([prim.getVertex(i) for i in range(prim.getNumVertices())]).reshape(-1, 3)
+                vertices = data[:, [vertex, vertex + 2]].astype(float)  # (x, z): the text is in the XZ plane
+                texcoords = data[:, texcoord:texcoord + 2].astype(float)
+                texture = geom_node.getGeomState(0).getAttrib(TextureAttrib).getTexture()
+                break  # the text of a single line is one Geom after flattening
+            glyphs = (vertices, texcoords, triangles, texture, self._text_node.getWidth(),
+                      self._text_node.getTop(), self._text_node.getBottom())
+            self._glyphs[text] = glyphs
+        return glyphs
+
+    def _project(self, cam: NodePath, width: int, height: int) -> tuple:
+        """
+        Project the anchor points of all the labels.
+
+        Only the transform to camera space is done per anchor node; the
+        culling and the projection are done for all the labels at once.
+
+        Returns:
+            tuple: (labels, (n, 2) pixel positions, (n,) bool visible)
+        """
+        labels, cam_points, shown = [], [], []
+        for node, group_labels, points in self._groups:
+            if node.isEmpty():
+                continue
+            labels.extend(group_labels)
+            cam_points.append(points @ np.array(node.getMat(cam)))
+            shown.append(np.full(len(group_labels), not node.isHidden()))
+        if not labels:
+            return [], np.zeros((0, 2)), np.zeros(0, dtype=bool)
+        cam_points = np.concatenate(cam_points)
+        clip = cam_points @ np.array(cam.node().getLens().getProjectionMat())
+        w = clip[:, 3]
+        in_front = w > 1e-9
+        ndc = clip[:, :2] / np.where(in_front, w, 1.0)[:, None]
+        visible = np.concatenate(shown) & in_front & (np.abs(ndc) <= 1.05).all(axis=1)
+        visible &= np.array([label.enabled for label in labels])
+        occluders = [(node.getPos(cam), radius) for node, radius in self.occluders if not node.isEmpty()]
+        if occluders:
+            occlude = np.array([label.occlude for label in labels])
+            visible &= ~(occlude & self._occluded(cam_points[:, :3], occluders))
+        pixels = np.column_stack(((ndc[:, 0] + 1) / 2 * width, (1 - ndc[:, 1]) / 2 * height))
+        return labels, pixels, visible
+
+    @staticmethod
+    def _occluded(points: np.ndarray, occluders: list) -> np.ndarray:
+        """True for the points (in camera space) hidden behind one of the occluder spheres."""
+        centers = np.array([center for center, _ in occluders])  # (m, 3)
+        radii = np.array([radius for _, radius in occluders])
+        distances = np.linalg.norm(points, axis=1)
+        directions = points / np.maximum(distances, 1e-12)[:, None]
+        along = directions @ centers.T  # (n, m) distance to the closest approach of each sphere center
+        gap2 = (centers ** 2).sum(axis=1) - along ** 2
+        entry = along - np.sqrt(np.maximum(radii ** 2 - gap2, 0))
+        # (points on the sphere itself, e.g. cities, are not hidden by it)
+        hidden = (gap2 < radii ** 2) & (entry > 0) & (entry < distances[:, None] - 1e-3 * radii)
+        return hidden.any(axis=1)
+
+    def _place(self, labels: list, pixels: np.ndarray, visible: np.ndarray) -> list:
+        """
+        Choose the labels to draw: by priority, skipping the ones overlapping a
+        label already placed.
+
+        Returns:
+            list: (label, x, y) of the labels placed, where (x, y) is the middle of
+            the baseline of the text, in pixels (y down).
+        """
+        candidates = np.flatnonzero(visible)
+        candidates = sorted(candidates, key=lambda i: -labels[i].priority)
+        grid = {}
+        placed = []
+        pad = self.padding
+        for i in candidates:
+            if len(placed) >= self.max_labels:
+                break
+            label = labels[i]
+            _, _, _, _, text_width, top, bottom = self._glyph_geometry(label.text)
+            x = pixels[i, 0] + label.pixel_offset[0]
+            y = pixels[i, 1] - label.pixel_offset[1]
+            rect = (x - text_width * label.size / 2 - pad, y - top * label.size - pad,
+                    x + text_width * label.size / 2 + pad, y - bottom * label.size + pad)
+            cells = [(cx, cy)
+                     for cx in range(int(rect[0] // self.cell_size), int(rect[2] // self.cell_size) + 1)
+                     for cy in range(int(rect[1] // self.cell_size), int(rect[3] // self.cell_size) + 1)]
+            if any(r[0] < rect[2] and rect[0] < r[2] and r[1] < rect[3] and rect[1] < r[3]
+                   for cell in cells for r in grid.get(cell, ())):
+                continue
+            for cell in cells:
+                grid.setdefault(cell, []).append(rect)
+            placed.append((label, x, y))
+        return placed
+
+    def _draw(self, placed: list):
+        """Replace the text geometry with the labels `placed`, one Geom per font texture."""
+        for geom_np in self._geom_nodes:
+            geom_np.removeNode()
+        self._geom_nodes = []
+        batches = {}  # texture -> lists of arrays
+        for label, x, y in placed:
+            vertices, texcoords, triangles, texture, *_ = self._glyph_geometry(label.text)
+            if not len(vertices):
+                continue
+            batch = batches.setdefault(texture, ([], [], [], [], [0]))
+            positions = np.column_stack((x + label.size * vertices[:, 0],
+                                         np.zeros(len(vertices)),
+                                         -y + label.size * vertices[:, 1]))
+            batch[0].append(positions)
+            batch[1].append(texcoords)
+            batch[2].append(np.broadcast_to(label.color, (len(vertices), 4)))
+            batch[3].append(triangles + batch[4][0])
+            batch[4][0] += len(vertices)
+        for texture, (positions, texcoords, colors, triangles, _) in batches.items():
+            node = make_geom_node("labels", GeomVertexFormat.getV3c4t2(),
+                                  {'vertex': np.concatenate(positions), 'color': np.concatenate(colors),
+                                   'texcoord': np.concatenate(texcoords)},
+                                  np.concatenate(triangles))
+            geom_np = self.root.attachNewNode(node)
+            if texture is not None:
+                geom_np.setTexture(texture)
+            self._geom_nodes.append(geom_np)
+
+    def update_task(self, et):
+        """Project, cull, declutter and draw the labels."""
+        win = self.parent.win
+        if not self.visible or win is None:
+            if self._geom_nodes:
+                self._draw([])
+            self.visible_labels = []
+            return Task.cont
+        if self._dirty:
+            self._update_groups()
+        labels, pixels, visible = self._project(self.parent.cam, win.getXSize(), win.getYSize())
+        placed = self._place(labels, pixels, visible)
+        self._draw(placed)
+        self.visible_labels = [label for label, _, _ in placed]
+        return Task.cont
+
+
+def get_label_manager(parent) -> LabelManager:
+    """
+    Returns the `LabelManager` of the app `parent`, creating it if necessary.
+    """
+    manager = getattr(parent, "label_manager", None)
+    if manager is None:
+        manager = LabelManager(parent)
+        parent.label_manager = manager
+    return manager
@@ -0,0 +1,295 @@
+import math
+import heapq
+from collections import OrderedDict
+
+import numpy as np
+from direct.task import Task
+from panda3d.core import GeomVertexFormat, NodePath, Vec3
+
+from .utilities import make_geom_node
+
+# the faces of the cube: (normal, u axis, v axis), with u x v = normal so the triangles face outwards
+CUBE_FACES = [((1, 0, 0), (0, 1, 0), (0, 0, 1)),
+              ((-1, 0, 0), (0, 0, 1), (0, 1, 0)),
+              ((0, 1, 0), (0, 0, 1), (1, 0, 0)),
+              ((0, -1, 0), (1, 0, 0), (0, 0, 1)),
+              ((0, 0, 1), (1, 0, 0), (0, 1, 0)),
+              ((0, 0, -1), (0, 1, 0), (1, 0, 0))]
+
+# patches are (face, level, i, j). the polar faces start at level 1, so that
+# the poles are patch corners and no patch wraps all the way around them.
+ROOT_PATCHES = ([(face, 0, 0, 0) for face in range(4)] +
+                [(face, 1, i, j) for face in (4, 5) for i in range(2) for j in range(2)])
+
+
+class LODSphere:
+    """
+    A sphere mesh whose resolution adapts to the view (a chunked cube-sphere).
+
+    The sphere is the six faces of a cube projected onto the sphere, each face
+    being a quadtree of patches with the same number of quads. The patches
+    near the camera are split into four, so the triangles are spent where they
+    are visible. Which patches are drawn is decided by the `LODManager`, which
+    shares a triangle budget among all the spheres.
+
+    The vertices have the same format and texture coordinates as
+    `create_sphere` (an equirectangular map), so textures and the day/night
+    shader work unchanged.
+    """
+
+    def __init__(self, parent_np: NodePath, radius: float, color=(1, 1, 1, 1),
+                 resolution: int = 8, max_level: int = 10, name: str = "lod_sphere"):
+        """
+        Args:
+            parent_np (NodePath): The node to attach the sphere to.
+            radius (float): Radius of the sphere.
+            color (tuple, optional): RGBA vertex color. Defaults to (1, 1, 1, 1).
+            resolution (int, optional): Number of quads along each side of a patch. Defaults to 8.
+            max_level (int, optional): Maximum depth of the quadtrees. Defaults to 10.
+            name (str, optional): Name of the root node. Defaults to "lod_sphere".
+        """
+        self.radius = radius
+        self.color = color
+        self.resolution = resolution
+        self.max_level = max_level
+        self.root = parent_np.attachNewNode(name)
+        self.enabled = True
+        self.leaves = []  # the patches drawn
+        self._split = set()  # the patches split in the last update (for the hysteresis)
+        self._patches = OrderedDict()  # key -> patch NodePath, least recently used first
+        self._bounds = {}  # key -> (center, bounding radius, unit direction, angular radius)
+
+    @property
+    def patch_triangles(self) -> int:
+        """Number of triangles of a patch (including its skirt)."""
+        return 2 * (self.resolution + 2) ** 2
+
+    @staticmethod
+    def children(key: tuple) -> list:
+        """The four patches of the next level covering the patch `key`."""
+        face, level, i, j = key
+        return [(face, level + 1, 2 * i + di, 2 * j + dj) for dj in range(2) for di in range(2)]
+
+    def _points(self, key: tuple, steps: np.ndarray) -> np.ndarray:
+        """
+        Unit vectors of the points of a patch on a grid of (len(steps), len(steps))
+        points, `steps` going from 0 to 1 across the patch. Rows are along v.
+        """
+        face, level, i, j = key
+        normal, u_axis, v_axis = (np.array(a, dtype=float) for a in CUBE_FACES[face])
+        size = 2.0 / (1 << level)
+        s = -1 + size * (i + steps)
+        t = -1 + size * (j + steps)
+        # equal-angle cube mapping, so the quads have similar sizes on the sphere
+        s, t = np.meshgrid(np.tan(s * np.pi / 4), np.tan(t * np.pi / 4))
+        points = normal + s[..., None] * u_axis + t[..., None] * v_axis
+        return points / np.linalg.norm(points, axis=-1, keepdims=True)
+
+    def bounds(self, key: tuple) -> tuple:
+        """Bounding sphere and normal cone of a patch (cached)."""
+        bounds = self._bounds.get(key)
+        if bounds is None:
+            points = self.radius * self._points(key, np.linspace(0, 1, 5)).reshape(-1, 3)
+            center = points.mean(axis=0)
+            direction = center / np.linalg.norm(center)
+            cos_angles = np.clip(points @ direction / self.radius, -1, 1)
+            bounds = (center, np.linalg.norm(points - center, axis=1).max(), direction, np.arccos(cos_angles.min()))
+            self._bounds[key] = bounds
+        return bounds
+
+    def geometric_error(self, key: tuple) -> float:
+        """Maximum distance between the patch's flat quads and the sphere."""
+        quad_angle = (math.pi / 2) / (1 << key[1]) / self.resolution
+        return self.radius * (1 - math.cos(quad_angle / 2))
+
+    def is_built(self, key: tuple) -> bool:
+        return key in self._patches
+
+    def build(self, key: tuple):
+        """
+        Build the mesh of a patch, with a skirt (a ring of vertices below the
+        edges) hiding the cracks between patches of different levels.
+        """
+        n = self.resolution
+        # index 0 and n+2 are the skirt, at the same points as the edges
+        steps = np.clip(np.arange(n + 3) - 1, 0, n) / n
+        normals = self._points(key, steps)
+        edge = np.zeros((n + 3, n + 3), dtype=bool)
+        edge[[0, -1], :] = edge[:, [0, -1]] = True
+        skirt_depth = 4 * self.geometric_error(key) / self.radius
+        radius = np.where(edge, self.radius * (1 - skirt_depth), self.radius)
+        normals = normals.reshape(-1, 3)
+
+        # equirectangular texture coordinates, as in `create_sphere`
+        u = np.arctan2(normals[:, 1], normals[:, 0]) / (2 * np.pi) % 1.0
+        v = 1 - np.arccos(np.clip(normals[:, 2], -1, 1)) / np.pi
+        pole = np.abs(normals[:, 2]) > 1 - 1e-12
+        if u[~pole].max() - u[~pole].min() > 0.5:
+            u[u < 0.5] += 1  # the patch straddles the 0/360 longitude line
+        u[pole] = u[~pole].mean()  # the longitude is undefined at the poles
+
+        rows, cols = np.meshgrid(np.arange(n + 2), np.arange(n + 2), indexing='ij')
+        first = (rows * (n + 3) + cols).ravel()
+        above = first + n + 3
+        tris = np.column_stack((first, first + 1, above + 1, first, above + 1, above)).reshape(-1, 3)
+        node = make_geom_node(f"patch_{'_'.join(map(str, key))}", GeomVertexFormat.getV3n3c4t2(),
+                              {'vertex': radius.reshape(-1, 1) * normals, 'normal': normals,
+                               'color': self.color, 'texcoord': np.column_stack((u, v))},
+                              tris)
+        patch = self.root.attachNewNode(node)
+        patch.stash()
+        self._patches[key] = patch
+
+    def show(self, leaves: list, max_patches: int = 512):
+        """
+        Draw the patches `leaves` (which must be built) and hide the others.
+        Unused patches are kept, up to `max_patches` in all.
+        """
+        shown = set(leaves)
+        for key in self.leaves:
+            if key not in shown and key in self._patches:
+                self._patches[key].stash()
+        for key in leaves:
+            if self._patches[key].isStashed():
+                self._patches[key].unstash()
+            self._patches.move_to_end(key)
+        while len(self._patches) > max(max_patches, len(shown)):
+            key, patch = next(iter(self._patches.items()))
+            if key in shown:
+                break
+            patch.removeNode()
+            del self._patches[key]
+        self.leaves = leaves
+
+    def set_enabled(self, enabled: bool):
+        """Show or hide the sphere (a disabled sphere isn't updated)."""
+        self.enabled = enabled
+        if enabled:
+            self.root.show()
+        else:
+            self.root.hide()
+
+    def destroy(self):
+        self.root.removeNode()
+        self._patches = OrderedDict()
+
+
+class LODManager:
+    """
+    Updates the `LODSphere`s of a scene every frame.
+
+    The patches are refined in order of their error on the screen (the size in
+    pixels of the gap between the flat quads and the true sphere), across all
+    the spheres, as long as the error is above `pixel_error` and the total
+    number of triangles stays within `triangle_budget`. Patches that are out of
+    view (behind the horizon or outside the camera's field of view) are not
+    refined.
+
+    To avoid popping, a patch that is already split is only merged back when
+    its error drops below `pixel_error * (1 - hysteresis)`.
+    """
+
+    def __init__(self, parent, triangle_budget: int = 300000, pixel_error: float = 0.5,
+                 hysteresis: float = 0.3, max_builds_per_frame: int = 32):
+        """
+        Args:
+            parent (ShowBase): The app.
+            triangle_budget (int, optional): Maximum number of triangles of all the spheres.
+                The coarsest level of each sphere is always drawn. Defaults to 300000.
+            pixel_error (float, optional): Patches are split while their error is larger
+                than this (in pixels). Defaults to 0.5.
+            hysteresis (float, optional): Relative margin before split patches are merged. Defaults to 0.3.
+            max_builds_per_frame (int, optional): Maximum number of new patch meshes built
+                in a frame (the refinement continues on the next frames). Defaults to 32.
+        """
+        self.parent = parent
+        self.triangle_budget = triangle_budget
+        self.pixel_error = pixel_error
+        self.hysteresis = hysteresis
+        self.max_builds_per_frame = max_builds_per_frame
+        self.spheres = []
+        self.num_triangles = 0
+        self._task_name = "LODManagerTask"
+
+    def add(self, sphere: LODSphere):
+        """Add a sphere. Its coarsest patches are built right away."""
+        for key in ROOT_PATCHES:
+            sphere.build(key)
+        sphere.show(list(ROOT_PATCHES))
+        if not self.spheres:
+            self.parent.add_task(self.update_task, self._task_name, nopause=True)
+        self.spheres.append(sphere)
+
+    def remove(self, sphere: LODSphere):
+        self.spheres.remove(sphere)
+        if not self.spheres:
+            self.parent.remove_task(self._task_name)
+
+    def update_task(self, et):
+        """Refine the patches of all the spheres for the current view."""
+        cam = self.parent.cam
+        lens = cam.node().getLens()
+        fov_x, fov_y = lens.getFov()
+        half_fov = math.radians(math.hypot(fov_x, fov_y) / 2)
+        pixels_per_radian = self.parent.win.getYSize() / math.radians(fov_y)
+        merge_error = self.pixel_error * (1 - self.hysteresis)
+
+        # a max-heap of the candidate patches by screen error
+        spheres = [s for s in self.spheres if s.enabled]
+        heap = []
+        views = []
+        for index, sphere in enumerate(spheres):
+            camera_pos = np.array(cam.getPos(sphere.root))
+            view_dir = np.array(sphere.root.getRelativeVector(cam, Vec3(0, 1, 0)))
+            views.append((camera_pos, view_dir / np.linalg.norm(view_dir)))
+            for key in ROOT_PATCHES:
+                heapq.heappush(heap, (-self._screen_error(sphere, key, *views[index], half_fov, pixels_per_radian),
+                                      index, key))
+
+        num_triangles = sum(len(ROOT_PATCHES) * s.patch_triangles for s in spheres)
+        builds = self.max_builds_per_frame
+        leaves = [[] for _ in spheres]
+        split = [set() for _ in spheres]
+        while heap:
+            neg_error, index, key = heapq.heappop(heap)
+            sphere = spheres[index]
+            threshold = merge_error if key in sphere._split else self.pixel_error
+            extra = 3 * sphere.patch_triangles
+            children = sphere.children(key)
+            missing = [c for c in children if not sphere.is_built(c)]
+            if (-neg_error <= threshold or key[1] >= sphere.max_level
+                    or num_triangles + extra > self.triangle_budget or len(missing) > builds):
+                leaves[index].append(key)
+                continue
+            for child in missing:
+                sphere.build(child)
+            builds -= len(missing)
+            num_triangles += extra
+            split[index].add(key)
+            for child in children:
+                heapq.heappush(heap, (-self._screen_error(sphere, child, *views[index], half_fov, pixels_per_radian),
+                                      index, child))
+
+        for index, sphere in enumerate(spheres):
+            sphere._split = split[index]
+            sphere.show(leaves[index])
+        self.num_triangles = num_triangles
+        return Task.cont
+
+    @staticmethod
+    def _screen_error(sphere: LODSphere, key: tuple, camera_pos: np.ndarray, view_dir: np.ndarray,
+                      half_fov: float, pixels_per_radian: float) -> float:
+        """Geometric error of a patch in pixels (0 if the patch is out of view)."""
+        center, radius, direction, angular_radius = sphere.bounds(key)
+        camera_distance = np.linalg.norm(camera_pos)
+        if camera_distance > sphere.radius:
+            horizon = math.acos(sphere.radius / camera_distance)
+            if math.acos(np.clip(camera_pos @ direction / camera_distance, -1, 1)) > horizon + angular_radius:
+                return 0.0
+        offset = center - camera_pos
+        center_distance = np.linalg.norm(offset)
+        if center_distance > radius and (math.acos(np.clip(view_dir @ offset / center_distance, -1, 1))
+                                         > half_fov + math.asin(radius / center_distance)):
+            return 0.0
+        distance = max(center_distance - radius, 1e-6 * sphere.radius)
+        return sphere.geometric_error(key) / distance * pixels_per_radian
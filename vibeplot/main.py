@@ -2,8 +2,6 @@
 import os
 import math
 import random
-import psutil
-import imageio
 import numpy as np
 import datetime
 
@@ -14,9 +12,6 @@ from panda3d.core import (GeomNode, NodePath, Vec3, Vec4, Mat4, Point2, Point3,
 from direct.showbase.ShowBase import ShowBase
 from direct.gui.OnscreenText import OnscreenText
 from direct.task import Task
-from direct.gui.DirectGui import DirectButton, DirectSlider, DirectLabel, DirectFrame
-from direct.gui import DirectGuiGlobals as DGG
-from direct.gui.DirectOptionMenu import DirectOptionMenu
 
 from .stars import Stars
 from .utilities import *
@@ -29,6 +24,14 @@ from .draggable_vector import DraggableVector
 from .planes import Plane
 from .fire import FireEffect
 from .geodesics import GeodesicPath
+from .batching import StaticBatcher, mark_static, static_cached
+from .scene_cache import SceneCache
+from .profiling import StartupTimer
+from .lod import LODManager
+from .labels import LabelManager, label_pixels
+from .origin import FloatingOrigin, world_frame
+from .timesystem import TimeSystem, FRAME_TIME
+from .statecache import StateCache, STATE_CACHE_SAMPLES
 
 
 loadPrcFileData('', 'framebuffer-multisample 1')
@@ -44,10 +47,10 @@ MOON_RADIUS = EARTH_RADIUS / 4.0  # Radius of Moon in Panda3D units
 MARS_RADIUS = EARTH_RADIUS / 3.0  # Radius of Mars in Panda3D units
 VENUS_RADIUS = EARTH_RADIUS * 0.2  # Radius of Venus in Panda3D units
 SUN_RADIUS = EARTH_RADIUS * 2
-MIN_LABEL_SCALE = 0  #0.05
+MOON_TILES = "models/moon_tiles"  # optional high-res tile pyramid for the Moon (see `vibeplot.tiles`)
 RAD2DEG = 180.0 / math.pi
 MIN_TIME = 0.0
-MAX_TIME = 100.0  # temp: this represents the max time of the mission [will be user input: min/max]
+MAX_TIME = 100.0  # default timeline [see the `time_range` of EarthOrbitApp]
 
 
 class EarthOrbitApp(ShowBase):
@@ -60,7 +63,16 @@ class EarthOrbitApp(ShowBase):
                  shadow_buffer_size: int = 2048,
                  near_far: tuple = (1.0, 100.0),
                  fov: tuple = (60.0, 60.0),
-                 star_database: str = "models/hygdata_v41.csv"):
+                 star_database: str = "models/hygdata_v41.csv",
+                 scene_cache: str = None,
+                 texture_cache: str = "cache/textures",
+                 lod_triangle_budget: int = 300000,
+                 floating_origin: bool = False,
+                 time_range: tuple = (MIN_TIME, MAX_TIME),
+                 epoch: float = None,
+                 time_rate: float = 1.0,
+                 state_cache_samples: int = STATE_CACHE_SAMPLES,
+                 startup_report: bool = False):
         """
         Initializes the EarthOrbitApp, setting up the Panda3D scene, camera, lighting, GUI, and celestial bodies.
 
@@ -73,9 +85,28 @@ class EarthOrbitApp(ShowBase):
             near_far (tuple, optional): Near and far clipping planes for the camera lens. Defaults to (1, 100). Adjust based on your scene scale.
             fov (tuple, optional): Horizontal and vertical field of view (degrees) for the camera lens. Defaults to (60.0, 60.0).
             star_database (str, optional): Path to the star database CSV file for rendering stars. Defaults to "models/hygdata_v41.csv".
+            scene_cache (str, optional): Directory where the static geometry of the scene is cached, so that it
+                is loaded from a `.bam` file rather than rebuilt on the next launch. Defaults to None (no cache).
+            texture_cache (str, optional): Directory where the planetary maps are cached as mipmapped `.txo` files
+                (see `vibeplot.textures`). Defaults to "cache/textures". None disables the cache.
+            lod_triangle_budget (int, optional): Maximum number of triangles of the view-dependent body
+                meshes (see `vibeplot.lod`). Defaults to 300000. None uses fixed-resolution spheres.
+            floating_origin (bool, optional): Keep the render origin on the body the camera is focused on
+                (see `vibeplot.origin`), so that the scene stays precise far from the base frame origin
+                (e.g. at interplanetary scale). Defaults to False.
+            time_range (tuple, optional): (start, stop) of the timeline, as ephemeris times
+                (see `vibeplot.timesystem`). Defaults to (0, 100).
+            epoch (float, optional): Time displayed as 0 on the GUI. Defaults to None (the start of the timeline).
+            time_rate (float, optional): Time warp of the playback, in scene seconds per second. Defaults to 1.
+            state_cache_samples (int, optional): Number of keyframes of the scene over the timeline, interpolated
+                while the time slider is dragged (see `vibeplot.statecache`). Defaults to 2001. None disables them.
+            startup_report (bool, optional): Print how long each part of the scene construction took. Defaults to False.
         """
 
+        self.startup_timer = StartupTimer()
+
         super().__init__()
+        self.startup_timer.lap("ShowBase (window)")
 
         self.enable_particles = enable_particles
         if enable_particles:
@@ -89,8 +120,12 @@ class EarthOrbitApp(ShowBase):
 
         # to keep track of sim time:
         self.use_slider_time = False
+        self._step_pending = False  # run the paused tasks for one frame [see step_frame]
+        self._slider_fraction = None  # last value given to the time slider [see _update_time_gui]
         self.pause_scene_animation()
-        self.sim_time = MIN_TIME  # This will be your time variable
+        self.time_system = TimeSystem(*time_range, epoch=epoch, rate=time_rate)  # the sim time is `time_system.time`
+        # keyframes of the scene for scrubbing the timeline [built on first use]
+        self.state_cache = StateCache(self, state_cache_samples) if state_cache_samples else None
         self.sim_time_task = self.add_task(self.sim_time_update_task, "SimTimeTask")
 
         # Task for tracking mouse during drag
@@ -113,17 +148,41 @@ class EarthOrbitApp(ShowBase):
         # self.camLens.setFar(1e8)
 
         # update aspect ratio
-        width = self.win.getProperties().getXSize()
-        height = self.win.getProperties().getYSize()
+        width = self.win.getXSize()  # [also works for an offscreen buffer]
+        height = self.win.getYSize()
         if width > 0 and height > 0:
             aspect = width / height
             self.camLens.setAspectRatio(aspect)
 
+        # static geometry (grids, axes, markers, ...) is merged into as few Geoms as possible,
+        # and optionally restored from the scene cache rather than built.
+        self.static_batcher = StaticBatcher(self.render)
+        # the positions of the bodies and trajectories are kept in double precision,
+        # and given to Panda3D relative to the focused body
+        self.floating_origin = FloatingOrigin(self) if floating_origin else None
+        self.texture_cache = texture_cache  # used by the texture loader
+        # body spheres are view-dependent meshes sharing this triangle budget
+        self.lod_manager = LODManager(self, triangle_budget=lod_triangle_budget) if lod_triangle_budget else None
+        # all the text labels of the scene are drawn in screen space by one task
+        self.label_manager = LabelManager(self)
+        if scene_cache:
+            self.scene_cache = SceneCache(self.static_batcher, scene_cache,
+                                          files=[star_database,
+                                                 "models/inp_Constellation.txt",
+                                                 "models/custom.geo.json",
+                                                 "models/major_cities.csv"],
+                                          params={'draw_plane': draw_plane, 'star_database': star_database,
+                                                  'floating_origin': floating_origin})
+            self.scene_cache.begin()
+        else:
+            self.scene_cache = None
+
         if star_database:
             # self.star_sphere_np = self.render.attachNewNode("star_sphere")
-            self.stars = Stars(self, star_database="models/hygdata_v41.csv")
+            self.stars = Stars(self, star_database=star_database)
         else:
             self.stars = None
+        self.startup_timer.lap("stars")
 
         # Initialize in base frame at startup
         self.setup_base_frame()
@@ -135,7 +194,7 @@ class EarthOrbitApp(ShowBase):
             props.setSize(800, 600)  # Or your desired size
             self.openDefaultWindow(props=props)
 
-        self.process = psutil.Process(os.getpid())
+        self.process = None  # for the HUD memory stats [psutil is imported on first use]
 
         # Add key bindings:
         self.accept("space", self.recenter_on_earth)
@@ -151,6 +210,11 @@ class EarthOrbitApp(ShowBase):
         self.accept("5", self.focus_on_site)
         self.accept("shift-5", self.focus_on_site, extraArgs=[True])
         self.accept("6", self.venus_mars_frame)  # test. center on venus but look at mars
+        self.accept("[", self.change_time_rate, extraArgs=[0.5])   # slower
+        self.accept("]", self.change_time_rate, extraArgs=[2.0])   # faster
+        self.accept("/", self.reverse_playback)
+        self.accept(",", self.step_frame, extraArgs=[-1])
+        self.accept(".", self.step_frame, extraArgs=[1])
 
         # messenger.toggleVerbose()  # Enable verbose messenger output
         # self.accept("*", self.event_logger)  # debugging, log all events
@@ -256,6 +320,7 @@ class EarthOrbitApp(ShowBase):
             intensity=100.0
         )
         self.earth.plot_major_cities("models/major_cities.csv")
+        self.startup_timer.lap("earth")
 
         # To draw an open path:
         points = [
@@ -350,6 +415,7 @@ class EarthOrbitApp(ShowBase):
         # self.json_orbit_2.destroy()  # test - remove it
 
         # test reading a trajectory in the halo output format:
+        # [its epochs are ephemeris times: use an EarthOrbitApp `time_range` that spans them]
         # self.nrho_orbit = Orbit(
         #     parent=self,
         #     central_body=self.earth,
@@ -395,6 +461,7 @@ class EarthOrbitApp(ShowBase):
                       marker_interval=1,  # every point
                       marker_radius=0.1)
             self.orbits.append(s)
+        self.startup_timer.lap("earth orbits")
 
         # put a site on the Earth:
         site_lat = 28.57  # deg
@@ -416,8 +483,10 @@ class EarthOrbitApp(ShowBase):
             texture="models/lroc_color_poles_1k.jpg",
             color=(1, 1, 1, 1),
             draw_3d_axes=True,
+            tile_pyramid=MOON_TILES if os.path.isdir(MOON_TILES) else None,
         )
-        plane = Plane(self.moon._body, radius=self.moon.radius * 2, color=(1,1,1,0.2))
+        if not static_cached(self):
+            plane = Plane(self.moon._body, radius=self.moon.radius * 2, color=(1,1,1,0.2))
 
         # lets add the moon antipode
         self.earth_moon_arrow = BodyToBodyArrow(self, self.moon, self.earth, extension=1.5, color=(1,0.5,0,1), label_text="Moon Antipode")
@@ -504,6 +573,7 @@ class EarthOrbitApp(ShowBase):
                 label_scale=0.05,  # Adjust label size
                 draw_3d_axes=False  # Disable axes for simplicity
             )
+        self.startup_timer.lap("planets and sites")
 
         for inc in range(0, 360, 20):
             self.moon_satellite_2 = Orbit(parent=self,
@@ -521,72 +591,22 @@ class EarthOrbitApp(ShowBase):
                                           enable_shadow=False,
                                           show_orbit_path=False  # don't show the orbit
                                         )
+        self.startup_timer.lap("moon orbits")
 
-        if draw_plane:
+        if draw_plane and not static_cached(self):
             # Draw equatorial plane
-            self.plane = Plane(self.render, radius=EARTH_RADIUS * 4.0, color=(0.2, 0.6, 1.0, 0.3))
+            self.plane = Plane(world_frame(self), radius=EARTH_RADIUS * 4.0, color=(0.2, 0.6, 1.0, 0.3))
 
         # Add a small sphere as the satellite
-        self.satellite = create_sphere(radius=0.1, num_lat=24, num_lon=48, color=(1,0,0,1))
-        self.satellite.reparentTo(self.render)
+        self.satellite = GEOMETRY_CACHE.sphere(radius=0.1, num_lat=24, num_lon=48, color=(1,0,0,1))
+        self.satellite.reparentTo(world_frame(self))
 
         # --- Example particles ---
-        self.particles = []
-        self.particle_params = []
-        self.particle_labels = []
-        num_particles = 50
-        particle_radius = 0.03
-        for idx in range(num_particles):
-            # Random orbital parameters
-            #r = random.uniform(2.2, 4.0)
-            r = random.uniform(EARTH_RADIUS * 1.2, EARTH_RADIUS * 2.0)
-            inclination = random.uniform(0, math.pi)
-            angle0 = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(0.05, 0.2)
-            particle = create_sphere(radius=particle_radius, num_lat=10, num_lon=20, color=(random.random(), random.random(), random.random(), 1))
-            particle.reparentTo(self.render)
-            self.particles.append(particle)
-            self.particle_params.append((r, inclination, angle0, speed))
-
-            label = TextNode(f"S{idx+1}_label")
-            label.setText(f"S{idx+1}")
-            label.setTextColor(1, 1, 1, 1)
-            label.setAlign(TextNode.ACenter)
-            label_np = self.render.attachNewNode(label)
-            particle_pos = particle.getPos()
-            label_np.setPos(particle_pos[0] + 0.1, particle_pos[1] + 0.1, particle_pos[2] + 0.1)  # Offset above particle
-            label_np.setScale(0.2)
-            label_np.setBillboardPointEye()  # Always face camera
-            label_np.setLightOff()
-            self.particle_labels.append(label_np)
-
+        self.add_particles()
         self.labels_visible = True
         self.accept("s", self.toggle_labels)
 
-        # --- Connect some particles with lines ---
-        self.connect_count = 5  # Number of particles to connect
-        self.particle_lines = LineSegs()
-        self.particle_lines.setThickness(1.5)
-        self.particle_lines.setColor(1, 0, 1, 1)  # Magenta
-
-        # Initial draw (positions will be updated each frame)
-        for i in range(self.connect_count):
-            for j in range(i + 1, self.connect_count):
-                pos_i = self.particles[i].getPos()
-                pos_j = self.particles[j].getPos()
-                self.particle_lines.moveTo(pos_i)
-                self.particle_lines.drawTo(pos_j)
-        self.lines_np = NodePath(self.particle_lines.create())
-        self.lines_np.reparentTo(self.render)
-        self.lines_np.setLightOff()  # Turn off lighting completely
-
-        # Trace settings
-        self.use_particle_traces = True
-        if self.use_particle_traces:
-            self.trace_length = 100  # Number of points in the trace
-            self.particle_traces = [[particle.getPos()] * self.trace_length for particle in self.particles]
-            self.trace_nodes = [self.render.attachNewNode("trace") for _ in self.particles]
-        self.add_task(self.particles_orbit_task, "ParticlesOrbitTask")
+        self.startup_timer.lap("particles")
 
         # movie recording:
         self.record_movie = False
@@ -598,9 +618,11 @@ class EarthOrbitApp(ShowBase):
         self.draw_axis_grid()
         self.recenter_on_earth()  # start the animation centered on Earth
         self.setup_gui()  # set up the GUI buttons/slider/etc
+        self.startup_timer.lap("axes and GUI")
 
         # Example manifold:
         self.manifold = Manifold(self, mesh="models/manifold_dv.json")
+        self.startup_timer.lap("manifold")
 
         # test: turn off shadowing on the bodies:
         # self.toggle_sunlight_on_bodies(False)
@@ -626,6 +648,18 @@ class EarthOrbitApp(ShowBase):
                                          name="MyVector")
 
         self.add_task(self.hud_task, "HUDTask", nopause=True)
+        self.startup_timer.lap("picking and draggable vector")
+
+        # merge the static geometry into as few Geoms as possible [or restore it from the cache].
+        # call self.static_batcher.bake() again if static objects are added or removed later.
+        if self.scene_cache:
+            self.scene_cache.end()
+        else:
+            self.static_batcher.bake()
+        self.startup_timer.lap("static geometry")
+
+        if startup_report:
+            print(self.startup_timer.report())
 
         # start the main task:
         self.taskMgr.add(self.main_task, 'MainTask')
@@ -639,6 +673,8 @@ class EarthOrbitApp(ShowBase):
             body.set_shadowed(enable, sunlight_np=self.dlnp)
 
     def _on_slider_drag_start(self, event):
+        if self.state_cache is not None:
+            self.state_cache.update()  # (re)build the keyframes now rather than on the first drag event
         self.use_slider_time = True
         self.resume_scene_animation()
 
@@ -648,21 +684,65 @@ class EarthOrbitApp(ShowBase):
 
     def on_slider_change(self):
         """Handle slider change event to update simulation time."""
-        self.sim_time = float(self.time_slider['value'])
-        self.time_label["text"] = f"Time: {self.sim_time:.2f}"
+        fraction = self.time_slider['value']
+        # ignore the events of the values set from the time [they are single precision, and may
+        # come a frame later, after the time was set elsewhere]
+        if self._slider_fraction is None or abs(fraction - self._slider_fraction) > 1e-6:
+            self.sim_time = self.time_system.from_fraction(fraction)
+        self._update_time_label()
+
+    def _update_time_label(self):
+        if hasattr(self, "time_label"):
+            rate = self.time_system.rate
+            warp = f"  (x{rate:g})" if rate != 1.0 else ""
+            self.time_label["text"] = f"Time: {self.time_system.format()}{warp}"
+
+    def _update_time_gui(self):
+        """Show the current time on the slider and the label."""
+        if hasattr(self, "time_slider"):
+            self._slider_fraction = self.time_system.to_fraction()
+            self.time_slider['value'] = self._slider_fraction
+        self._update_time_label()
 
     def sim_time_update_task(self, et):
         """Update the simulation time and GUI elements."""
         if not self.use_slider_time:
             if not self.paused:
-                self.sim_time += globalClock.getDt()
-                self.sim_time = max(MIN_TIME, self.sim_time % MAX_TIME)
-                if hasattr(self, "time_slider"):
-                    self.time_slider['value'] = self.sim_time
-                if hasattr(self, "time_label"):
-                    self.time_label["text"] = f"Time: {self.sim_time:.2f}"
+                self.time_system.advance(globalClock.getDt())
+                self._update_time_gui()
         return Task.cont
 
+    def set_time_rate(self, rate: float):
+        """
+        Set the time warp of the playback.
+
+        Args:
+            rate (float): Scene seconds per second (negative to play backwards).
+        """
+        self.time_system.rate = float(rate)
+        self._update_time_label()
+
+    def change_time_rate(self, factor: float):
+        """Multiply the time warp of the playback by `factor` (e.g. 2 to play twice as fast)."""
+        self.set_time_rate(self.time_system.rate * factor)
+
+    def reverse_playback(self):
+        """Reverse the direction of the playback."""
+        self.set_time_rate(-self.time_system.rate)
+
+    def step_frame(self, frames: int = 1):
+        """
+        Pause the animation and move the time by a number of frames (see `TimeSystem.step`).
+
+        Args:
+            frames (int, optional): Number of frames (negative to step back). Defaults to 1.
+        """
+        self.use_slider_time = False
+        self.pause_scene_animation()
+        self.time_system.step(frames)
+        self._update_time_gui()
+        self._step_pending = True  # update the scene on the next frame
+
     def pause_scene_animation(self):
         """Pause the scene animation."""
         self.paused = True  # Set the pause flag to True
@@ -677,6 +757,9 @@ class EarthOrbitApp(ShowBase):
 
     def setup_gui(self):
         """Add some GUI elements for interaction."""
+        from direct.gui.DirectGui import DirectButton, DirectSlider, DirectLabel, DirectFrame
+        from direct.gui import DirectGuiGlobals as DGG
+        from direct.gui.DirectOptionMenu import DirectOptionMenu
 
         aspect = self.getAspectRatio()
 
@@ -728,10 +811,11 @@ class EarthOrbitApp(ShowBase):
             frameSize=(-1.8, 1.8, -0.6, 0.6)
         )
 
+        self._slider_fraction = self.time_system.to_fraction()
         self.time_slider = DirectSlider(
-            range=(MIN_TIME, MAX_TIME),  # Set min/max time as needed
-            value=self.sim_time,
-            pageSize=1,      # How much to move per click
+            range=(0.0, 1.0),  # fraction of the timeline [see TimeSystem.to_fraction]
+            value=self._slider_fraction,
+            pageSize=0.01,      # How much to move per click
             scale=0.6,
             pos=(0, 0, 0),  # Center of the frame
             command=self.on_slider_change,
@@ -761,6 +845,9 @@ class EarthOrbitApp(ShowBase):
 
         view_distance = EARTH_RADIUS * 10
 
+        if self.floating_origin:
+            self.floating_origin.follow(None)  # the base frame is the absolute frame
+
         self.stop_inertia()
 
         # Remove camera_pivot if it exists
@@ -771,6 +858,7 @@ class EarthOrbitApp(ShowBase):
         # Check if this is the first call (during initialization)
         if hasattr(self, 'initial_camera_parent'):
             # Regular restoration of state
+            self.activate_tiled_surface(None)
             self.camera.reparentTo(self.initial_camera_parent)
             self.camera.setPos(self.render, self.initial_camera_pos)
             self.camera.setHpr(self.render, self.initial_camera_hpr)
@@ -822,6 +910,11 @@ class EarthOrbitApp(ShowBase):
         ```
         """
 
+        self.activate_tiled_surface(body)
+        if self.floating_origin:
+            # re-base the scene on the body [a site moves with its central body]
+            self.floating_origin.follow((body.central_body if isinstance(body, Site) else body)._rotator)
+
         if not view_distance:
             if isinstance(body, Site):
                 # a little closer for sites
@@ -903,6 +996,20 @@ class EarthOrbitApp(ShowBase):
         self.trackball.node().setPos(0, view_distance, 0)
         self.trackball.node().setOrigin(Point3(0, 0, 0))
 
+    def activate_tiled_surface(self, body: Body = None):
+        """
+        Activate the tiled surface of `body` (or of the central body of a site) if it has one,
+        so that its tiles are paged in, and deactivate the others.
+
+        Args:
+            body (Body, optional): The body the camera is centered on. None deactivates all of them.
+        """
+        if isinstance(body, Site):
+            body = body.central_body
+        for b in self.bodies:
+            if b.tiled_surface is not None:
+                b.tiled_surface.set_active(b is body)
+
     def setup_camera_view(self, focus_point, view_distance):
         """Set up camera to look at a point while preserving mouse control."""
         # Always ensure consistent parenting
@@ -928,7 +1035,7 @@ class EarthOrbitApp(ShowBase):
         print("Reset")
         self.use_slider_time = False  # Enter manual time mode
         self.resume_scene_animation()
-        self.sim_time = MIN_TIME  # reset clock
+        self.sim_time = self.time_system.start  # reset clock
 
         # Clean up tasks created by setup_body_fixed_frame
         self.remove_task("UpdateFollowNodeTask")
@@ -1214,48 +1321,19 @@ class EarthOrbitApp(ShowBase):
                 axes.moveTo(0, -tick_size/2, pos)
                 axes.drawTo(0, tick_size/2, pos)
 
-        axes_np = self.render.attachNewNode(axes.create())
-        axes_np.setLightOff()
-        axes_np.setTwoSided(True)
+        if not static_cached(self):  # else, restored from the scene cache
+            axes_np = mark_static(world_frame(self).attachNewNode(axes.create()))
+            axes_np.setLightOff()
+            axes_np.setTwoSided(True)
 
         # Create axis labels
-        label_scale = 0.5
         label_offset = 0.3  # Distance beyond the end of the axis
+        for text, point, color in (("X", (length + label_offset, 0, 0), (1, 0, 0, 1)),    # Red
+                                   ("Y", (0, length + label_offset, 0), (0, 1, 0, 1)),    # Green
+                                   ("Z", (0, 0, length + label_offset), (0, 0, 1, 1))):   # Blue
+            self.label_manager.add(text, world_frame(self), point, color, size=label_pixels(0.5), priority=30)
 
-        # X axis label
-        x_label = TextNode('x_label')
-        x_label.setText("X")
-        x_label.setTextColor(1, 0, 0, 1)  # Red
-        x_label.setAlign(TextNode.ACenter)
-        x_label_np = self.render.attachNewNode(x_label)
-        x_label_np.setPos(length + label_offset, 0, 0)
-        x_label_np.setScale(label_scale)
-        x_label_np.setBillboardPointEye()  # Always face camera
-        x_label_np.setLightOff()
-
-        # Y axis label
-        y_label = TextNode('y_label')
-        y_label.setText("Y")
-        y_label.setTextColor(0, 1, 0, 1)  # Green
-        y_label.setAlign(TextNode.ACenter)
-        y_label_np = self.render.attachNewNode(y_label)
-        y_label_np.setPos(0, length + label_offset, 0)
-        y_label_np.setScale(label_scale)
-        y_label_np.setBillboardPointEye()
-        y_label_np.setLightOff()
-
-        # Z axis label
-        z_label = TextNode('z_label')
-        z_label.setText("Z")
-        z_label.setTextColor(0, 0, 1, 1)  # Blue
-        z_label.setAlign(TextNode.ACenter)
-        z_label_np = self.render.attachNewNode(z_label)
-        z_label_np.setPos(0, 0, length + label_offset)
-        z_label_np.setScale(label_scale)
-        z_label_np.setBillboardPointEye()
-        z_label_np.setLightOff()
-
-        if show_grid:
+        if show_grid and not static_cached(self):
             grid = LineSegs()
             grid.setThickness(1.0)
             grid.setColor(0.7, 0.7, 0.7, 0.5)  # Light gray, semi-transparent
@@ -1288,7 +1366,7 @@ class EarthOrbitApp(ShowBase):
                     grid.moveTo(x, y, -grid_size)
                     grid.drawTo(x, y, grid_size)
 
-            grid_np = self.render.attachNewNode(grid.create())
+            grid_np = mark_static(world_frame(self).attachNewNode(grid.create()))
             grid_np.setLightOff()
             grid_np.setTwoSided(True)
             grid_np.setTransparency(True)
@@ -1297,6 +1375,7 @@ class EarthOrbitApp(ShowBase):
         self.record_movie = not self.record_movie
         if self.record_movie:
             print("Recording started.")
+            import imageio  # only needed for movie capture
             self.movie_writer = imageio.get_writer(self.movie_filename, fps=self.movie_fps, codec='libx264', format='ffmpeg')
             self.add_task(self.movie_writer_task, "MovieWriterTask", nopause=True)
         else:
@@ -1313,7 +1392,8 @@ class EarthOrbitApp(ShowBase):
 
         et = self.get_et(task)
 
-        if not self.paused:
+        if not self.paused or self._step_pending:
+            self._step_pending = False
             for _func, _, _ in self.task_list:
                 _func(et)
         else:
@@ -1390,6 +1470,15 @@ class EarthOrbitApp(ShowBase):
         self.movie_writer.append_data(img)
         return Task.cont
 
+    @property
+    def sim_time(self) -> float:
+        """The simulation time (ephemeris time, see `time_system`)."""
+        return self.time_system.time
+
+    @sim_time.setter
+    def sim_time(self, value: float):
+        self.time_system.time = float(value)
+
     def get_et(self, task=None) -> float:
         """Returns the global simulation time."""
         return self.sim_time
@@ -1401,6 +1490,9 @@ class EarthOrbitApp(ShowBase):
         # self.hud_text.setText(f"Frame: {self.frame_count}")
         now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         fps = globalClock.getAverageFrameRate()
+        if self.process is None:
+            import psutil
+            self.process = psutil.Process(os.getpid())
         mem_mb = self.process.memory_info().rss / (1024 * 1024)
         cpu = self.process.cpu_percent()
         # elapsed_time = self.get_et(task)
@@ -1410,6 +1502,76 @@ class EarthOrbitApp(ShowBase):
                            f"CPU: {cpu:.1f}%"]
         self.hud_text.setText('\n'.join(text_to_display))
 
+    def add_particles(self, num_particles: int = 50, connect_count: int = 5, particle_radius: float = 0.03,
+                      trace_length: int = 100):
+        """
+        Add the example particles: small spheres on random circular orbits around the Earth,
+        with fading traces, the first few of them connected by lines.
+
+        Args:
+            num_particles (int, optional): Number of particles. Defaults to 50.
+            connect_count (int, optional): Number of particles connected by lines. Defaults to 5.
+            particle_radius (float, optional): Radius of the spheres. Defaults to 0.03.
+            trace_length (int, optional): Number of points of the traces (0 for none). Defaults to 100.
+        """
+        self.particles = []
+        self.particle_params = []
+        self.particle_labels = []
+        self.connect_count = min(connect_count, num_particles)  # Number of particles to connect
+        for idx in range(num_particles):
+            # Random orbital parameters
+            #r = random.uniform(2.2, 4.0)
+            r = random.uniform(EARTH_RADIUS * 1.2, EARTH_RADIUS * 2.0)
+            inclination = random.uniform(0, math.pi)
+            angle0 = random.uniform(0, 2 * math.pi)
+            speed = random.uniform(0.05, 0.2)
+            particle = GEOMETRY_CACHE.sphere(radius=particle_radius, num_lat=10, num_lon=20, color=(random.random(), random.random(), random.random(), 1))
+            particle.reparentTo(world_frame(self))
+            self.particles.append(particle)
+            self.particle_params.append((r, inclination, angle0, speed))
+
+            # connected particles are labeled in red
+            color = (1, 0, 0, 1) if idx < self.connect_count else (1, 1, 1, 1)
+            self.particle_labels.append(self.label_manager.add(f"S{idx+1}", particle, color=color, size=12,
+                                                               priority=20, pixel_offset=(0, 8)))
+
+        # --- Connect some particles with lines ---
+        self.particle_lines = LineSegs()
+        self.particle_lines.setThickness(1.5)
+        self.particle_lines.setColor(1, 0, 1, 1)  # Magenta
+
+        # Initial draw (positions will be updated each frame)
+        for i in range(self.connect_count):
+            for j in range(i + 1, self.connect_count):
+                pos_i = self.particles[i].getPos()
+                pos_j = self.particles[j].getPos()
+                self.particle_lines.moveTo(pos_i)
+                self.particle_lines.drawTo(pos_j)
+        self.lines_np = NodePath(self.particle_lines.create())
+        self.lines_np.reparentTo(world_frame(self))
+        self.lines_np.setLightOff()  # Turn off lighting completely
+
+        # Trace settings
+        self.use_particle_traces = trace_length > 0
+        if self.use_particle_traces:
+            self.trace_length = trace_length  # Number of points in the trace
+            self.particle_trace_step = FRAME_TIME  # time between the points of a trace
+            self.trace_nodes = [world_frame(self).attachNewNode("trace") for _ in self.particles]
+        self.add_task(self.particles_orbit_task, "ParticlesOrbitTask")
+
+    def particle_positions(self, ets) -> np.ndarray:
+        """
+        Positions of the example particles (circular inclined orbits) at the times `ets`.
+
+        Returns:
+            np.ndarray: (num_particles, len(ets), 3) positions.
+        """
+        r, inclination, angle0, speed = np.array(self.particle_params, dtype=float).T[..., np.newaxis]
+        angle = angle0 + np.asarray(ets, dtype=float) * speed
+        x = r * np.cos(angle)
+        y = r * np.sin(angle)
+        return np.stack((x, y * np.cos(inclination), y * np.sin(inclination)), axis=-1)
+
     def particles_orbit_task(self, et):
 
         # self.frame_count += 1
@@ -1427,26 +1589,17 @@ class EarthOrbitApp(ShowBase):
         # self.hud_text.setText('\n'.join(text_to_display))
         # # self.hud_text.setText(f"{now}\nFPS: {fps:.1f}")
 
-        if self.paused:  # Check the pause flag
-            return Task.cont  # Skip updates if paused
+        # the traces are the positions over the last `trace_length` steps of the timeline,
+        # so they are right whatever the direction of the playback or a jump of the time.
+        num_points = self.trace_length if self.use_particle_traces else 1
+        ets = et - self.particle_trace_step * np.arange(num_points - 1, -1, -1)
+        positions = self.particle_positions(ets)
 
         for i, particle in enumerate(self.particles):
-            r, inclination, angle0, speed = self.particle_params[i]
-            angle = angle0 + self.get_et() * speed
-            x = r * math.cos(angle)
-            y = r * math.sin(angle)
-            z = 0
-            y_incl = y * math.cos(inclination) - z * math.sin(inclination)
-            z_incl = y * math.sin(inclination) + z * math.cos(inclination)
-            pos = Point3(x, y_incl, z_incl)
-            particle.setPos(pos)
+            particle.setPos(*positions[i, -1])
 
             if self.use_particle_traces:
-                # Update trace positions
-                trace = self.particle_traces[i]
-                trace.append(pos)
-                if len(trace) > self.trace_length:
-                    trace.pop(0)
+                trace = [Point3(*p) for p in positions[i].tolist()]
 
                 # Draw fading trace
                 self.trace_nodes[i].removeNode()
@@ -1456,41 +1609,10 @@ class EarthOrbitApp(ShowBase):
                     segs.setColor(alpha, alpha, 0, alpha)
                     segs.moveTo(trace[j-1])
                     segs.drawTo(trace[j])
-                self.trace_nodes[i] = self.render.attachNewNode(segs.create())
+                self.trace_nodes[i] = world_frame(self).attachNewNode(segs.create())
                 self.trace_nodes[i].setTransparency(True)
                 self.trace_nodes[i].setLightOff()
 
-            pos_3d = particle.getPos(self.render)
-            pos_cam = self.camera.getRelativePoint(self.render, pos_3d)
-            p3 = Point3()
-            label_np = self.particle_labels[i]
-            if self.labels_visible and self.camLens.project(pos_cam, p3):
-                x = p3.x * base.getAspectRatio()
-                y = p3.y
-                label_np.setPos(pos_3d[0] + 0.01, pos_3d[1] + 0.01, pos_3d[2] + 0.01)
-                label_np.show()
-            else:
-                label_np.hide()
-            # Update label color for connected particles
-            if i < self.connect_count:
-                # ... old version with onscreentext:
-                #label_np['fg'] = (1, 0, 0, 1)  # Red for connected
-                #label_np['bg'] = (0, 0, 0, 0.5)
-                label_np.node().setTextColor(1, 0, 0, 1)  # Red for connected
-            else:
-                #label_np['fg'] = (0, 0, 0, 1)  # Black for others
-                #label_np['bg'] = (1, 1, 1, 0.5)
-                label_np.node().setTextColor(1, 1, 1, 1)  # White for others
-
-            if MIN_LABEL_SCALE:
-                # Calculate distance from camera to label
-                label_pos = label_np.getPos(self.render)
-                cam_pos = self.camera.getPos(self.render)
-                distance = (label_pos - cam_pos).length()
-                # Optionally, set a base scale that grows with distance, but clamp to a minimum
-                scale = max(MIN_LABEL_SCALE, 0.15 * (distance / 7.0))  # Adjust 0.2 and 10.0 as needed
-                label_np.setScale(scale)
-
         # hide the ones that intersect the earth:
         self.particle_lines = LineSegs()
         self.particle_lines.setThickness(1.5)
@@ -1506,7 +1628,7 @@ class EarthOrbitApp(ShowBase):
                     self.particle_lines.drawTo(pos_j)
         self.lines_np.removeNode()
         self.lines_np = NodePath(self.particle_lines.create())
-        self.lines_np.reparentTo(self.render)
+        self.lines_np.reparentTo(world_frame(self))
         self.lines_np.setLightOff()  # Turn off lighting completely
 
         # lines that connect to a site:
@@ -1518,7 +1640,7 @@ class EarthOrbitApp(ShowBase):
         site_lines.setThickness(2.0)
         site_lines.setColor(0, 1, 0, 1)  # Green
         site_pos = self.site._body.getPos(self.render)
-        earth_center = Point3(0, 0, 0)
+        earth_center = world_frame(self).getPos(self.render)
         earth_radius = EARTH_RADIUS
         for particle in self.particles:
             particle_pos = particle.getPos(self.render)
@@ -1,5 +1,4 @@
 import numpy as np
-import json5 as json
 from panda3d.core import (GeomVertexFormat,
                           GeomVertexData,
                           GeomVertexWriter,
@@ -8,6 +7,8 @@ from panda3d.core import (GeomVertexFormat,
                           GeomNode,
                           GeomLines)
 
+from .origin import world_frame
+
 
 class Manifold:
     def __init__(self, parent,
@@ -83,8 +84,9 @@ class Manifold:
         if filename.endswith('.npy'):
             mesh_history = np.load(filename)
         else:
+            import json5  # only needed for json files
             with open(filename, "r") as f:
-                mesh_history = json.load(f)
+                mesh_history = json5.load(f)
             mesh_history = np.array(mesh_history)
         return mesh_history
 
@@ -159,7 +161,7 @@ class Manifold:
         geom.addPrimitive(tris)
         node = GeomNode('manifold')
         node.addGeom(geom)
-        self.mesh_np = self.parent.render.attachNewNode(node)
+        self.mesh_np = world_frame(self.parent).attachNewNode(node)
         self.mesh_np.setTransparency(True)
         self.mesh_np.setLightOff()
         # self.mesh_np.setTwoSided(True)
@@ -198,7 +200,7 @@ class Manifold:
             edge_geom.addPrimitive(edges)
             edge_node = GeomNode('manifold_edges')
             edge_node.addGeom(edge_geom)
-            self.edge_np = self.parent.render.attachNewNode(edge_node)
+            self.edge_np = world_frame(self.parent).attachNewNode(edge_node)
             self.edge_np.setTransparency(True)
             self.edge_np.setLightOff()
             self.edge_np.setRenderModeThickness(self.edge_thickness)
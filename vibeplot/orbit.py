@@ -1,14 +1,15 @@
 import math
 from direct.task import Task
-from panda3d.core import Point3, LineSegs, NodePath, GeomNode, Geom, GeomVertexFormat, GeomVertexData, GeomVertexWriter, GeomTriangles, Vec3, TextNode, TransparencyAttrib
-import json5 as json
+from panda3d.core import LineSegs, NodePath, GeomNode, Geom, GeomVertexFormat, GeomVertexData, GeomVertexWriter, GeomTriangles, Vec3, TransparencyAttrib
 import bisect
-from scipy.interpolate import CubicSpline
 import numpy as np
 
 from .bodies import Body
-from .utilities import create_sphere, draw_path
+from .utilities import GEOMETRY_CACHE, create_tube, draw_path, use_thick_lines
 from .path import Path
+from .labels import get_label_manager, label_pixels
+from .origin import world_frame
+from .statecache import get_state_cache
 
 class Orbit:
     def __init__(self, parent,
@@ -42,6 +43,9 @@ class Orbit:
                  spline_mode = "linear",
                  orbit_json: str = None,
                  time_step: float = None,
+                 path_tolerance: float = 1e-4,
+                 path_screen_tolerance: float = None,
+                 length_scale: float = None,
                  add_tube: bool = False):
 
         """
@@ -65,6 +69,11 @@ class Orbit:
             show_orbit_path (bool, optional): Whether to display the orbit path.
             num_segments (int, optional): Number of segments to use for drawing the orbit path (ignored if time_step is set).
             time_step (float, optional): If set, sample the orbit path at this time interval (overrides num_segments for JSON orbits).
+            path_tolerance (float, optional): Maximum error of the drawn orbit path, as a fraction of its size
+                (see `Path`). None or 0 to draw the samples as is.
+            path_screen_tolerance (float, optional): If set, maximum error of the orbit path in pixels
+                (it is then re-tessellated as the camera moves).
+            length_scale (float, optional): Scene units per unit of `orbit_json` (see `Path`).
             enable_shadow (bool, optional): If True, enable lighting/shadow on the satellite.
             spline_mode (str, optional): Interpolation mode for JSON orbits ("linear" or "cubic").
             orbit_json (str, optional): Path to a JSON file specifying a custom orbit trajectory.
@@ -87,11 +96,14 @@ class Orbit:
         self.satellite_color = satellite_color
         self.num_segments = num_segments
         self.time_step = time_step
+        self.path_tolerance = path_tolerance
+        self.path_screen_tolerance = path_screen_tolerance
+        self.length_scale = length_scale
         self.enable_shadow = enable_shadow
         self.label_text = label_text
         self.label_color = label_color
         self.label_size = label_size
-        self.label_np = None
+        self.label = None
         self.orbit_path_linestyle = orbit_path_linestyle  # 0: solid, 1: dashed
         self.groundtrack_thickness = groundtrack_thickness
         self.show_orbit_path = show_orbit_path
@@ -126,17 +138,12 @@ class Orbit:
         self.satellite = self._create_satellite()
 
         if self.label_text:
-            tn = TextNode(f"{self.name}_label")
-            tn.setText(self.label_text)
-            tn.setTextColor(*self.label_color)
-            tn.setAlign(TextNode.ACenter)
-            self.label_np = self.parent.render.attachNewNode(tn)
-            self.label_np.setScale(self.label_size)
-            self.label_np.setBillboardPointEye()
-            self.label_np.setLightOff()
-            self.label_np.setTransparency(True)
+            # offset above the satellite (in units of its radius, since the satellite is scaled)
+            self.label = get_label_manager(parent).add(self.label_text, self.satellite, (0, 0, 2),
+                                                       self.label_color, size=label_pixels(self.label_size),
+                                                       priority=50)
         else:
-            self.label_np = None
+            self.label = None
 
         # Create orbit path
         # if show_orbit_path:
@@ -153,6 +160,9 @@ class Orbit:
                          thickness = self.thickness,
                          num_segments = self.num_segments,
                          time_step = self.time_step,
+                         tolerance = self.path_tolerance,
+                         screen_tolerance = self.path_screen_tolerance,
+                         length_scale = self.length_scale,
                          inclination_deg = self.inclination_deg,
                          radius = self.radius,
                          show_orbit_path = self.show_orbit_path,
@@ -164,8 +174,6 @@ class Orbit:
                          marker_color=self.marker_color
                         )
         self.orbit_path_np = self.path.orbit_path_np   # for now do this to match old way
-        self._orbit_path_pts = self.path._orbit_path_pts
-        self._orbit_path_ts = self.path._orbit_path_ts
 
         # to pulsate the orbit line:
         # self.add_task(self.pulsate_orbit_line_task, "PulsateOrbitLineTask")
@@ -193,7 +201,7 @@ class Orbit:
 
     def _create_satellite(self):
         """Create the satellite geometry"""
-        satellite = create_sphere(
+        satellite = GEOMETRY_CACHE.sphere(
             radius=self.satellite_radius,
             num_lat=24,
             num_lon=48,
@@ -362,11 +370,11 @@ class Orbit:
         Args:
             show (bool): If True, show the label; if False, hide it.
         """
-        if hasattr(self, 'label_np') and self.label_np:
+        if self.label:
             if show:
-                self.label_np.show()
+                self.label.show()
             else:
-                self.label_np.hide()
+                self.label.hide()
 
     def _create_visibility_cone(self, sat_pos):
         """Create visibility cone geometry"""
@@ -471,22 +479,14 @@ class Orbit:
             if len(self.groundtrack_trace) > self.groundtrack_length:
                 self.groundtrack_trace.pop(0)
 
-            # Draw the groundtrack
+            # Draw the groundtrack (as a thick line, if supported)
             self.groundtrack_node.node().removeAllChildren()
-            segs = LineSegs()
-            segs.setThickness(self.groundtrack_thickness)
-            segs.setColor(self.color)
-
-            for i, pt in enumerate(self.groundtrack_trace):
-                alpha = i / self.groundtrack_length  # Fades from 0 to 1
-                color = (self.color[0], self.color[1], self.color[2], alpha)
-                segs.setColor(color)
-                if i == 0:
-                    segs.moveTo(pt)
-                else:
-                    segs.drawTo(pt)
-
-            self.groundtrack_node.attachNewNode(segs.create())
+            if len(self.groundtrack_trace) > 1:
+                alphas = np.arange(len(self.groundtrack_trace)) / self.groundtrack_length  # Fades from 0 to 1
+                colors = [(self.color[0], self.color[1], self.color[2], alpha) for alpha in alphas]
+                width = self.groundtrack_thickness if use_thick_lines(self.parent) else None
+                track = draw_path(self.groundtrack_node, self.groundtrack_trace, colors=colors, width=width)
+                track.setRenderModeThickness(self.groundtrack_thickness)
             self.groundtrack_node.setTransparency(True)
             self.groundtrack_node.setLightOff()
 
@@ -506,55 +506,10 @@ class Orbit:
             NodePath: The NodePath containing the tube geometry.
         """
 
-        path_points = self._orbit_path_pts
-        num_segments = len(path_points) - 1
-        format = GeomVertexFormat.getV3n3c4()
-        vdata = GeomVertexData('tube', format, Geom.UHStatic)
-        vertex = GeomVertexWriter(vdata, 'vertex')
-        normal = GeomVertexWriter(vdata, 'normal')
-        color_writer = GeomVertexWriter(vdata, 'color')
-
-        verts = []
-        for i,center in enumerate(path_points):
-            # Tangent vector (direction of orbit)
-            if i < len(path_points) - 1:
-                tangent = (path_points[i+1] - center).normalized()
-            else:
-                tangent = (center - path_points[i-1]).normalized()
-            # Find a vector perpendicular to tangent
-            up = Vec3(0, 0, 1)
-            if abs(tangent.dot(up)) > 0.99:
-                up = Vec3(1, 0, 0)
-            side = tangent.cross(up).normalized()
-            up = side.cross(tangent).normalized()
-
-            ring = []
-            for j in range(num_sides):
-                theta = 2 * math.pi * j / num_sides
-                offset = side * math.cos(theta) * tube_radius + up * math.sin(theta) * tube_radius
-                pos = center + offset
-                vertex.addData3(pos)
-                normal.addData3(offset.normalized())
-                color_writer.addData4(*color)
-                ring.append(i * num_sides + j)
-            verts.append(ring)
-
-        # Build triangles
-        tris = GeomTriangles(Geom.UHStatic)
-        for i in range(num_segments):
-            for j in range(num_sides):
-                a_idx = i * num_sides + j
-                b_idx = i * num_sides + (j + 1) % num_sides
-                c_idx = (i + 1) * num_sides + j
-                d_idx = (i + 1) * num_sides + (j + 1) % num_sides
-                tris.addVertices(a_idx, b_idx, c_idx)
-                tris.addVertices(b_idx, d_idx, c_idx)
-
-        geom = Geom(vdata)
-        geom.addPrimitive(tris)
-        node = GeomNode('orbit_tube')
-        node.addGeom(geom)
-        tube_np = self.parent.render.attachNewNode(node)
+        path_points = np.array([(p[0], p[1], p[2]) for p in self._orbit_path_pts])
+        node = create_tube(path_points, radius=tube_radius, num_sides=num_sides,
+                           color=color, name='orbit_tube')
+        tube_np = world_frame(self.parent).attachNewNode(node)
         tube_np.setTransparency(TransparencyAttrib.M_alpha)
         tube_np.setDepthWrite(False)
         tube_np.setBin('transparent', 5)
@@ -564,34 +519,30 @@ class Orbit:
 
         return tube_np
 
+    @property
+    def _orbit_path_ts(self):
+        """The sample times of the orbit path (read from the Path, which can be appended to)."""
+        return self.path._orbit_path_ts
+
+    @property
+    def _orbit_path_pts(self):
+        """The sample points of the orbit path."""
+        return self.path._orbit_path_pts
+
     def orbit_task(self, et):
         """Main orbit animation task (satellite moves smoothly along the path)."""
 
         if self.path:
             self.path.update_trace(et)
 
-        ts = self._orbit_path_ts
-        pts = self._orbit_path_pts
-        n = len(ts)
-        if n < 2:
+        if len(self._orbit_path_ts) < 2:
             return Task.cont
 
-        # Compute parameter t for current time
-        t_min, t_max = ts[0], ts[-1]
-        total_time = t_max - t_min
-        t = (et * self.speed) % total_time + t_min if getattr(self, "trajectory_options", {}).get("loop", True) else min(et * self.speed + t_min, t_max)
-
-        #TODO: shouldn't this be in Path? ...
-
-        # Find the segment
-        for i in range(n - 1):
-            if ts[i] <= t <= ts[i + 1]:
-                alpha = (t - ts[i]) / (ts[i + 1] - ts[i])
-                pos = pts[i] * (1 - alpha) + pts[i + 1] * alpha
-                break
-        else:
-            # If t is exactly at the end, use the last point
-            pos = pts[-1]
+        cache = get_state_cache(self.parent)
+        pos = cache.position(self, et) if cache is not None else None
+        if pos is None:
+            pos = self.satellite_positions([et])[0]
+        pos = Vec3(*pos)
 
         # TODO: i think this should be the origin of the base frame?
         # don't assuming there's a body at the center?
@@ -607,25 +558,37 @@ class Orbit:
         # Update groundtrack
         self._update_groundtrack(sat_pos_base_frame)
 
-        # note: need to move the label resizing into a separate task
-        # so it will still work when zooming when the scene is paused.
-        if self.label_np:
-            # Offset label above the satellite
-            label_pos = sat_pos_base_frame + Point3(0, 0, self.satellite_radius * 2)
-            self.label_np.setPos(label_pos)
-
-            # Keep label a constant size on screen
-            cam = self.parent.cam if hasattr(self.parent, "cam") else None
-            if cam:
-                cam_pos = cam.getPos(self.parent.render)
-                dist = (label_pos - cam_pos).length()
-                # Adjust 0.5 to your preferred on-screen size
-                desired_screen_size = self.label_size
-                scale = desired_screen_size * dist / 30.0  # 30.0 is a tuning constant
-                self.label_np.setScale(scale)
-
         return Task.cont
 
+    def satellite_positions(self, ets) -> np.ndarray:
+        """
+        Positions of the satellite relative to the central body at the times `ets`
+        (linearly interpolated along the drawn orbit path).
+
+        Returns:
+            np.ndarray: (n, 3) positions.
+        """
+        ets = np.asarray(ets, dtype=float)
+        ts = np.asarray(self._orbit_path_ts, dtype=float)
+        pts = np.array(self._orbit_path_pts, dtype=float)
+
+        # Compute parameter t for current time
+        t_min, t_max = ts[0], ts[-1]
+        total_time = t_max - t_min
+        options = self.path.trajectory_options
+        if options.get("ephemeris_time", False):
+            # the trajectory times are on the timeline of the app
+            t = ets
+        elif getattr(self, "trajectory_options", {}).get("loop", True):
+            t = np.mod(ets * self.speed, total_time) + t_min
+        else:
+            t = ets * self.speed + t_min
+
+        #TODO: shouldn't this be in Path? ...
+
+        # np.interp clamps to the ends of the path
+        return np.column_stack([np.interp(t, ts, pts[:, k]) for k in range(3)])
+
     def set_speed(self, speed):
         """Change the orbital speed"""
         self.speed = speed
@@ -664,8 +627,8 @@ class Orbit:
             self.cone_outline_np.removeNode()
         if hasattr(self, 'groundtrack_node'):
             self.groundtrack_node.removeNode()
-        if self.label_np:
-            self.label_np.removeNode()
+        if self.label:
+            self.label.remove()
         if hasattr(self, 'orbit_tube_np') and self.orbit_tube_np:
             self.orbit_tube_np.removeNode()
 
@@ -0,0 +1,132 @@
+import numpy as np
+from panda3d.core import NodePath, Point3
+
+
+class FloatingOrigin:
+    """
+    Keeps the render origin on the body the camera is focused on.
+
+    Panda3D positions are single precision, so at interplanetary (or even
+    cislunar) distances from the origin the vertices and transforms of a
+    spacecraft are rounded to a fraction of its size, and it jitters when the
+    camera zooms in on it. With a floating origin, the master positions stay
+    in double precision NumPy arrays and only `position - origin` is given to
+    Panda3D, so the objects near the camera are always near the origin.
+
+    Two kinds of nodes follow the origin:
+
+      * registered nodes (`add`, `set_position`), such as the bodies and the chunks
+        of the trajectories: their offset from the origin is computed in double precision.
+      * the children of `frame`, a node placed at `-origin`: the content of the base
+        frame that doesn't need to be precise far from the absolute origin (grids, axes, ...).
+
+    Everything else under `render` is in render coordinates, i.e. relative to the
+    current origin (e.g. nodes placed from the `getPos(render)` of other nodes).
+
+    Changing the origin only moves these nodes (no geometry is rebuilt).
+    """
+
+    def __init__(self, parent):
+        """
+        Args:
+            parent: The app (with a `render` NodePath).
+        """
+        self.parent = parent
+        self.origin = np.zeros(3)  # in absolute coordinates
+        self.frame = parent.render.attachNewNode("world_frame")
+        self.focus = None          # registered node the origin follows
+        self.nodes = []            # registered nodes
+        self.positions = np.zeros((0, 3))  # their absolute positions
+        self._index = {}           # node -> index in `nodes`
+
+    def add(self, node_path: NodePath, position=(0, 0, 0)):
+        """
+        Register a node (a child of `render`) with its absolute position.
+
+        Args:
+            node_path (NodePath): The node.
+            position (array-like, optional): Its absolute position. Defaults to the absolute origin.
+        """
+        self.set_position(node_path, position)
+
+    def set_position(self, node_path: NodePath, position):
+        """
+        Set the absolute position of a node (registering it if needed).
+
+        If it's the node the origin follows, the origin is moved to it.
+
+        Args:
+            node_path (NodePath): The node.
+            position (array-like): Its absolute position.
+        """
+        position = np.asarray(position, dtype=float)
+        index = self._index.get(node_path)
+        if index is None:
+            index = self._index[node_path] = len(self.nodes)
+            self.nodes.append(node_path)
+            self.positions = np.vstack((self.positions, position))
+        else:
+            self.positions[index] = position
+        if node_path == self.focus:
+            self.set_origin(position)
+        else:
+            node_path.setPos(self.to_render(position))
+
+    def remove(self, node_path: NodePath):
+        """Unregister a node (it isn't moved anymore)."""
+        index = self._index.pop(node_path, None)
+        if index is None:
+            return
+        last = self.nodes.pop()
+        if index < len(self.nodes):
+            self.nodes[index] = last
+            self.positions[index] = self.positions[-1]
+            self._index[last] = index
+        self.positions = self.positions[:-1]
+        if node_path == self.focus:
+            self.focus = None
+
+    def follow(self, node_path: NodePath = None):
+        """
+        Keep the origin on a registered node (e.g. the rotator of the focused body).
+
+        Args:
+            node_path (NodePath, optional): The node. Defaults to None (the absolute origin).
+        """
+        self.focus = node_path
+        index = self._index.get(node_path)
+        self.set_origin(self.positions[index] if index is not None else (0, 0, 0))
+
+    def set_origin(self, position):
+        """
+        Move the render origin to an absolute position, re-basing all the nodes.
+
+        Args:
+            position (array-like): The new origin.
+        """
+        self.origin = np.array(position, dtype=float)
+        # forget the nodes that were removed from the scene
+        for node_path in [n for n in self.nodes if n.isEmpty() or not n.hasParent()]:
+            self.remove(node_path)
+        self.frame.setPos(Point3(*-self.origin))
+        for node_path, offset in zip(self.nodes, (self.positions - self.origin).tolist()):
+            node_path.setPos(*offset)
+
+    def to_render(self, position) -> Point3:
+        """Convert an absolute position to render coordinates."""
+        return Point3(*(np.asarray(position, dtype=float) - self.origin))
+
+    def to_world(self, point) -> np.ndarray:
+        """Convert a point in render coordinates to an absolute position."""
+        return self.origin + np.asarray(point, dtype=float)
+
+
+def get_floating_origin(parent) -> FloatingOrigin:
+    """The `FloatingOrigin` of the app `parent`, or None if it doesn't use one."""
+    return getattr(parent, "floating_origin", None)
+
+
+def world_frame(parent) -> NodePath:
+    """The node to attach the content of the base frame to: the floating origin's `frame`, or `render`."""
+    origin = get_floating_origin(parent)
+    return parent.render if origin is None else origin.frame
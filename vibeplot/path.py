@@ -2,12 +2,18 @@
 import math
 from direct.task import Task
 from panda3d.core import (Point3, LineSegs, NodePath, GeomNode, Geom, GeomVertexFormat, GeomVertexData, GeomVertexWriter, GeomTriangles, Vec3, TextNode, TransparencyAttrib)
-import json5 as json
 import bisect
-from scipy.interpolate import CubicSpline
 import numpy as np
 
-from .utilities import create_sphere, draw_path, simple_propagator, create_arrow_with_endpoints
+from .utilities import (draw_path, simple_propagator, simplify_polyline, create_arrow_with_endpoints,
+                        use_thick_lines)
+from .instancing import InstancedGlyphs, arrow_glyph_mesh, sphere_glyph_mesh
+from .polyline import ChunkedPolyline
+from .origin import get_floating_origin, world_frame
+
+HALO_LENGTH_SCALE = 1e-3       # scene units per km, for the trajectories in the halo format
+MAX_REFINE_LEVELS = 8          # each sample interval is split into at most 2**8 pieces
+RETESSELLATE_DISTANCE = 0.1    # re-tessellate when the camera moves this fraction of its distance to the path
 
 
 class Path():
@@ -31,12 +37,23 @@ class Path():
                  draw_markers=False,
                  marker_interval=10,
                  marker_radius=0.05,
-                 marker_color=(1, 1, 1, 0.5)
+                 marker_color=(1, 1, 1, 0.5),
+                 tolerance: float = 1e-4,
+                 screen_tolerance: float = None,
+                 length_scale: float = None
                  ):
         """
         Initialize the Path object by loading trajectory data from a JSON file or dictionary.
 
         :param filename: Path to the JSON file or a dictionary containing trajectory data.
+        :param tolerance: Maximum distance between the drawn path and the true path, as a fraction
+            of the size of the path. The samples given by `num_segments` or `time_step` are refined
+            where the path curves and thinned out where it is straight. None or 0 to draw the samples as is.
+        :param screen_tolerance: If set, the maximum error in pixels: the path is re-tessellated as the
+            camera moves, so the parts far from the camera are drawn with fewer vertices.
+        :param length_scale: Scene units per unit of the trajectory file. Defaults to 1, or to
+            `HALO_LENGTH_SCALE` for the halo format (km). The times are never scaled: they are
+            ephemeris times, on the timeline of the app (see `vibeplot.timesystem`).
         """
 
         self.parent = parent
@@ -46,11 +63,16 @@ class Path():
         self.speed = speed
         self.radius = radius
         self.thickness = thickness
+        # width of the lines in pixels when they are drawn as thick lines (None: GL lines)
+        self._line_width = thickness if use_thick_lines(parent) else None
         self.color = color
         self.orbit_path_linestyle = orbit_path_linestyle  # 0: solid, 1: dashed
         self.spline_mode = spline_mode
         self.orbit_json = orbit_json
         self.show_orbit_path = show_orbit_path
+        self.tolerance = tolerance
+        self.screen_tolerance = screen_tolerance
+        self.length_scale = length_scale
         self.trace_mode = trace_mode
         self.trace_dt = trace_dt
         self.trace_np = None  # NodePath for the trace
@@ -60,23 +82,34 @@ class Path():
         self.marker_interval = marker_interval
         self.marker_radius = marker_radius
         self.marker_color = marker_color if marker_color is not None else color
-        self.marker_nodes = []
+        self.marker_time_range = None  # (t0, t1) or None to mark the whole path
+        self.marker_glyphs = None  # the markers, as instanced spheres
 
         # Initialize trajectory data
         self.trajectory_points = None
         self.trajectory_times = None
         self.trajectory_colors = None
         self.trajectory_options = {}
+        self._times = None      # trajectory_times and trajectory_points as arrays, for vectorized sampling
+        self._positions = None
         self._splines = None
         self.dv_vectors = None
         self.dv0 = None
         self.dvf = None
         self.dv_arrows = []
+        self.dv_glyphs = None  # the delta-v vectors, as instanced arrows
+        self._dv_magnitudes = None
 
         if orbit_json:
             self._load_trajectory_from_json(orbit_json)
 
         # Create the path
+        self._tessellation = None  # (ts, points, colors, world tolerance) the drawn vertices are picked from
+        self._drawn = None         # indices of the drawn vertices in the tessellation
+        self.polyline = None       # the geometry of a solid path
+        self.orbit_path_np = None
+        self._retessellate_camera = None  # camera position of the last re-tessellation
+        self._retessellate_task_name = f"PathRetessellateTask{id(self)}"
         self.orbit_path_np = self._create_orbit_path()
 
     def update_trace(self, current_time: float):
@@ -89,15 +122,25 @@ class Path():
         # Sample points between t0 and t1
         num_trace_pts = 50
         ts = np.linspace(t0, t1, num_trace_pts)
-        pts = [self.get_orbit_state(t) for t in ts]
+        pts = self.get_orbit_states(ts)
 
         # Alpha fades from 0 (oldest) to 1 (newest)
         colors = [(self.color[0], self.color[1], self.color[2], float(i) / (num_trace_pts - 1)) for i in range(num_trace_pts)]
 
         # Remove previous trace
+        origin = get_floating_origin(self.parent)
         if self.trace_np:
+            if origin is not None:
+                origin.remove(self.trace_np)
             self.trace_np.removeNode()
-        self.trace_np = draw_path(self.parent.render, pts, linestyle=0, colors=colors)
+        # the trace is drawn relative to its last point (so it's precise with a floating origin)
+        anchor = pts[-1]
+        self.trace_np = draw_path(self.parent.render, pts - anchor, linestyle=0, colors=colors,
+                                  width=self._line_width)
+        if origin is not None:
+            origin.add(self.trace_np, anchor)
+        else:
+            self.trace_np.setPos(*anchor)
         self.trace_np.setRenderModeThickness(self.thickness)
         self.trace_np.setLightOff()
         self.trace_np.setTransparency(True)
@@ -107,12 +150,15 @@ class Path():
             # If filename is a dict, assume it's already loaded JSON data
             data = filename
         else:
+            import json5  # only needed when reading a file
             with open(filename, "r") as f:
-                data = json.load(f)
+                data = json5.load(f)
 
         if all(k in data for k in ("x", "y", "z", "t")):
             xs, ys, zs, ts = data["x"], data["y"], data["z"], data["t"]
             assert len(xs) == len(ys) == len(zs) == len(ts), "x, y, z, t must be same length"
+            length_scale = 1.0
+            options = {}
         elif 'segs' in data:
             # halo format - read all the segs into one trajectory
             print('reading trajectory from halo format')
@@ -129,17 +175,19 @@ class Path():
                 xs.extend(x[0:-2])
                 ys.extend(y[0:-2])
                 zs.extend(z[0:-2])
-            #.. for now, just scale the data...
-            ts = [100.0*(t-ts[0])/ts[-1] for t in ts]  # 0 - 100  --> TODO fix this
-            xs = [x / 1000.0 for x in xs]
-            ys = [y / 1000.0 for y in ys]
-            zs = [z / 1000.0 for z in zs]
+            length_scale = HALO_LENGTH_SCALE
+            # the epochs are ephemeris times, so the satellite is drawn at the time of the app
+            options = {"ephemeris_time": True}
         else:
             raise ValueError("JSON must contain 'x', 'y', 'z', 't' or 'seg' arrays")
+        if self.length_scale is not None:
+            length_scale = self.length_scale
 
-        self.trajectory_points = [Point3(x, y, z) for x, y, z in zip(xs, ys, zs)]
-        self.trajectory_times = ts
-        self.trajectory_options = data.get("options", {})
+        self._times = np.asarray(ts, dtype=float)
+        self._positions = np.column_stack((xs, ys, zs)).astype(float) * length_scale
+        self.trajectory_points = [Point3(*p) for p in self._positions]
+        self.trajectory_times = self._times.tolist()
+        self.trajectory_options = {**options, **data.get("options", {})}
 
         # --- Delta-v vectors support ---
         if all(k in data for k in ("dvx", "dvy", "dvz")):
@@ -170,6 +218,7 @@ class Path():
             self.trajectory_colors = None
 
         if self.spline_mode == "cubic":
+            from scipy.interpolate import CubicSpline  # scipy is slow to import, so only when needed
             bc_type = 'periodic' if self.trajectory_options.get("loop", False) else 'not-a-knot'
             self._splines = (
                 CubicSpline(ts, xs, bc_type=bc_type),
@@ -190,7 +239,7 @@ class Path():
             thickness=thickness,
             head_size=thickness * 3
         )
-        arrow.reparentTo(self.parent.render)
+        arrow.reparentTo(world_frame(self.parent))
         arrow.setLightOff()
         arrow.setTransparency(True)
         self.dv_arrows.append(arrow)
@@ -199,14 +248,43 @@ class Path():
                          scale: float = 1.0,
                          color: tuple = (1,0,0,1),
                          thickness: float = 0.05):
-        """Plot delta-v vectors as arrows at each trajectory point."""
+        """Plot delta-v vectors as arrows at each trajectory point (all drawn as one instanced Geom)."""
 
         if not self.dv_vectors or not self.trajectory_points:
             return
-        for p, dv in zip(self.trajectory_points, self.dv_vectors):
-            if dv.length() == 0:
-                continue
-            self._add_arrow(p, dv, scale, color, thickness)
+        points = np.array(self.trajectory_points)
+        dvs = np.array(self.dv_vectors)
+        magnitudes = np.linalg.norm(dvs, axis=1)
+        keep = (magnitudes > 0) & (np.linalg.norm(points, axis=1) > 0)
+        self._dv_magnitudes = magnitudes[keep]
+        self.dv_glyphs = InstancedGlyphs(self.parent, arrow_glyph_mesh(), head_length=thickness * 3,
+                                         thickness=thickness, name="dv_vectors", node=world_frame(self.parent))
+        self.dv_glyphs.set_instances(points[keep], dvs[keep], self._dv_magnitudes, color)
+        self.dv_glyphs.root.setLightOff()
+        self.dv_glyphs.root.setTransparency(True)
+        self.set_dv_style(scale=scale)
+
+    def set_dv_style(self, scale: float = None, color: tuple = None, min_dv: float = None):
+        """
+        Change how the delta-v vectors are drawn. Nothing is rebuilt, so this can be called every frame.
+
+        Args:
+            scale (float, optional): Length of the arrows per unit of delta-v.
+            color (tuple, optional): RGBA color of the arrows.
+            min_dv (float, optional): Only draw the delta-v vectors at least this large (0 for all).
+        """
+        if self.dv_glyphs is None:
+            return
+        if scale is not None:
+            self.dv_glyphs.set_scale(scale)
+            if scale == 0.0:
+                self.dv_glyphs.root.hide()
+            else:
+                self.dv_glyphs.root.show()
+        if color is not None:
+            self.dv_glyphs.set_colors(color)
+        if min_dv is not None:
+            self.dv_glyphs.set_filter(self._dv_magnitudes >= min_dv if min_dv > 0 else None)
 
     def get_orbit_state(self, et: float):
         """Return position on the orbit.
@@ -230,10 +308,11 @@ class Path():
                 if t >= times[-1]:
                     return points[-1]
                 i = bisect.bisect_right(times, t) - 1
+                # in double precision [the points are single precision]
                 t0, t1 = times[i], times[i+1]
-                p0, p1 = points[i], points[i+1]
+                p0, p1 = self._positions[i], self._positions[i+1]
                 alpha = (t - t0) / (t1 - t0)
-                return p0 * (1 - alpha) + p1 * alpha
+                return Point3(*(p0 * (1 - alpha) + p1 * alpha))
         else:
 
             #TODO need to consolidate this with _get_position_vector
@@ -241,6 +320,41 @@ class Path():
             r = simple_propagator(self.radius, self.inclination_deg, et, self.speed)
             return Point3(r[0], r[1], r[2])
 
+    def get_orbit_states(self, ets) -> np.ndarray:
+        """Vectorized `get_orbit_state`: returns the positions at all the times `ets` as an (n, 3) array."""
+        ets = np.asarray(ets, dtype=float)
+        if self.trajectory_points and self.trajectory_times:
+            if self._splines:
+                return np.column_stack([spline(ets) for spline in self._splines])
+            # np.interp clamps to the end points, like get_orbit_state
+            return np.column_stack([np.interp(ets, self._times, self._positions[:, k]) for k in range(3)])
+        return simple_propagator(self.radius, self.inclination_deg, ets, self.speed).T
+
+    def _refine_samples(self, ts, pts, tolerance: float) -> tuple:
+        """
+        Subdivide the sample intervals until the path is within `tolerance` of their chords.
+
+        The error of an interval is measured at its midpoint, and only the intervals
+        out of tolerance are split, so the samples end up concentrated where the path curves.
+
+        Args:
+            ts (np.ndarray): The sample times.
+            pts (np.ndarray): (n, 3) positions at `ts`.
+            tolerance (float): Maximum distance between the path and the chords.
+        Returns:
+            tuple: The refined (ts, pts).
+        """
+        for _ in range(MAX_REFINE_LEVELS):
+            mid_ts = 0.5 * (ts[:-1] + ts[1:])
+            mid_pts = self.get_orbit_states(mid_ts)
+            split = np.linalg.norm(mid_pts - 0.5 * (pts[:-1] + pts[1:]), axis=1) > tolerance
+            if not split.any():
+                break
+            order = np.argsort(np.concatenate((ts, mid_ts[split])), kind='stable')
+            ts = np.concatenate((ts, mid_ts[split]))[order]
+            pts = np.concatenate((pts, mid_pts[split]))[order]
+        return ts, pts
+
     def _create_orbit_path(self):
         """Create the orbital path visualization, using time_step if set, otherwise num_segments for interpolation modes."""
 
@@ -265,60 +379,228 @@ class Path():
             else:
                 ts = [2 * math.pi * i / self.num_segments for i in range(self.num_segments + 1)]
 
-        pts = [self.get_orbit_state(t) for t in ts]   #self.sample_orbit_path(ts)
+        ts = np.asarray(ts, dtype=float)
+        pts = self.get_orbit_states(ts)
         self._orbit_path_ts = ts
-        self._orbit_path_pts = pts
+        self._orbit_path_pts = [Point3(*p) for p in pts]
+
+        if self.tolerance:
+            # adaptive tessellation: refine the samples where the path curves, then drop the ones
+            # that aren't needed to stay within the tolerance
+            tolerance = self.tolerance * max(np.linalg.norm(pts.max(axis=0) - pts.min(axis=0)), 1e-12)
+            if self.trajectory_points and self.trajectory_times and not self._splines:
+                # the corners of a linearly interpolated trajectory are at its points
+                knots = self._times[(self._times > ts[0]) & (self._times < ts[-1])]
+                ts = np.union1d(ts, knots)
+                pts = self.get_orbit_states(ts)
+            ts, pts = self._refine_samples(ts, pts, tolerance)
+        else:
+            tolerance = None
 
         # --- Prepare per-point colors, resampled if needed ---
         if self.trajectory_colors and self.trajectory_times:
-            # Interpolate colors at the new ts
-            orig_times = np.array(self.trajectory_times)
+            # Interpolate each RGBA channel at the new ts
             orig_colors = np.array(self.trajectory_colors)  # shape: (N, 4)
-            ts_arr = np.array(ts)
-
-            # Interpolate each channel separately
-            resampled_colors = []
-            for k in range(4):  # RGBA channels
-                channel = orig_colors[:, k]
-                interp = np.interp(ts_arr, orig_times, channel)
-                resampled_colors.append(interp)
-            # Stack back into (len(ts), 4)
-            colors = np.stack(resampled_colors, axis=1)
-            colors = [tuple(c) for c in colors]
+            colors = np.column_stack([np.interp(ts, self._times, orig_colors[:, k]) for k in range(4)])
         else:
-            colors = [self.color] * len(pts)
+            colors = np.tile(np.asarray(self.color, dtype=float), (len(ts), 1))
+        self._tessellation = (ts, pts, colors, tolerance)
 
-        orbit_np = draw_path(self.parent.render, pts, linestyle=self.orbit_path_linestyle, colors=colors)
+        orbit_np = self._draw_tessellation()
         orbit_np.setRenderModeThickness(self.thickness)
         orbit_np.setLightOff()
         orbit_np.setTextureOff()
-        orbit_np.setShaderOff()
         orbit_np.clearColor()
         orbit_np.setTransparency(True)
         if not self.show_orbit_path:
             orbit_np.hide()
+        if tolerance and self.screen_tolerance:
+            self.parent.add_task(self._retessellate_task, self._retessellate_task_name, nopause=True)
 
         # Draw markers if enabled
         if self.draw_markers:
-            self._draw_markers(pts)
+            self._draw_markers(self._orbit_path_pts)
 
         return orbit_np
 
+    def _tessellate(self, camera_pos=None) -> np.ndarray:
+        """
+        Pick the vertices to draw from the refined samples.
+
+        Args:
+            camera_pos (np.ndarray, optional): Camera position in the coordinates of the path,
+                to use `screen_tolerance`. Defaults to None (use the world tolerance only).
+        Returns:
+            np.ndarray: Indices of the vertices to draw in the tessellation.
+        """
+        ts, pts, colors, tolerance = self._tessellation
+        if not tolerance:
+            return np.arange(len(ts))
+        if camera_pos is not None:
+            # the size of a pixel at the distance of each point
+            lens = self.parent.camLens
+            pixel = 2.0 * math.tan(math.radians(lens.getFov()[1]) / 2.0) / max(self.parent.win.getYSize(), 1)
+            distances = np.linalg.norm(pts - camera_pos, axis=1)
+            tolerance = np.maximum(tolerance, self.screen_tolerance * pixel * distances)
+        return simplify_polyline(pts, tolerance)
+
+    def _draw_tessellation(self, camera_pos=None) -> NodePath:
+        """
+        Build (or rebuild) the geometry of the path from the tessellation, as a `ChunkedPolyline`
+        (so the parts of the path that are offscreen are culled).
+
+        Args:
+            camera_pos (np.ndarray, optional): Camera position, see `_tessellate`.
+        Returns:
+            NodePath: The node of the path (the same one when rebuilding).
+        """
+        _, pts, colors, _ = self._tessellation
+        self._drawn = self._tessellate(camera_pos)
+        if self.polyline is None:
+            self.polyline = ChunkedPolyline(self.parent.render, pts[self._drawn], colors[self._drawn],
+                                            name="line_path", linestyle=self.orbit_path_linestyle,
+                                            width=self._line_width, origin=get_floating_origin(self.parent))
+        else:
+            self.polyline.set_points(pts[self._drawn], colors[self._drawn])
+        return self.polyline.root
+
+    def set_line_style(self, linestyle: int = None, dash_offset: float = None):
+        """
+        Change the line style of the path, or move its dashes (e.g. every frame to animate them).
+
+        The dashes are drawn by a shader, so the geometry isn't rebuilt.
+
+        Args:
+            linestyle (int, optional): See `LINE_STYLES`. Defaults to None (unchanged).
+            dash_offset (float, optional): Shift of the dash pattern along the path. Defaults to None (unchanged).
+        """
+        if linestyle is not None:
+            self.orbit_path_linestyle = linestyle
+        if self.polyline is not None:
+            self.polyline.set_line_style(linestyle, dash_offset)
+
+    def set_path_colors(self, color, time_range: tuple = None):
+        """
+        Recolor the path, or the part of it in a time range.
+
+        Only the chunks of the path in the time range are modified.
+
+        Args:
+            color (tuple): RGBA color.
+            time_range (tuple, optional): (t0, t1). Defaults to None (the whole path).
+        """
+        if self._tessellation is None:
+            return
+        ts, _, colors, _ = self._tessellation
+        if time_range is None:
+            indices = np.arange(len(ts))
+        else:
+            indices = np.flatnonzero((ts >= time_range[0]) & (ts <= time_range[1]))
+        if not len(indices):
+            return
+        colors[indices] = color
+        # the drawn vertices in the time range
+        start, stop = np.searchsorted(self._drawn, (indices[0], indices[-1] + 1))
+        self.polyline.set_colors(colors[self._drawn[start:stop]], start, stop)
+
+    def append_trajectory(self, ts, points, colors=None):
+        """
+        Add points at the end of the trajectory (e.g. as a propagation or telemetry comes in).
+
+        The new points are drawn as is, and only the last chunk of the path is rebuilt.
+
+        Args:
+            ts (array-like): Times of the new points, after the last time of the trajectory.
+            points (array-like): (n, 3) new points.
+            colors (array-like, optional): RGBA color or (n, 4) colors. Defaults to the path color.
+        """
+        if self.trajectory_points is None or self._tessellation is None:
+            raise ValueError("append_trajectory needs a trajectory loaded from JSON")
+        ts = np.asarray(ts, dtype=float).ravel()
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if len(ts) != len(points):
+            raise ValueError("ts and points must be the same length")
+        if not len(ts):
+            return
+        if ts[0] <= self._times[-1] or np.any(np.diff(ts) <= 0):
+            raise ValueError("the new times must be increasing and after the end of the trajectory")
+        colors = np.broadcast_to(np.asarray(self.color if colors is None else colors, dtype=float),
+                                 (len(ts), 4)).copy()
+
+        self._times = np.concatenate((self._times, ts))
+        self._positions = np.vstack((self._positions, points))
+        self.trajectory_times = list(self.trajectory_times) + ts.tolist()
+        self.trajectory_points = self.trajectory_points + [Point3(*p) for p in points]
+        if self.trajectory_colors:
+            self.trajectory_colors = self.trajectory_colors + [tuple(c) for c in colors]
+        if self._splines:
+            from scipy.interpolate import CubicSpline
+            self._splines = tuple(CubicSpline(self._times, self._positions[:, k]) for k in range(3))
+
+        self._orbit_path_ts = np.concatenate((self._orbit_path_ts, ts))
+        self._orbit_path_pts.extend(Point3(*p) for p in points)
+        old_ts, old_pts, old_colors, tolerance = self._tessellation
+        self._tessellation = (np.concatenate((old_ts, ts)), np.vstack((old_pts, points)),
+                              np.vstack((old_colors, colors)), tolerance)
+        self._drawn = np.concatenate((self._drawn, len(old_ts) + np.arange(len(ts))))
+        self.polyline.append(points, colors)
+        if self.marker_glyphs is not None:
+            self._draw_markers(self._orbit_path_pts)  # a marker on each of the new points too
+        if getattr(self.parent, "state_cache", None) is not None:
+            self.parent.state_cache.invalidate()  # the keyframes sampled the old trajectory
+
+    def _retessellate_task(self, et):
+        """Re-tessellate the path for the current camera position, when it has moved enough."""
+        if self.orbit_path_np is None or self.orbit_path_np.isHidden():
+            return Task.cont
+        camera_pos = np.array(self.parent.camera.getPos(self.orbit_path_np))
+        origin = get_floating_origin(self.parent)
+        if origin is not None:
+            camera_pos = origin.to_world(camera_pos)  # the chunks are placed by the origin
+        if self._retessellate_camera is not None:
+            distance = np.min(np.linalg.norm(self._tessellation[1] - self._retessellate_camera, axis=1))
+            if np.linalg.norm(camera_pos - self._retessellate_camera) < RETESSELLATE_DISTANCE * distance:
+                return Task.cont
+        self._retessellate_camera = camera_pos
+        self._draw_tessellation(camera_pos)
+        return Task.cont
+
     def _draw_markers(self, pts):
-        # Remove old markers
-        for node in getattr(self, "marker_nodes", []):
-            node.removeNode()
-        self.marker_nodes = []
-        # Draw new markers [faster to only create once and copy]
-        if not hasattr(self, "_marker_model"):
-            self._marker_model = create_sphere(self.marker_radius, color=self.marker_color)
-        for i, pt in enumerate(pts):
-            if i % self.marker_interval == 0:
-                marker = self._marker_model.copyTo(self.parent.render)
-                marker.setPos(pt)
-                marker.setLightOff()
-                marker.setTransparency(True)
-                self.marker_nodes.append(marker)
+        """Draw markers on the path points (all drawn as one instanced Geom)."""
+        if self.marker_glyphs is None:
+            self.marker_glyphs = InstancedGlyphs(self.parent, sphere_glyph_mesh(), name="path_markers",
+                                                 node=world_frame(self.parent))
+            self.marker_glyphs.root.setLightOff()
+            self.marker_glyphs.root.setTransparency(True)
+        self.marker_glyphs.set_instances(np.array(pts, dtype=float), lengths=self.marker_radius,
+                                         colors=self.marker_color)
+        self.set_marker_filter()
+
+    def set_marker_filter(self, interval: int = None, time_range: tuple = None):
+        """
+        Choose which path points are marked.
+
+        Only the instance array of the markers is rewritten (no nodes are
+        created), so this can be changed at any time, even with a marker on
+        every point of a long trajectory.
+
+        Args:
+            interval (int, optional): Mark every `interval`-th point (1 for all of them).
+                Defaults to None (unchanged).
+            time_range (tuple, optional): (t0, t1) to only mark the points in that time range,
+                or () to mark the whole path. Defaults to None (unchanged).
+        """
+        if interval is not None:
+            self.marker_interval = max(1, int(interval))
+        if time_range is not None:
+            self.marker_time_range = tuple(time_range) or None
+        if self.marker_glyphs is None:
+            return
+        mask = np.arange(len(self.marker_glyphs.positions)) % self.marker_interval == 0
+        if self.marker_time_range is not None:
+            ts = np.asarray(self._orbit_path_ts, dtype=float)
+            mask &= (ts >= self.marker_time_range[0]) & (ts <= self.marker_time_range[1])
+        self.marker_glyphs.set_filter(mask)
 
     def destroy(self):
         """Clean up all NodePaths and references created by this Path."""
@@ -326,6 +608,7 @@ class Path():
         # Remove the main orbit path
         if hasattr(self, 'orbit_path_np') and self.orbit_path_np:
             self.orbit_path_np.removeNode()
+            self.parent.remove_task(self._retessellate_task_name)
         # Remove the trace, if present
         if hasattr(self, 'trace_np') and self.trace_np:
             self.trace_np.removeNode()
@@ -334,9 +617,15 @@ class Path():
             for arrow in self.dv_arrows:
                 if arrow:
                     arrow.removeNode()
+        if getattr(self, 'dv_glyphs', None):
+            self.dv_glyphs.remove()
+        # Remove the markers, if present
+        if getattr(self, 'marker_glyphs', None):
+            self.marker_glyphs.remove()
 
         self.trace_np = None
         self.orbit_path_np = None
+        self.polyline = None
         self.trajectory_points = None
         self.trajectory_times = None
         self.trajectory_colors = None
@@ -344,4 +633,9 @@ class Path():
         self.dv0 = None
         self.dvf = None
         self.dv_arrows = []
+        self.dv_glyphs = None
+        self.marker_glyphs = None
+        self._tessellation = None
+        self._times = None
+        self._positions = None
         self._splines = None
\ No newline at end of file
@@ -10,6 +10,8 @@ from panda3d.core import (LineSegs,
                           NodePath)
 import math
 
+from .batching import mark_static
+
 class Plane:
     """Base class for drawing planes in 3D space.
 
@@ -81,7 +83,7 @@ class Plane:
         plane_np.setLightOff()
         plane_np.setTwoSided(True)
         plane_np.setBin('fixed', 10)  # or 'transparent', 20
-        self.plane_np = plane_np
+        self.plane_np = mark_static(plane_np)
 
         # --- Gridlines on the plane ---
         gridlines = LineSegs()
@@ -133,4 +135,4 @@ class Plane:
         grid_np.setTwoSided(True)
         grid_np.setTransparency(TransparencyAttrib.MAlpha)
         grid_np.setBin('fixed', 11)  # or 'transparent', 21
-        self.grid_np = grid_np
\ No newline at end of file
+        self.grid_np = mark_static(grid_np)
\ No newline at end of file
@@ -0,0 +1,232 @@
+import numpy as np
+from panda3d.core import GeomLines, NodePath
+
+from .utilities import (make_geom_node, vertex_dtype, line_vertex_format, line_style_pattern, set_line_style,
+                        arc_lengths, thick_line_vertex_format, thick_lines_node)
+
+CHUNK_SIZE = 4096  # number of segments per chunk
+
+
+class ChunkedPolyline:
+    """
+    A long polyline split into chunks of consecutive points.
+
+    Each chunk is its own GeomNode, so it gets its own bounding volume: since
+    the points of a trajectory are spatially coherent, Panda3D can cull the
+    chunks that are offscreen. Edits only touch the chunks they affect:
+    `set_colors` rewrites the colors of a range of points in place, and
+    `append` only rebuilds the last chunk (and adds new ones).
+
+    Consecutive chunks share their end point, so the line is continuous.
+
+    The vertices carry their arc length along the line (relative to the start
+    of their chunk), so the line styles are drawn by a shader: `set_line_style`
+    only changes shader inputs.
+
+    With a `width`, the chunks are thick lines (see `thick_lines_node`) instead of GL lines.
+
+    The vertices of a chunk are relative to its first point, which is the
+    position of the chunk node: with a `FloatingOrigin`, the chunks are
+    registered with it, so the points near the camera stay precise.
+    """
+
+    def __init__(self, parent_np: NodePath, points, colors=(1, 1, 1, 1),
+                 chunk_size: int = CHUNK_SIZE, name: str = "polyline", linestyle: int = 0,
+                 width: float = None, origin=None):
+        """
+        Args:
+            parent_np (NodePath): Node to attach the polyline to.
+            points (np.ndarray): (n, 3) points.
+            colors (tuple or np.ndarray, optional): RGBA color, or (n, 4) colors (one per point).
+                Defaults to white.
+            chunk_size (int, optional): Number of segments per chunk. Defaults to 4096.
+            name (str, optional): Name of the root node. Defaults to "polyline".
+            linestyle (int, optional): See `LINE_STYLES`. Defaults to 0 (solid).
+            width (float, optional): Width in pixels, to draw thick lines (the app must `use_thick_lines`).
+                Defaults to None (GL lines).
+            origin (FloatingOrigin, optional): The floating origin of the app (then the points are
+                absolute positions and `parent_np` must be in render coordinates). Defaults to None.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.chunk_size = chunk_size
+        self.name = name
+        self.root = parent_np.attachNewNode(name)
+        self.root.setTransparency(True)
+        self.root.setLightOff()
+        self.root.setTwoSided(True)
+        self.chunks = []       # NodePath of each chunk
+        self._chunk_arcs = []  # arc length at the start of each chunk
+        self.num_points = 0
+        self.width = width
+        self.origin = origin
+        self.linestyle = 0
+        self.dash_offset = 0.0
+        self._period = None    # length of the dash pattern (None when solid)
+        self._tail = None      # (points, colors) of the last chunk, to append to it
+        self._format = line_vertex_format() if width is None else thick_line_vertex_format()
+        self._dtype = vertex_dtype(self._format)
+        self.set_points(points, colors)
+        self.set_line_style(linestyle)
+
+    def set_points(self, points, colors=(1, 1, 1, 1)):
+        """Replace all the points (and rebuild all the chunks)."""
+        for chunk in self.chunks:
+            self._remove_chunk(chunk)
+        self.chunks = []
+        self._chunk_arcs = []
+        self._tail = None
+        self.num_points = 0
+        self.append(points, colors)
+
+    def append(self, points, colors=(1, 1, 1, 1)):
+        """
+        Add points at the end of the polyline.
+
+        Only the last chunk is rebuilt (if it isn't full), and new chunks are added as needed.
+
+        Args:
+            points (np.ndarray): (n, 3) points.
+            colors (tuple or np.ndarray, optional): RGBA color, or (n, 4) colors. Defaults to white.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        colors = np.broadcast_to(np.asarray(colors, dtype=float), (len(points), 4))
+        if not len(points):
+            return
+        if self.chunks:
+            # continue from the last chunk, refilling it if it isn't full
+            last_points, last_colors = self._tail
+            arc = self._chunk_arcs[-1]
+            if len(last_points) <= self.chunk_size:
+                self._remove_chunk(self.chunks.pop())
+                self._chunk_arcs.pop()
+            else:
+                arc += float(arc_lengths(last_points)[-1])
+                last_points, last_colors = last_points[-1:], last_colors[-1:]
+            self.num_points -= len(last_points)
+            points = np.vstack((last_points, points))
+            colors = np.vstack((last_colors, colors))
+        else:
+            arc = 0.0
+        self.num_points += len(points)
+        arcs = arc + arc_lengths(points)
+        start = 0
+        while True:
+            end = min(start + self.chunk_size + 1, len(points))
+            self._chunk_arcs.append(float(arcs[start]))
+            self.chunks.append(self._make_chunk(points[start:end], colors[start:end]))
+            if end == len(points):
+                break
+            start = end - 1
+        self._tail = (points[start:].copy(), colors[start:].copy())
+
+    def _make_chunk(self, points, colors) -> NodePath:
+        """Create the GeomNode of a chunk."""
+        offset = points[0]
+        points = points - offset
+        if self.width is not None:
+            node = thick_lines_node(f"{self.name}_chunk", [points], [colors], self.width)
+        else:
+            n = len(points)
+            lines = np.column_stack((np.arange(n - 1), np.arange(1, n))) if n > 1 else np.zeros((0, 2))
+            node = make_geom_node(f"{self.name}_chunk", self._format,
+                                  {'vertex': points, 'color': colors, 'arc_length': arc_lengths(points)},
+                                  lines, primitive=GeomLines)
+        chunk = self.root.attachNewNode(node)
+        if self.origin is not None:
+            self.origin.add(chunk, offset)
+        else:
+            chunk.setPos(*offset)
+        if self._period:
+            chunk.setShaderInput("dash_start", self._chunk_arcs[len(self.chunks)] % self._period)
+        return chunk
+
+    def _remove_chunk(self, chunk: NodePath):
+        """Remove the node of a chunk (and unregister it from the floating origin)."""
+        if self.origin is not None:
+            self.origin.remove(chunk)
+        chunk.removeNode()
+
+    def _read_chunk(self, index: int) -> np.ndarray:
+        """The vertex rows of a chunk, as a writable structured array (a view of the vertex data)."""
+        vdata = self.chunks[index].node().modifyGeom(0).modifyVertexData()
+        return np.frombuffer(memoryview(vdata.modifyArray(0)), dtype=np.uint8).view(self._dtype)
+
+    def set_colors(self, colors, start: int = 0, stop: int = None):
+        """
+        Change the colors of the points `start` to `stop` (excluded).
+
+        The vertex data of the affected chunks is modified in place; the other chunks aren't touched.
+
+        Args:
+            colors (tuple or np.ndarray): RGBA color, or one color per point of the range.
+            start (int, optional): First point. Defaults to 0.
+            stop (int, optional): End of the range. Defaults to the number of points.
+        """
+        stop = self.num_points if stop is None else min(stop, self.num_points)
+        if stop <= start:
+            return
+        colors = np.broadcast_to(np.asarray(colors, dtype=float), (stop - start, 4))
+        tail_start = self.num_points - len(self._tail[0])
+        if stop > tail_start:
+            self._tail[1][max(start, tail_start) - tail_start:stop - tail_start] = colors[max(start, tail_start) - start:]
+        colors = np.clip(np.round(colors * 255), 0, 255)
+        # the last point of a chunk is also the first one of the next chunk
+        first_chunk = max(0, (start - 1) // self.chunk_size)
+        last_chunk = min(len(self.chunks) - 1, (stop - 1) // self.chunk_size)
+        for index in range(first_chunk, last_chunk + 1):
+            chunk_start = index * self.chunk_size
+            chunk_size = min(self.chunk_size + 1, self.num_points - chunk_start)
+            i0 = max(start, chunk_start) - chunk_start
+            i1 = min(stop, chunk_start + chunk_size) - chunk_start
+            if i1 <= i0:
+                continue
+            chunk_colors = colors[i0 + chunk_start - start:i1 + chunk_start - start]
+            rows = self._read_chunk(index)
+            if self.width is None:
+                rows['color'][i0:i1] = chunk_colors
+            else:
+                # each point is the start of a segment (quad corners 0 and 1) and the end of the
+                # previous one (corners 2 and 3)
+                quads = rows.reshape(-1, 4)
+                num_segments = len(quads)
+                j1 = min(i1, num_segments)
+                if j1 > i0:
+                    quads['color'][i0:j1, 0:2] = chunk_colors[:j1 - i0, None]
+                j0 = max(i0, 1)
+                if i1 > j0:
+                    quads['color'][j0 - 1:i1 - 1, 2:4] = chunk_colors[j0 - i0:, None]
+
+    def set_line_style(self, linestyle: int = None, dash_offset: float = None):
+        """
+        Change the line style, or move the dashes along the line (e.g. to animate them).
+
+        Only shader inputs are changed: the geometry isn't rebuilt.
+
+        Args:
+            linestyle (int, optional): See `LINE_STYLES`. Defaults to None (unchanged).
+            dash_offset (float, optional): Shift of the dash pattern along the line. Defaults to None (unchanged).
+        """
+        if linestyle is not None:
+            self.linestyle = linestyle
+            pattern = line_style_pattern(self.linestyle)
+            if set_line_style(self.root, self.linestyle, self.dash_offset,
+                              thick=self.width is not None) and pattern is not None:
+                self._period = sum(pattern)
+                for chunk, arc in zip(self.chunks, self._chunk_arcs):
+                    chunk.setShaderInput("dash_start", arc % self._period)
+            else:
+                self._period = None
+        if dash_offset is not None:
+            self.dash_offset = dash_offset
+            if self._period:
+                self.root.setShaderInput("dash_offset", float(dash_offset))
+
+    def remove(self):
+        """Remove the polyline from the scene."""
+        for chunk in self.chunks:
+            self._remove_chunk(chunk)
+        self.root.removeNode()
+        self.chunks = []
+        self._tail = None
+        self.num_points = 0
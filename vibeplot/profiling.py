@@ -0,0 +1,58 @@
+import time
+
+
+class StartupTimer:
+    """
+    Records how long each section of a startup sequence takes.
+
+    Call `lap` at the end of each section; the time since the previous lap
+    (or since the timer was created) is attributed to that section.
+
+    ### Example:
+    ```python
+    timer = StartupTimer()
+    build_stars()
+    timer.lap("stars")
+    build_bodies()
+    timer.lap("bodies")
+    print(timer.report())
+    ```
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._last = self.start
+        self.sections = []  # list of (name, seconds)
+
+    def lap(self, name: str) -> float:
+        """
+        End the current section.
+
+        Args:
+            name (str): Name of the section.
+        Returns:
+            float: Duration of the section in seconds.
+        """
+        now = time.perf_counter()
+        duration = now - self._last
+        self._last = now
+        self.sections.append((name, duration))
+        return duration
+
+    @property
+    def total(self) -> float:
+        """Total time of all the sections, in seconds."""
+        return self._last - self.start
+
+    def report(self) -> str:
+        """
+        Returns a table of the sections, slowest first.
+        """
+        total = self.total
+        width = max([len(name) for name, _ in self.sections] + [len("total")])
+        lines = [f"{'section':<{width}}  {'time (s)':>9}  {'%':>5}"]
+        for name, duration in sorted(self.sections, key=lambda s: s[1], reverse=True):
+            percent = 100 * duration / total if total > 0 else 0.0
+            lines.append(f"{name:<{width}}  {duration:9.3f}  {percent:5.1f}")
+        lines.append(f"{'total':<{width}}  {total:9.3f}  {100.0:5.1f}")
+        return "\n".join(lines)
@@ -0,0 +1,92 @@
+import os
+import glob
+import hashlib
+
+from .batching import StaticBatcher
+
+# changes to any of these invalidate the cache, since they generate the geometry
+_SOURCE_FILES = glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))
+
+
+def scene_key(files: list = None, params: dict = None) -> str:
+    """
+    Compute a key identifying the inputs used to build a scene.
+
+    Files are identified by their path, size and modification time (not their
+    contents, so that computing the key is cheap). The vibeplot source files
+    are always included.
+
+    Args:
+        files (list, optional): Input files used to build the scene (missing or None entries are allowed).
+        params (dict, optional): Any other parameters affecting the scene.
+    Returns:
+        str: A hex digest.
+    """
+    h = hashlib.sha1()
+    for filename in sorted(_SOURCE_FILES) + [f for f in files or [] if f]:
+        h.update(os.path.abspath(filename).encode())
+        if os.path.isfile(filename):
+            stat = os.stat(filename)
+            h.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    h.update(repr(sorted((params or {}).items())).encode())
+    return h.hexdigest()
+
+
+class SceneCache:
+    """
+    Caches the static geometry of a scene in a `.bam` file.
+
+    The static geometry is the cacheable geometry merged by a `StaticBatcher`
+    (grids, boundaries, markers, stars, ...). The animated parts of the scene
+    (bodies, orbits, tasks, labels) are still built normally.
+
+    Usage:
+
+    ```python
+    cache = SceneCache(app.static_batcher, "cache", files=[...], params={...})
+    cache.begin()    # before building the scene
+    ...              # build the scene, skipping static geometry if `static_cached(app)`
+    cache.end()      # after building the scene
+    ```
+    """
+
+    def __init__(self, batcher: StaticBatcher, directory: str, files: list = None, params: dict = None):
+        """
+        Args:
+            batcher (StaticBatcher): The batcher of the scene.
+            directory (str): Directory where the cache files are stored.
+            files (list, optional): Input files used to build the scene.
+            params (dict, optional): Any other parameters affecting the scene.
+        """
+        self.batcher = batcher
+        self.directory = directory
+        self.key = scene_key(files, params)
+        self.filename = os.path.join(directory, f"scene_{self.key}.bam")
+
+    def begin(self):
+        """Check for a cached scene. If there is one, the static geometry doesn't need to be built."""
+        self.batcher.use_cache = os.path.isfile(self.filename)
+
+    def end(self):
+        """
+        Restore the static geometry from the cache (if there was one),
+        otherwise bake the scene and write a new cache file.
+        """
+        if self.batcher.use_cache:
+            # anything static added after this point is built normally
+            self.batcher.use_cache = False
+            try:
+                self.batcher.load(self.filename)
+            except ValueError as e:
+                # an unreadable file. the static geometry wasn't built, so the scene
+                # is incomplete: remove the file so it is rebuilt next time.
+                print(f"Warning: {e}")
+                os.remove(self.filename)
+            self.batcher.bake()  # any non-cacheable static geometry
+            return
+        self.batcher.bake()
+        os.makedirs(self.directory, exist_ok=True)
+        # remove stale caches
+        for filename in glob.glob(os.path.join(self.directory, "scene_*.bam")):
+            os.remove(filename)
+        self.batcher.save(self.filename)
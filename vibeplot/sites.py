@@ -3,6 +3,7 @@ import math
 from .utilities import create_sphere, create_body_fixed_arrow
 from direct.showbase.ShowBase import ShowBase
 from .bodies import Body
+from .statecache import rotate_vectors
 import numpy as np
 
 
@@ -24,7 +25,8 @@ class Site(Body):
         # Compute position in central_body's local coordinates
         x, y, z = self.get_body_fixed_position()
 
-        # Call Body's constructor
+        # Call Body's constructor. site markers are tiny, so a view-dependent mesh isn't worth its update cost.
+        kwargs.setdefault('lod', False)
         super().__init__(parent, name=name, **kwargs)
 
         # a site should not inherit the lighting or texture from the parent body
@@ -45,12 +47,11 @@ class Site(Body):
         self._body.setPos(x, y, z)
 
         # Override the label position for sites
-        if hasattr(self, 'body_label_np'):
-            # Parent the label to the site's _rotator
-            self.body_label_np.reparentTo(self._rotator)
-            # Position the label exactly at the site
-            self.body_label_np.setPos(0, 0, 0)  # No offset, directly at the site
-            # self.body_label_np.setScale(0.5)  # Adjust this value as needed
+        if hasattr(self, 'body_label'):
+            # Position the label exactly at the site (no offset)
+            self.body_label.set_anchor(self._rotator, (0, 0, 0))
+        # the site marker is too small to hide labels (and would hide its own)
+        self.parent.label_manager.remove_occluder(self._body)
 
     def set_visible(self, visible=True):
         if visible:
@@ -59,6 +60,8 @@ class Site(Body):
             self.node.hide()
 
     def destroy(self):
+        if hasattr(self, 'body_label'):
+            self.body_label.remove()
         self.node.removeNode()
 
     def get_body_fixed_position(self):
@@ -71,6 +74,12 @@ class Site(Body):
         z = r * math.sin(lat)
         return x, y, z
 
+    def trace_positions(self, ets) -> np.ndarray:
+        """Absolute positions of the site at the times `ets`: it's fixed on its rotating central body."""
+        central_body = self.central_body
+        return (central_body.trace_positions(ets) +
+                rotate_vectors(central_body.trace_orientations(ets), self.get_body_fixed_position()))
+
     def get_position_vector(self, et: float):
         """Override to keep the site fixed relative to the central body."""
         # Sites don't orbit - they stay fixed on the surface
@@ -5,8 +5,7 @@ import math
 from direct.showbase.ShowBase import ShowBase
 from direct.task import Task
 
-from panda3d.core import (TextNode,
-                          LineSegs,
+from panda3d.core import (LineSegs,
                           Geom,
                           GeomVertexFormat,
                           GeomVertexData,
@@ -15,7 +14,11 @@ from panda3d.core import (TextNode,
                           GeomNode,
                           GeomVertexArrayFormat)
 
-from .utilities import create_sphere, lonlat_to_xyz
+from .utilities import GEOMETRY_CACHE, lonlat_to_xyz
+from .batching import mark_static, static_cached
+from .labels import get_label_manager
+
+STAR_LABEL_PIXELS = 11  # size of the star names, in pixels
 
 
 class Stars():
@@ -72,16 +75,16 @@ class Stars():
             self.stars.setCompass()  # Keep stars stationary relative to camera
             star_tex = self.parent.loader.loadTexture(star_image)
             self.stars.setTexture(star_tex, 1)
-        else:
+        elif self.parent.win is not None:  # [no window when headless]
             self.parent.win.setClearColor((0, 0, 0, 1))  # black background
 
         if star_database:
             self.add_stars(star_database, num_stars=500)
             # self.add_stars_as_points(star_database, num_stars=500)
-            if constellation_lines:
+            if constellation_lines and not static_cached(self.parent):
                 self.draw_constellations()
 
-        if sky_grid:
+        if sky_grid and not static_cached(self.parent):
             self.draw_sky_grid(sphere_radius=self.star_sphere_radius)
 
         self.parent.add_task(self.update_star_sphere, "UpdateStarSphere", nopause=True)
@@ -116,6 +119,7 @@ class Stars():
 
         # Place each star on a celestial sphere of large radius
         self.star_positions = {}
+        label_manager = get_label_manager(self.parent)
         for star in stars:
             ra = star['ra'] * 15  # convert hours to degrees
             dec = star['dec']
@@ -145,21 +149,19 @@ class Stars():
             # Scale star size by magnitude (smaller mag = bigger)
             size = max(0.05, 0.25 - 0.04 * (mag + 1.5))
             #color = (1, 0, 0, 1)  # white, or use color index if desired
-            star_np = create_sphere(radius=size, num_lat=6, num_lon=12, color=color)
-            star_np.setPos(x, y, z)
-            # star_np.reparentTo(self.render)
-            star_np.reparentTo(self.star_sphere_np)
-            star_np.setLightOff()
-            star_np.setTransparency(True)
+            if not static_cached(self.parent):  # else, restored from the scene cache
+                star_np = GEOMETRY_CACHE.sphere(radius=size, num_lat=6, num_lon=12, color=color)
+                star_np.setPos(x, y, z)
+                # star_np.reparentTo(self.render)
+                star_np.reparentTo(self.star_sphere_np)
+                star_np.setLightOff()
+                star_np.setTransparency(True)
+                mark_static(star_np)
             if mag < 100.0 and star['name']:
-                text_node = TextNode('star_label')
-                text_node.setText(star['name'])
-                text_node.setTextColor(color)
-                text_node.setAlign(TextNode.ACenter)
-                text_np = star_np.attachNewNode(text_node)
-                text_np.setScale(0.9)  # Adjust size as needed
-                text_np.setPos(0, 0, size * 2.5)  # Offset above the star
-                text_np.setBillboardAxis()  # Make label always face the camera
+                # attached to the star sphere node since the star itself is scaled.
+                # the brightest stars win when their labels overlap.
+                label_manager.add(star['name'], self.star_sphere_np, (x, y, z + size * 2.5), color,
+                                  size=STAR_LABEL_PIXELS, priority=-10 - mag)
 
     def draw_constellations(self, filename: str = "models/inp_Constellation.txt", color = (1, 1, 0.5, 0.3), thickness: float = 1.0):
         """
@@ -206,7 +208,7 @@ class Stars():
                 segs.moveTo(x1, y1, z1)
                 segs.drawTo(x2, y2, z2)
 
-            constellation_np = self.star_sphere_np.attachNewNode(segs.create())
+            constellation_np = mark_static(self.star_sphere_np.attachNewNode(segs.create()))
             constellation_np.setLightOff()
             constellation_np.setTransparency(True)
 
@@ -333,7 +335,7 @@ class Stars():
                 else:
                     grid.drawTo(x, y, z)
 
-        sky_grid_np = self.star_sphere_np.attachNewNode(grid.create())
+        sky_grid_np = mark_static(self.star_sphere_np.attachNewNode(grid.create()))
         sky_grid_np.setLightOff()
         sky_grid_np.setTransparency(True)
         sky_grid_np.setTwoSided(True)
@@ -0,0 +1,159 @@
+import numpy as np
+from panda3d.core import Quat
+
+STATE_CACHE_SAMPLES = 2001  # default number of keyframes over the timeline
+
+
+class StateCache:
+    """
+    Keyframes of the positions and orientations of the whole scene, for scrubbing the timeline.
+
+    The bodies (position and orientation of their rotator) and the orbits
+    (position of their satellite relative to the central body) are sampled
+    at `num_samples` evenly spaced times over the timeline of the app, into
+    one array per kind of state. While the time slider is dragged, the
+    states are interpolated from these arrays rather than evaluated
+    (splines, analytic models, ephemerides, ...).
+
+    The keyframes are built on first use, and rebuilt when bodies or orbits
+    are added or removed, or when the timeline changes.
+    """
+
+    def __init__(self, parent, num_samples: int = STATE_CACHE_SAMPLES):
+        """
+        Args:
+            parent: The app (with `bodies`, `orbits` and `time_system`).
+            num_samples (int, optional): Number of keyframes over the timeline. Defaults to 2001.
+        """
+        if num_samples < 2:
+            raise ValueError("a state cache needs at least 2 samples")
+        self.parent = parent
+        self.num_samples = num_samples
+        self.times = None
+        self.positions = None     # (num_objects, num_samples, 3) float64
+        self.quaternions = None   # (num_objects, num_samples, 4) float32, Panda3D order (r, i, j, k)
+        self._rows = {}           # id(object) -> row in the arrays
+        self._key = None
+
+    @property
+    def active(self) -> bool:
+        """True when the keyframes are used (while the time slider is dragged)."""
+        return self.parent.use_slider_time
+
+    def _make_key(self) -> tuple:
+        time_system = self.parent.time_system
+        return (tuple(id(b) for b in self.parent.bodies), tuple(id(o) for o in self.parent.orbits),
+                time_system.start, time_system.stop, self.num_samples)
+
+    def invalidate(self):
+        """Force the keyframes to be rebuilt on next use (e.g. after a body's trajectory changed)."""
+        self._key = None
+
+    def update(self) -> bool:
+        """
+        Rebuild the keyframes if the scene or the timeline has changed.
+
+        Returns:
+            bool: True if they were rebuilt.
+        """
+        key = self._make_key()
+        if key == self._key:
+            return False
+        time_system = self.parent.time_system
+        self.times = np.linspace(time_system.start, time_system.stop, self.num_samples)
+        objects = []
+        positions = []
+        quaternions = []
+        for body in self.parent.bodies:
+            states = body.sample_states(self.times)
+            if states is not None and body not in objects:
+                objects.append(body)
+                positions.append(states[0])
+                quaternions.append(states[1])
+        identity = np.tile(np.array([1, 0, 0, 0], dtype=np.float32), (self.num_samples, 1))
+        for orbit in self.parent.orbits:
+            if orbit in objects:
+                continue
+            objects.append(orbit)
+            positions.append(orbit.satellite_positions(self.times))
+            quaternions.append(identity)
+        self._rows = {id(o): row for row, o in enumerate(objects)}
+        self.positions = np.array(positions, dtype=float).reshape(-1, self.num_samples, 3)
+        self.quaternions = np.array(quaternions, dtype=np.float32).reshape(-1, self.num_samples, 4)
+        self._key = key
+        return True
+
+    def _lookup(self, obj, ets):
+        """Row of `obj`, and (indices, fractions) of the keyframe intervals containing the times `ets`."""
+        self.update()
+        row = self._rows.get(id(obj))
+        if row is None:
+            return None
+        x = (np.asarray(ets, dtype=float) - self.times[0]) / (self.times[-1] - self.times[0]) * (self.num_samples - 1)
+        i = np.clip(np.floor(x), 0, self.num_samples - 2).astype(int)
+        return row, i, np.clip(x - i, 0.0, 1.0)
+
+    def positions_at(self, obj, ets) -> np.ndarray:
+        """
+        Interpolated positions of a body or orbit satellite at the times `ets` (see `StateCache`).
+
+        Returns:
+            np.ndarray: (n, 3) positions, or None if `obj` isn't cached.
+        """
+        lookup = self._lookup(obj, ets)
+        if lookup is None:
+            return None
+        row, i, alpha = lookup
+        p = self.positions[row]
+        alpha = alpha[:, np.newaxis]
+        return p[i] * (1.0 - alpha) + p[i + 1] * alpha
+
+    def orientations_at(self, obj, ets) -> np.ndarray:
+        """
+        Interpolated orientations of a body at the times `ets` (normalized linear interpolation of the keyframes).
+
+        Returns:
+            np.ndarray: (n, 4) quaternions in Panda3D order, or None if `obj` isn't cached.
+        """
+        lookup = self._lookup(obj, ets)
+        if lookup is None:
+            return None
+        row, i, alpha = lookup
+        q = self.quaternions[row].astype(float)
+        alpha = alpha[:, np.newaxis]
+        q = q[i] * (1.0 - alpha) + q[i + 1] * alpha
+        return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+    def position(self, obj, et: float) -> np.ndarray:
+        """Interpolated position of a body or orbit satellite (see `positions_at`), or None."""
+        positions = self.positions_at(obj, [et])
+        return None if positions is None else positions[0]
+
+    def orientation(self, obj, et: float) -> Quat:
+        """Interpolated orientation of a body (see `orientations_at`), or None."""
+        quats = self.orientations_at(obj, [et])
+        return None if quats is None else Quat(*quats[0])
+
+
+def rotate_vectors(quats, v) -> np.ndarray:
+    """
+    Rotate a vector by quaternions in Panda3D order, as a node with each orientation would
+    (the vectorized `Quat.xform`).
+
+    Args:
+        quats (np.ndarray): (n, 4) unit quaternions (r, i, j, k).
+        v (array-like): The vector.
+    Returns:
+        np.ndarray: (n, 3) rotated vectors.
+    """
+    quats = np.asarray(quats, dtype=float)
+    w, u = quats[:, :1], quats[:, 1:]
+    v = np.broadcast_to(np.asarray(v, dtype=float), u.shape)
+    t = 2.0 * np.cross(u, v)
+    return v + w * t + np.cross(u, t)
+
+
+def get_state_cache(parent) -> StateCache:
+    """The `StateCache` of the app `parent`, if it has one and it's in use (else None)."""
+    cache = getattr(parent, "state_cache", None)
+    return cache if cache is not None and cache.active else None
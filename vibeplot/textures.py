@@ -0,0 +1,281 @@
+import os
+import re
+import glob
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from panda3d.core import Texture, Filename, SamplerState, VirtualFileSystem, getModelPath
+
+TEXTURE_CACHE_DIR = "cache/textures"  # default directory of the preprocessed textures
+
+
+def _fill_texture(dst: Texture, src: Texture):
+    """Make `dst` a copy of `src` (the image data is shared, not copied)."""
+    dst.setup2dTexture(src.getXSize(), src.getYSize(), src.getComponentType(), src.getFormat())
+    dst.setCompression(src.getCompression())
+    dst.setMinfilter(src.getMinfilter())
+    dst.setMagfilter(src.getMagfilter())
+    dst.setRamImage(src.getRamImage(), src.getRamImageCompression(), src.getRamImageSize())
+    for n in range(1, src.getNumRamMipmapImages()):
+        dst.setRamMipmapImage(n, src.getRamMipmapImage(n), src.getRamMipmapPageSize(n))
+    dst.setFilename(src.getFilename())
+
+
+def _file_hash(filename: str) -> str:
+    """sha1 of the contents of a file."""
+    h = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class TextureCache:
+    """
+    A directory of preprocessed textures.
+
+    Each source image is converted to a `.txo` file (Panda3D's native texture
+    format) containing the full mipmap chain, so loading it is a plain read: no
+    JPEG decoding and no mipmap generation at runtime. The textures can
+    optionally be DXT compressed, which makes them about 4-6x smaller on disk,
+    in RAM and on the GPU.
+
+    The cache files are named after the source file and the hash of its
+    contents (e.g. `8k_earth_daymap_<hash>.txo`), so a modified image is
+    converted again. Use `python -m vibeplot.textures` to convert the images
+    ahead of time.
+    """
+
+    def __init__(self, directory: str = TEXTURE_CACHE_DIR, compress: bool = False):
+        """
+        Args:
+            directory (str, optional): Directory of the cache files. Defaults to "cache/textures".
+            compress (bool, optional): DXT compress the textures that are converted. Compressing
+                is slow (several seconds for an 8k map), so it is best done ahead of time. Defaults to False.
+        """
+        self.directory = directory
+        self.compress = compress
+
+    def _cache_files(self, filename: str) -> list:
+        """All the cache files of a source image (of any version)."""
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        pattern = re.compile(re.escape(stem) + r"_[0-9a-f]{16}(\.dxt)?\.txo$")
+        return [f for f in glob.glob(os.path.join(self.directory, f"{glob.escape(stem)}_*.txo"))
+                if pattern.match(os.path.basename(f))]
+
+    def filename(self, filename: str, compressed: bool = False, digest: str = None) -> str:
+        """
+        Returns the cache file for a source image.
+
+        Args:
+            filename (str): The source image.
+            compressed (bool, optional): The compressed version. Defaults to False.
+            digest (str, optional): The hash of the source image, if already known.
+        Returns:
+            str: The path of the `.txo` file (which may not exist).
+        """
+        digest = digest or _file_hash(filename)
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        return os.path.join(self.directory, f"{stem}_{digest[:16]}{'.dxt' if compressed else ''}.txo")
+
+    def load(self, filename: str) -> Texture:
+        """
+        Load a source image from the cache, converting it first if necessary.
+
+        A compressed version is preferred if there is one. Can be called from any thread.
+
+        Args:
+            filename (str): The source image (a real file, not a VFS path).
+        Returns:
+            Texture: The texture, or None if it couldn't be read.
+        """
+        digest = _file_hash(filename)
+        for compressed in (True, False):
+            cache_file = self.filename(filename, compressed, digest)
+            if os.path.isfile(cache_file):
+                tex = Texture(os.path.basename(filename))
+                if tex.read(Filename.fromOsSpecific(cache_file)):
+                    tex.setFilename(Filename.fromOsSpecific(filename))
+                    return tex
+                print(f"Warning: removing unreadable texture cache file {cache_file}")
+                os.remove(cache_file)
+        return self.convert(filename, digest)
+
+    def convert(self, filename: str, digest: str = None) -> Texture:
+        """
+        Convert a source image and write it to the cache (replacing older versions of it).
+
+        Args:
+            filename (str): The source image.
+            digest (str, optional): The hash of the source image, if already known.
+        Returns:
+            Texture: The converted texture, or None if the image couldn't be read.
+        """
+        tex = Texture(os.path.basename(filename))
+        if not tex.read(Filename.fromOsSpecific(filename)):
+            return None
+        tex.setMinfilter(SamplerState.FT_linear_mipmap_linear)
+        tex.setMagfilter(SamplerState.FT_linear)
+        tex.generateRamMipmapImages()
+        compressed = self.compress and tex.compressRamImage(Texture.CM_on)
+        if self.compress and not compressed:
+            print(f"Warning: could not compress {filename}")
+
+        cache_file = self.filename(filename, compressed, digest)
+        os.makedirs(self.directory, exist_ok=True)
+        for old_file in self._cache_files(filename):
+            if old_file != cache_file:
+                os.remove(old_file)
+        # write to a temporary file first, so an interrupted write never leaves a truncated cache file
+        tmp_file = f"{cache_file[:-4]}.{os.getpid()}.tmp.txo"
+        if tex.write(Filename.fromOsSpecific(tmp_file)):
+            os.replace(tmp_file, cache_file)
+        else:
+            print(f"Warning: could not write texture cache file {cache_file}")
+        return tex
+
+
+class AsyncTextureLoader:
+    """
+    Loads textures in background threads.
+
+    `load` immediately returns a texture containing a 1x1 placeholder color,
+    which can be used right away (`setTexture`, shader inputs, ...). The image
+    files are decoded in a thread pool, and the placeholder textures are filled
+    in with the full images by a task running in the main thread once they are
+    ready. Since the texture objects themselves don't change, nothing needs to
+    be re-applied.
+
+    If a `TextureCache` is given, the images are read from it (and converted on
+    the first load), so they come with precomputed mipmaps.
+
+    Use `get_texture_loader` to get the loader of an app.
+    """
+
+    def __init__(self, parent, max_workers: int = 2, cache: TextureCache = None):
+        """
+        Args:
+            parent (ShowBase): The app (for the task system).
+            max_workers (int, optional): Number of loading threads. Defaults to 2.
+            cache (TextureCache, optional): Texture cache to load the images from. Defaults to None (no cache).
+        """
+        self.parent = parent
+        self.cache = cache
+        self.textures = {}  # filename -> Texture
+        self.timings = {}   # filename -> (decode time, time until it was ready) in seconds
+        self._pending = []  # list of (future, placeholder texture, filename, start time)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="texture_loader")
+        self._task_name = "AsyncTextureLoaderTask"
+
+    def load(self, filename: str, placeholder_color: tuple = (0.5, 0.5, 0.5, 1)) -> Texture:
+        """
+        Start loading a texture.
+
+        Args:
+            filename (str): Path to the image file (searched on the model path, like `loader.loadTexture`).
+            placeholder_color (tuple, optional): RGBA color shown until the image is loaded.
+                Defaults to (0.5, 0.5, 0.5, 1).
+        Returns:
+            Texture: The texture, which will be filled in when the image is loaded.
+        """
+        if filename in self.textures:
+            return self.textures[filename]
+
+        tex = Texture(filename)
+        tex.setup2dTexture(1, 1, Texture.T_unsigned_byte, Texture.F_rgba)
+        r, g, b, a = [int(round(255 * c)) for c in placeholder_color]
+        tex.setRamImageAs(bytes((r, g, b, a)), "RGBA")
+        self.textures[filename] = tex
+
+        path = Filename(filename)
+        if not VirtualFileSystem.getGlobalPtr().resolveFilename(path, getModelPath().getValue()):
+            print(f"Warning: texture {filename} not found")
+            return tex
+
+        if not self._pending:
+            self.parent.add_task(self._poll_task, self._task_name, nopause=True)
+        self._pending.append((self._executor.submit(self._read, path), tex, filename, time.perf_counter()))
+        return tex
+
+    def _read(self, path: Filename) -> tuple:
+        """Read an image file (runs in a worker thread). Returns the texture and the decode time."""
+        start = time.perf_counter()
+        if self.cache is not None and VirtualFileSystem.getGlobalPtr().getFile(path).isRegularFile():
+            tex = self.cache.load(path.toOsSpecific())
+        else:  # e.g. a file inside a multifile, which can't be hashed with `open`
+            tex = Texture(path.getBasename())
+            if not tex.read(path):
+                tex = None
+        if tex is None:
+            raise IOError(f"Could not load texture: {path}")
+        return tex, time.perf_counter() - start
+
+    @property
+    def busy(self) -> bool:
+        """True if some textures are still loading."""
+        return bool(self._pending)
+
+    def wait(self):
+        """Block until all the textures are loaded (e.g. before taking a screenshot)."""
+        for future, *_ in self._pending:
+            future.exception()  # waits without raising
+        self._poll_task(None)
+
+    def _poll_task(self, et):
+        """Swap the finished textures in (runs in the main thread)."""
+        still_pending = []
+        for future, tex, filename, start in self._pending:
+            if not future.done():
+                still_pending.append((future, tex, filename, start))
+                continue
+            try:
+                loaded, decode_time = future.result()
+            except IOError as e:
+                print(f"Warning: {e}")
+                continue
+            _fill_texture(tex, loaded)
+            self.timings[filename] = (decode_time, time.perf_counter() - start)
+            print(f"Loaded texture {filename} ({tex.getXSize()}x{tex.getYSize()}): "
+                  f"decoded in {decode_time:.2f} s, ready after {self.timings[filename][1]:.2f} s")
+        self._pending = still_pending
+        if not self._pending:
+            self.parent.remove_task(self._task_name)
+
+
+def get_texture_loader(parent) -> AsyncTextureLoader:
+    """
+    Returns the `AsyncTextureLoader` of the app `parent`, creating it if necessary.
+
+    The loader uses the texture cache in the `parent.texture_cache` directory, if
+    the app has that attribute (None disables the cache).
+    """
+    loader = getattr(parent, "texture_loader", None)
+    if loader is None:
+        directory = getattr(parent, "texture_cache", None)
+        loader = AsyncTextureLoader(parent, cache=TextureCache(directory) if directory else None)
+        parent.texture_loader = loader
+    return loader
+
+
+if __name__ == "__main__":
+    # preprocess the planetary maps:  python -m vibeplot.textures [--compress] [images...]
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Convert images to mipmapped .txo files for the texture cache.")
+    arg_parser.add_argument("images", nargs="*", help="Images to convert (default: models/*.jpg).")
+    arg_parser.add_argument("--cache", default=TEXTURE_CACHE_DIR, help=f"Cache directory (default: {TEXTURE_CACHE_DIR}).")
+    arg_parser.add_argument("--compress", action="store_true", help="DXT compress the textures.")
+    args = arg_parser.parse_args()
+
+    cache = TextureCache(args.cache, compress=args.compress)
+    for image in args.images or sorted(glob.glob("models/*.jpg")):
+        start = time.perf_counter()
+        digest = _file_hash(image)
+        tex = cache.convert(image, digest)
+        if tex is None:
+            print(f"Warning: could not read {image}")
+            continue
+        print(f"{image} -> {cache.filename(image, tex.getRamImageCompression() != Texture.CM_off, digest)} "
+              f"({tex.getXSize()}x{tex.getYSize()}, {tex.getNumRamMipmapImages()} levels, "
+              f"{time.perf_counter() - start:.2f} s)")
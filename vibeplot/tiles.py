@@ -0,0 +1,436 @@
+import os
+import json
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from direct.task import Task
+from panda3d.core import (PNMImage, Texture, Filename, SamplerState, TextureStage,
+                          GeomVertexFormat, NodePath, Vec3)
+
+from .utilities import make_geom_node
+
+PYRAMID_FILE = "pyramid.json"  # metadata file of a tile pyramid
+ROOT_TILES = [(0, 0, 0), (0, 1, 0)]  # the level 0 tiles, as (level, x, y)
+
+
+def build_tile_pyramid(image: str, directory: str, tile_size: int = 512, extension: str = "jpg") -> dict:
+    """
+    Split an equirectangular map into a quadtree tile pyramid on disk.
+
+    Level 0 has 2x1 tiles covering the whole body, and each level doubles the
+    resolution (level `n` has `2**(n+1)` x `2**n` tiles). The deepest level is
+    the first one that matches the resolution of the source image. The tiles are
+    written to `<directory>/<level>/<x>_<y>.<extension>`, with `x` counted from
+    longitude 0 and `y` from the north pole, along with a `pyramid.json`
+    metadata file.
+
+    The tiles are built depth first, so apart from the source image only a few
+    tiles are held in memory at a time.
+
+    Args:
+        image (str): The source image (e.g. a 16k map).
+        directory (str): The output directory.
+        tile_size (int, optional): Size of the (square) tiles, in pixels. Defaults to 512.
+        extension (str, optional): Image format of the tiles. Defaults to "jpg".
+    Returns:
+        dict: The pyramid metadata.
+    """
+    src = PNMImage()
+    if not src.read(Filename.fromOsSpecific(image)):
+        raise ValueError(f"Could not read image {image}")
+    width, height = src.getXSize(), src.getYSize()
+    max_level = max(0, math.ceil(math.log2(width / (2 * tile_size))))
+    num_channels = src.getNumChannels()
+
+    def build(level, x, y):
+        tile = PNMImage(tile_size, tile_size, num_channels)
+        if level == max_level:
+            # resample the corresponding region of the source
+            nx, ny = 2 << level, 1 << level
+            x0, x1 = round(x * width / nx), round((x + 1) * width / nx)
+            y0, y1 = round(y * height / ny), round((y + 1) * height / ny)
+            region = PNMImage(x1 - x0, y1 - y0, num_channels)
+            region.copySubImage(src, 0, 0, x0, y0, x1 - x0, y1 - y0)
+            tile.quickFilterFrom(region)
+        else:
+            # downsample the four children
+            children = PNMImage(2 * tile_size, 2 * tile_size, num_channels)
+            for i in range(2):
+                for j in range(2):
+                    children.copySubImage(build(level + 1, 2 * x + i, 2 * y + j), i * tile_size, j * tile_size)
+            tile.boxFilterFrom(0.5, children)
+        os.makedirs(os.path.join(directory, str(level)), exist_ok=True)
+        tile.write(Filename.fromOsSpecific(os.path.join(directory, str(level), f"{x}_{y}.{extension}")))
+        return tile
+
+    for x in range(2):
+        build(0, x, 0)
+
+    metadata = {'source': os.path.basename(image), 'width': width, 'height': height,
+                'tile_size': tile_size, 'levels': max_level + 1, 'extension': extension}
+    with open(os.path.join(directory, PYRAMID_FILE), "w") as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+
+class TilePyramid:
+    """A tile pyramid written by `build_tile_pyramid`."""
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): The pyramid directory.
+        """
+        filename = os.path.join(directory, PYRAMID_FILE)
+        if not os.path.isfile(filename):
+            raise ValueError(f"No tile pyramid in {directory}")
+        with open(filename) as f:
+            metadata = json.load(f)
+        self.directory = directory
+        self.tile_size = metadata['tile_size']
+        self.levels = metadata['levels']
+        self.extension = metadata['extension']
+
+    def tile_file(self, key: tuple) -> str:
+        """Path of the tile `key` = (level, x, y)."""
+        level, x, y = key
+        return os.path.join(self.directory, str(level), f"{x}_{y}.{self.extension}")
+
+    @staticmethod
+    def uv_bounds(key: tuple) -> tuple:
+        """
+        Texture coordinates covered by a tile, in the body texture's (u, v) space.
+
+        Returns:
+            tuple: (u0, u1, v0, v1)
+        """
+        level, x, y = key
+        nx, ny = 2 << level, 1 << level
+        return x / nx, (x + 1) / nx, 1 - (y + 1) / ny, 1 - y / ny
+
+    @staticmethod
+    def children(key: tuple) -> list:
+        """The four tiles of the next level covering the tile `key`."""
+        level, x, y = key
+        return [(level + 1, 2 * x + i, 2 * y + j) for j in range(2) for i in range(2)]
+
+    @staticmethod
+    def parent(key: tuple) -> tuple:
+        """The tile of the previous level containing the tile `key` (None for level 0)."""
+        level, x, y = key
+        return (level - 1, x // 2, y // 2) if level > 0 else None
+
+
+class TileCache:
+    """
+    Loads the tiles of a `TilePyramid` in background threads and keeps the most
+    recently used ones, up to `max_tiles` (least recently used tiles are evicted,
+    except the ones in use).
+
+    `get` returns a tile if it is loaded and requests it otherwise; `poll` must
+    be called regularly from the main thread to collect the loaded tiles.
+    """
+
+    def __init__(self, pyramid: TilePyramid, max_tiles: int = 128, max_workers: int = 2):
+        """
+        Args:
+            pyramid (TilePyramid): The tiles.
+            max_tiles (int, optional): Maximum number of tiles kept. Defaults to 128.
+            max_workers (int, optional): Number of loading threads. Defaults to 2.
+        """
+        self.pyramid = pyramid
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()  # key -> Texture, in order of use
+        self._pending = {}  # key -> future
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tile_loader")
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def __contains__(self, key):
+        return key in self._tiles
+
+    def get(self, key: tuple) -> Texture:
+        """
+        Returns the tile if it is loaded, else None (and the tile is requested).
+        """
+        tex = self._tiles.get(key)
+        if tex is not None:
+            self._tiles.move_to_end(key)
+        elif key not in self._pending:
+            self._pending[key] = self._executor.submit(self._read, self.pyramid.tile_file(key))
+        return tex
+
+    def load_now(self, key: tuple) -> Texture:
+        """Load a tile immediately (in the calling thread)."""
+        if key not in self._tiles:
+            future = self._pending.pop(key, None)
+            self._tiles[key] = future.result() if future is not None else self._read(self.pyramid.tile_file(key))
+        return self.get(key)
+
+    @staticmethod
+    def _read(filename: str) -> Texture:
+        """Read a tile (runs in a worker thread)."""
+        tex = Texture(os.path.basename(filename))
+        if not tex.read(Filename.fromOsSpecific(filename)):
+            raise IOError(f"Could not load tile: {filename}")
+        tex.setWrapU(SamplerState.WM_clamp)
+        tex.setWrapV(SamplerState.WM_clamp)
+        tex.setMinfilter(SamplerState.FT_linear_mipmap_linear)
+        tex.setMagfilter(SamplerState.FT_linear)
+        return tex
+
+    def poll(self, keep: set = ()) -> int:
+        """
+        Collect the tiles that finished loading, and evict the least recently
+        used tiles if there are too many.
+
+        Args:
+            keep (set, optional): Tiles that must not be evicted (the ones in use).
+        Returns:
+            int: The number of new tiles.
+        """
+        num_loaded = 0
+        for key, future in list(self._pending.items()):
+            if not future.done():
+                continue
+            del self._pending[key]
+            try:
+                self._tiles[key] = future.result()
+                num_loaded += 1
+            except IOError as e:
+                print(f"Warning: {e}")
+        excess = len(self._tiles) - self.max_tiles
+        for key in list(self._tiles):
+            if excess <= 0:
+                break
+            if key not in keep:
+                del self._tiles[key]
+                excess -= 1
+        return num_loaded
+
+
+class TiledSurface:
+    """
+    View-dependent, tiled surface texture for a `Body`.
+
+    The surface of the body is split into the quadtree of tiles of a
+    `TilePyramid`. Every frame, the tiles that are in view are refined until
+    one texel is about `pixel_error` pixels on the screen, and only those tiles
+    are loaded (see `TileCache`). Until a tile is loaded, its patch shows the
+    part of the closest loaded ancestor tile, so the surface never has holes.
+
+    The patches use the same texture coordinates as the body's sphere (a tile
+    is mapped with a texture transform), so shaders sampling the body's own
+    textures keep working on them.
+
+    While the surface is active it replaces the body's sphere (or its `LODSphere`). It is activated
+    by `EarthOrbitApp.setup_body_fixed_frame` when the camera is centered on the
+    body, so only the focused body pages tiles in.
+    """
+
+    def __init__(self, body, directory: str, max_tiles: int = 128, pixel_error: float = 1.5,
+                 patch_resolution: int = 16):
+        """
+        Args:
+            body (Body): The body.
+            directory (str): The tile pyramid directory (see `build_tile_pyramid`).
+            max_tiles (int, optional): Maximum number of tiles kept in memory. Defaults to 128.
+            pixel_error (float, optional): Tiles are refined while a texel covers more than this
+                number of pixels. Defaults to 1.5.
+            patch_resolution (int, optional): Number of quads along each side of a patch. Defaults to 16.
+        """
+        self.body = body
+        self.parent = body.parent
+        self.pyramid = TilePyramid(directory)
+        self.cache = TileCache(self.pyramid, max_tiles=max_tiles)
+        self.pixel_error = pixel_error
+        self.patch_resolution = patch_resolution
+        self.active = False
+
+        self.root = body._body.attachNewNode(f"{body.name}_tiled_surface")
+        self.root.hide()
+        self._patches = {}  # key -> patch NodePath
+        self._patch_source = {}  # key -> key of the tile shown on the patch
+        self._bounds = {}  # key -> (center, bounding radius, unit direction, angular radius)
+        self._sphere_geoms = []  # the body's sphere geoms, removed while active
+        self._task_name = f"{body.name}TiledSurfaceTask"
+        self.visible_tiles = []
+
+    def set_active(self, active: bool):
+        """Replace the body's sphere by the tiled surface (or restore it)."""
+        if active == self.active:
+            return
+        self.active = active
+        sphere = self.body._body.node()
+        if active:
+            try:
+                for key in ROOT_TILES:
+                    self.cache.load_now(key)
+            except IOError as e:
+                print(f"Warning: {e}")
+                self.active = False
+                return
+            self._sphere_geoms = [(sphere.modifyGeom(i), sphere.getGeomState(i)) for i in range(sphere.getNumGeoms())]
+            sphere.removeAllGeoms()
+            if self.body.lod_sphere is not None:
+                self.body.lod_sphere.set_enabled(False)
+            self.root.show()
+            self.update_task(None)
+            self.parent.add_task(self.update_task, self._task_name, nopause=True)
+        else:
+            self.parent.remove_task(self._task_name)
+            self.root.hide()
+            for geom, state in self._sphere_geoms:
+                sphere.addGeom(geom, state)
+            self._sphere_geoms = []
+            if self.body.lod_sphere is not None:
+                self.body.lod_sphere.set_enabled(True)
+
+    def _tile_bounds(self, key: tuple) -> tuple:
+        """Bounding sphere and normal cone of a tile (cached)."""
+        bounds = self._bounds.get(key)
+        if bounds is None:
+            u0, u1, v0, v1 = self.pyramid.uv_bounds(key)
+            theta, phi = np.meshgrid(np.pi * (1 - np.linspace(v0, v1, 5)), 2 * np.pi * np.linspace(u0, u1, 5))
+            points = self.body.radius * np.stack((np.sin(theta) * np.cos(phi),
+                                                  np.sin(theta) * np.sin(phi),
+                                                  np.cos(theta)), axis=-1).reshape(-1, 3)
+            center = points.mean(axis=0)
+            direction = center / np.linalg.norm(center)
+            cos_angles = np.clip(points @ direction / self.body.radius, -1, 1)
+            bounds = (center, np.linalg.norm(points - center, axis=1).max(), direction, np.arccos(cos_angles.min()))
+            self._bounds[key] = bounds
+        return bounds
+
+    def _make_patch(self, key: tuple) -> NodePath:
+        """
+        A sphere patch covering a tile, with a skirt (a ring of vertices below
+        the edges) hiding the cracks between patches of different levels.
+        """
+        u0, u1, v0, v1 = self.pyramid.uv_bounds(key)
+        n = self.patch_resolution
+        # index 0 and n+2 are the skirt, at the same angles as the edges
+        steps = np.clip(np.arange(n + 3) - 1, 0, n) / n
+        u, v = np.meshgrid(u0 + (u1 - u0) * steps, v1 - (v1 - v0) * steps)
+        edge = np.zeros((n + 3, n + 3), dtype=bool)
+        edge[[0, -1], :] = edge[:, [0, -1]] = True
+        theta, phi = np.pi * (1 - v), 2 * np.pi * u
+        normals = np.stack((np.sin(theta) * np.cos(phi),
+                            np.sin(theta) * np.sin(phi),
+                            np.cos(theta)), axis=-1).reshape(-1, 3)
+        skirt_depth = 1 - math.cos(2 * math.pi * (u1 - u0) / n)
+        radius = np.where(edge.ravel(), self.body.radius * (1 - skirt_depth), self.body.radius)
+
+        i, j = np.meshgrid(np.arange(n + 2), np.arange(n + 2), indexing='ij')
+        first = (i * (n + 3) + j).ravel()
+        second = first + n + 3
+        tris = np.column_stack((first, second, first + 1, second, second + 1, first + 1)).reshape(-1, 3)
+        node = make_geom_node(f"tile_{key[0]}_{key[1]}_{key[2]}", GeomVertexFormat.getV3n3t2(),
+                              {'vertex': radius[:, None] * normals, 'normal': normals,
+                               'texcoord': np.column_stack((u.ravel(), v.ravel()))},
+                              tris)
+        return self.root.attachNewNode(node)
+
+    def _select(self, camera_pos: np.ndarray, view_dir: np.ndarray, half_fov: float,
+                pixels_per_radian: float) -> list:
+        """The tiles to draw: the visible leaves of the refined quadtree."""
+        camera_distance = np.linalg.norm(camera_pos)
+        horizon = math.acos(min(1.0, self.body.radius / camera_distance)) if camera_distance > 0 else math.pi
+        camera_dir = camera_pos / camera_distance if camera_distance > 0 else camera_pos
+
+        selected = []
+        stack = list(ROOT_TILES)
+        while stack:
+            key = stack.pop()
+            center, radius, direction, angular_radius = self._tile_bounds(key)
+            # behind the horizon or outside the view
+            if math.acos(np.clip(camera_dir @ direction, -1, 1)) > horizon + angular_radius:
+                continue
+            # (a cone around the view direction rather than the lens frustum,
+            # whose planes are imprecise with a tiny near distance)
+            offset = center - camera_pos
+            center_distance = np.linalg.norm(offset)
+            if center_distance > radius and (math.acos(np.clip(view_dir @ offset / center_distance, -1, 1))
+                                             > half_fov + math.asin(radius / center_distance)):
+                continue
+            # size of a texel on the screen (the side of a tile is about sqrt(2) times its bounding radius)
+            distance = max(center_distance - radius, 1e-6 * self.body.radius)
+            texel_pixels = math.sqrt(2) * radius / self.pyramid.tile_size / distance * pixels_per_radian
+            if texel_pixels > self.pixel_error and key[0] + 1 < self.pyramid.levels:
+                stack.extend(self.pyramid.children(key))
+            else:
+                selected.append(key)
+        return selected
+
+    def update_task(self, et):
+        """Select the visible tiles, request them, and update the patches."""
+        cam = self.parent.cam
+        lens = cam.node().getLens()
+        camera_pos = np.array(cam.getPos(self.root))
+        view_dir = np.array(self.root.getRelativeVector(cam, Vec3(0, 1, 0)))
+        fov_x, fov_y = lens.getFov()
+        half_fov = math.radians(math.hypot(fov_x, fov_y) / 2)
+        pixels_per_radian = self.parent.win.getYSize() / math.radians(fov_y)
+
+        # the tiles in use (or wanted) are never evicted
+        self.cache.poll(keep=set(self.visible_tiles) | set(self._patch_source.values()) | set(ROOT_TILES))
+        selected = self._select(camera_pos, view_dir / np.linalg.norm(view_dir), half_fov, pixels_per_radian)
+
+        shown = set()
+        for key in selected:
+            # the tile itself if it is loaded, otherwise its closest loaded ancestor
+            source = key
+            tex = self.cache.get(key)
+            while tex is None and source[0] > 0:
+                source = self.pyramid.parent(source)
+                tex = self.cache.get(source)
+            if tex is None:  # the level 0 tile couldn't be loaded
+                continue
+            patch = self._patches.get(key)
+            if patch is None:
+                patch = self._patches[key] = self._make_patch(key)
+            elif patch.isStashed():
+                patch.unstash()
+            if self._patch_source.get(key) != source:
+                self._patch_source[key] = source
+                u0, u1, v0, v1 = self.pyramid.uv_bounds(source)
+                patch.setTexture(tex, 2)
+                stage = TextureStage.getDefault()
+                patch.setTexScale(stage, 1 / (u1 - u0), 1 / (v1 - v0))
+                patch.setTexOffset(stage, -u0 / (u1 - u0), -v0 / (v1 - v0))
+            shown.add(key)
+
+        for key, patch in list(self._patches.items()):
+            if key in shown:
+                continue
+            # keep the patches of recently used tiles around, ready to be shown again
+            if key in self.cache:
+                patch.stash()
+                self._patch_source.pop(key, None)
+            else:
+                patch.removeNode()
+                del self._patches[key]
+                self._patch_source.pop(key, None)
+        self.visible_tiles = selected
+        return Task.cont
+
+
+if __name__ == "__main__":
+    # build a tile pyramid:  python -m vibeplot.tiles <image> <directory> [--tile-size 512]
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Split an equirectangular map into a tile pyramid.")
+    arg_parser.add_argument("image", help="The source image.")
+    arg_parser.add_argument("directory", help="The output directory.")
+    arg_parser.add_argument("--tile-size", type=int, default=512, help="Tile size in pixels (default: 512).")
+    arg_parser.add_argument("--format", default="jpg", help="Tile image format (default: jpg).")
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    metadata = build_tile_pyramid(args.image, args.directory, args.tile_size, args.format)
+    print(f"{args.image} ({metadata['width']}x{metadata['height']}) -> {args.directory}: "
+          f"{metadata['levels']} levels of {metadata['tile_size']}px tiles ({time.perf_counter() - start:.1f} s)")
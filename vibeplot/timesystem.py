@@ -0,0 +1,97 @@
+import math
+
+SECONDS_PER_DAY = 86400.0
+FRAME_TIME = 1.0 / 60.0  # wall-clock time of a frame, for `step`
+
+
+class TimeSystem:
+    """
+    The timeline of a scene.
+
+    Times are float64 ephemeris times (e.g. seconds past J2000, as used by the
+    SPICE kernels and the trajectory files), from `start` to `stop`. They are
+    never normalized, so a trajectory is interpolated at its own times whatever
+    the span of the timeline (from seconds to decades). The `epoch` is the time
+    shown as 0 on the GUI, so that the displayed times stay readable.
+
+    Playback is frame-rate independent: `advance` moves the time by the
+    wall-clock time of the frame times the time-warp `rate` (scene seconds per
+    second, negative to play backwards), and wraps around at the ends of the
+    timeline if `loop` is set.
+    """
+
+    def __init__(self, start: float = 0.0, stop: float = 100.0, epoch: float = None,
+                 rate: float = 1.0, loop: bool = True):
+        """
+        Args:
+            start (float, optional): Start of the timeline. Defaults to 0.
+            stop (float, optional): End of the timeline. Defaults to 100.
+            epoch (float, optional): Time displayed as 0. Defaults to None (`start`).
+            rate (float, optional): Time warp, in scene seconds per second. Defaults to 1.
+            loop (bool, optional): Wrap around at the end of the timeline (else, stop there). Defaults to True.
+        """
+        if not stop > start:
+            raise ValueError(f"the end of the timeline ({stop}) must be after its start ({start})")
+        self.start = float(start)
+        self.stop = float(stop)
+        self.epoch = self.start if epoch is None else float(epoch)
+        self.rate = float(rate)
+        self.loop = loop
+        self.time = self.start
+
+    @property
+    def span(self) -> float:
+        """Length of the timeline."""
+        return self.stop - self.start
+
+    def set_time(self, time: float) -> float:
+        """
+        Set the time, wrapped around (or clamped) to the timeline.
+
+        Returns:
+            float: The new time.
+        """
+        time = float(time)
+        if self.loop:
+            if not self.start <= time < self.stop:
+                time = self.start + math.fmod(time - self.start, self.span)
+                if time < self.start:
+                    time += self.span
+        else:
+            time = min(max(time, self.start), self.stop)
+        self.time = time
+        return self.time
+
+    def advance(self, dt: float) -> float:
+        """
+        Advance the time by `dt` seconds of wall-clock time (times the `rate`).
+
+        Returns:
+            float: The new time.
+        """
+        return self.set_time(self.time + dt * self.rate)
+
+    def step(self, frames: int = 1, frame_time: float = FRAME_TIME) -> float:
+        """
+        Move the time by a number of frames (negative to go back), whatever the direction of the playback.
+
+        Returns:
+            float: The new time.
+        """
+        return self.set_time(self.time + frames * frame_time * abs(self.rate))
+
+    def to_fraction(self, time: float = None) -> float:
+        """Position of a time (defaults to the current time) on the timeline, from 0 to 1 (e.g. for a slider)."""
+        time = self.time if time is None else time
+        return (time - self.start) / self.span
+
+    def from_fraction(self, fraction: float) -> float:
+        """Time at a position on the timeline (inverse of `to_fraction`)."""
+        return self.start + float(fraction) * self.span
+
+    def format(self, time: float = None) -> str:
+        """A time (defaults to the current time) relative to the `epoch`, for display."""
+        elapsed = (self.time if time is None else time) - self.epoch
+        if self.span >= 10 * SECONDS_PER_DAY:
+            return f"{elapsed / SECONDS_PER_DAY:.3f} d"
+        return f"{elapsed:.2f}"
@@ -1,17 +1,18 @@
 import math
 import random
+from collections import OrderedDict
 from panda3d.core import (GeomVertexFormat,
+                          GeomVertexArrayFormat,
                           GeomVertexData,
-                          GeomVertexWriter,
                           Geom, GeomNode,
                           GeomTriangles,
-                          GeomLinestrips,
                           GeomLines,
                           NodePath,
                           Vec3,
                           Quat,
                           LineSegs,
-                          Point3)
+                          InternalName,
+                          Shader)
 import numpy as np
 
 # lines styles are defined as (length, gap *[,length, gap])
@@ -22,6 +23,11 @@ LINE_STYLES = [(1.0),                 # solid
                (0.2, 1.0),            # dot
                (2.0, 1.0)]            # long dash
 
+LINE_STYLE_SHADER = ("models/line_style.vert", "models/line_style.frag")
+THICK_LINE_SHADER = ("models/thick_line.vert", "models/line_style.frag")
+_LINE_FORMAT = None          # see line_vertex_format
+_THICK_LINE_FORMAT = None    # see thick_line_vertex_format
+_LINE_SHADERS = {}           # shader files -> Shader, loaded on first use (False if it couldn't be)
 
 
 def lonlat_to_xyz(lon, lat, radius):
@@ -37,64 +43,57 @@ def create_body_fixed_arrow(body_radius: float, color=(1, 1, 1, 1)):
     shaft_radius = body_radius * 0.05
     head_length = body_radius * 0.3
     head_radius = body_radius * 0.1
-    return create_arrow(shaft_length, shaft_radius, head_length, head_radius, color=color)
+    return GEOMETRY_CACHE.arrow(shaft_length, shaft_radius, head_length, head_radius, color=color)
+
+def _arrow_shaft_mesh(shaft_length, shaft_radius, segments=24):
+    """Vertices, normals and triangles of an open cylinder from y=0 to y=`shaft_length`."""
+    theta = 2 * np.pi * np.arange(segments + 1) / segments
+    cos_t = np.cos(theta)
+    sin_t = np.sin(theta)
+    zeros = np.zeros_like(theta)
+
+    # interleaved bottom/top vertices
+    normals = np.column_stack((cos_t, zeros, sin_t))
+    bottom = np.column_stack((shaft_radius * cos_t, zeros, shaft_radius * sin_t))
+    top = bottom + (0, shaft_length, 0)
+    vertices = np.stack((bottom, top), axis=1).reshape(-1, 3)
+    normals = np.repeat(normals, 2, axis=0)
+    a = 2 * np.arange(segments)
+    c = 2 * ((np.arange(segments) + 1) % segments)
+    tris = np.column_stack((a, a + 1, c + 1, a, c + 1, c)).reshape(-1, 3)
+    return vertices, normals, tris
+
+
+def _arrow_head_mesh(head_length, head_radius, segments=24):
+    """Vertices, normals and triangles of a cone with its base at y=0 and its tip at y=`head_length`."""
+    theta = 2 * np.pi * np.arange(segments + 1) / segments
+    cos_t = np.cos(theta)
+    sin_t = np.sin(theta)
+    ring = np.column_stack((head_radius * cos_t, np.zeros_like(theta), head_radius * sin_t))
+    normals = np.column_stack((head_radius * cos_t, np.full_like(theta, head_length * 0.5), head_radius * sin_t))
+    normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-300)
+    tip_idx = segments + 1
+    i = np.arange(segments)
+    tris = np.column_stack((i, (i + 1) % segments, np.full(segments, tip_idx)))
+    vertices = np.vstack((ring, [(0, head_length, 0)]))
+    normals = np.vstack((normals, [(0, 1, 0)]))
+    return vertices, normals, tris
+
 
 def create_arrow(shaft_length=4.0, shaft_radius=0.1, head_length=0.6, head_radius=0.3, color=(1, 1, 1, 1)):
     """Create an arrow NodePath pointing along +Y."""
-    # Shaft (cylinder)
-    fmt = GeomVertexFormat.getV3n3c4()
-    vdata = GeomVertexData('arrow', fmt, Geom.UHStatic)
-    vertex = GeomVertexWriter(vdata, 'vertex')
-    normal = GeomVertexWriter(vdata, 'normal')
-    color_writer = GeomVertexWriter(vdata, 'color')
-    tris = GeomTriangles(Geom.UHStatic)
-    segments = 24
-
     # Cylinder shaft
-    for i in range(segments + 1):
-        theta = 2 * math.pi * i / segments
-        x = shaft_radius * math.cos(theta)
-        z = shaft_radius * math.sin(theta)
-        # Bottom
-        vertex.addData3(x, 0, z)
-        normal.addData3(x, 0, z)
-        color_writer.addData4(*color)
-        # Top
-        vertex.addData3(x, shaft_length, z)
-        normal.addData3(x, 0, z)
-        color_writer.addData4(*color)
-    for i in range(segments):
-        a = i * 2
-        b = a + 1
-        c = ((i + 1) % segments) * 2
-        d = c + 1
-        tris.addVertices(a, b, d)
-        tris.addVertices(a, d, c)
-
-    # Cone head
-    base_idx = (segments + 1) * 2
-    tip = Vec3(0, shaft_length + head_length, 0)
-    for i in range(segments + 1):
-        theta = 2 * math.pi * i / segments
-        x = head_radius * math.cos(theta)
-        z = head_radius * math.sin(theta)
-        vertex.addData3(x, shaft_length, z)
-        normal_vec = Vec3(x, head_length * 0.5, z).normalized()
-        normal.addData3(normal_vec)
-        color_writer.addData4(*color)
-    vertex.addData3(tip)
-    normal.addData3(0, 1, 0)
-    color_writer.addData4(*color)
-    tip_idx = vertex.getWriteRow() - 1
-    for i in range(segments):
-        a = base_idx + i
-        b = base_idx + (i + 1) % segments
-        tris.addVertices(a, b, tip_idx)
+    shaft_vertices, shaft_normals, shaft_tris = _arrow_shaft_mesh(shaft_length, shaft_radius)
 
-    geom = Geom(vdata)
-    geom.addPrimitive(tris)
-    node = GeomNode('arrow')
-    node.addGeom(geom)
+    # Cone head, on top of the shaft
+    head_vertices, head_normals, head_tris = _arrow_head_mesh(head_length, head_radius)
+    head_vertices = head_vertices + (0, shaft_length, 0)
+
+    node = make_geom_node('arrow', GeomVertexFormat.getV3n3c4(),
+                          {'vertex': np.vstack((shaft_vertices, head_vertices)),
+                           'normal': np.vstack((shaft_normals, head_normals)),
+                           'color': color},
+                          np.vstack((shaft_tris, head_tris + len(shaft_vertices))))
     arrow_np = NodePath(node)
     arrow_np.setTwoSided(True)
     # arrow_np.setBin('opaque', 10)
@@ -171,46 +170,32 @@ def create_arrow_with_endpoints(start, end, color=(1, 1, 0, 1), thickness=0.05,
 
     return arrow_np
 
-def create_sphere(radius=1.0, num_lat=16, num_lon=32, color=(1, 1, 1, 1)):
-    """Create a sphere NodePath with specified radius, latitude and longitude divisions, and color."""
+def _sphere_mesh(num_lat=16, num_lon=32):
+    """Normals (= vertices of the unit sphere), texcoords and triangles of a latitude/longitude sphere."""
+    theta = np.pi * np.arange(num_lat + 1) / num_lat
+    phi = 2 * np.pi * np.arange(num_lon + 1) / num_lon
+    sin_theta = np.sin(theta)[:, None]
+    cos_theta = np.cos(theta)[:, None]
+    normals = np.stack((sin_theta * np.cos(phi),
+                        sin_theta * np.sin(phi),
+                        np.broadcast_to(cos_theta, (num_lat + 1, num_lon + 1))), axis=-1).reshape(-1, 3)
+    u, v = np.meshgrid(np.arange(num_lon + 1) / num_lon, np.arange(num_lat + 1) / num_lat)
+    texcoords = np.column_stack((u.ravel(), 1 - v.ravel()))
+
+    i, j = np.meshgrid(np.arange(num_lat), np.arange(num_lon), indexing='ij')
+    first = (i * (num_lon + 1) + j).ravel()
+    second = first + num_lon + 1
+    tris = np.column_stack((first, second, first + 1, second, second + 1, first + 1)).reshape(-1, 3)
+    return normals, texcoords, tris
 
-    fmt = GeomVertexFormat.getV3n3c4t2()
-    vdata = GeomVertexData('sphere', fmt, Geom.UHStatic)
-    vertex = GeomVertexWriter(vdata, 'vertex')
-    normal = GeomVertexWriter(vdata, 'normal')
-    color_writer = GeomVertexWriter(vdata, 'color')
-    texcoord = GeomVertexWriter(vdata, 'texcoord')
-    tris = GeomTriangles(Geom.UHStatic)
-
-    for i in range(num_lat + 1):
-        theta = math.pi * i / num_lat
-        sin_theta = math.sin(theta)
-        cos_theta = math.cos(theta)
-        v = i / num_lat  # V coordinate
-        for j in range(num_lon + 1):
-            phi = 2 * math.pi * j / num_lon
-            sin_phi = math.sin(phi)
-            cos_phi = math.cos(phi)
-            x = radius * sin_theta * cos_phi
-            y = radius * sin_theta * sin_phi
-            z = radius * cos_theta
-            u = j / num_lon  # U coordinate
-            vertex.addData3(x, y, z)
-            normal.addData3(Vec3(x, y, z).normalized())
-            color_writer.addData4(*color)
-            texcoord.addData2(u, 1 - v)
-
-    for i in range(num_lat):
-        for j in range(num_lon):
-            first = i * (num_lon + 1) + j
-            second = first + num_lon + 1
-            tris.addVertices(first, second, first + 1)
-            tris.addVertices(second, second + 1, first + 1)
 
-    geom = Geom(vdata)
-    geom.addPrimitive(tris)
-    node = GeomNode('sphere')
-    node.addGeom(geom)
+def create_sphere(radius=1.0, num_lat=16, num_lon=32, color=(1, 1, 1, 1)):
+    """Create a sphere NodePath with specified radius, latitude and longitude divisions, and color."""
+    normals, texcoords, tris = _sphere_mesh(num_lat, num_lon)
+    node = make_geom_node('sphere', GeomVertexFormat.getV3n3c4t2(),
+                          {'vertex': radius * normals, 'normal': normals,
+                           'color': color, 'texcoord': texcoords},
+                          tris)
     sphere_np = NodePath(node)
     return sphere_np
 
@@ -224,7 +209,170 @@ def random_rgba(alpha=1.0):
     """
     return (random.random(), random.random(), random.random(), alpha)
 
-def draw_path(parent, pts, linestyle: int = 0, colors=None):
+def line_vertex_format() -> GeomVertexFormat:
+    """The vertex format of the lines that can be styled: position, color, and arc length along the line."""
+    global _LINE_FORMAT
+    if _LINE_FORMAT is None:
+        array_format = GeomVertexArrayFormat()
+        array_format.addColumn(InternalName.getVertex(), 3, Geom.NT_float32, Geom.C_point)
+        array_format.addColumn(InternalName.getColor(), 4, Geom.NT_uint8, Geom.C_color)
+        array_format.addColumn(InternalName.make("arc_length"), 1, Geom.NT_float32, Geom.C_other)
+        _LINE_FORMAT = GeomVertexFormat.registerFormat(array_format)
+    return _LINE_FORMAT
+
+def arc_lengths(points) -> np.ndarray:
+    """Cumulative length along a polyline (0 at the first point)."""
+    points = np.asarray(points, dtype=float)
+    return np.concatenate(([0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))))
+
+def line_style_pattern(linestyle: int) -> tuple:
+    """
+    The dash pattern of a line style, as (dash, gap, dash, gap) lengths.
+
+    Args:
+        linestyle (int): See `LINE_STYLES`.
+    Returns:
+        tuple: The 4 lengths (zero padded), or None for a solid line.
+    """
+    pattern = tuple(np.atleast_1d(LINE_STYLES[linestyle]).tolist())
+    if len(pattern) < 2:
+        return None
+    if len(pattern) > 4:
+        raise ValueError("line styles can have at most 4 lengths")
+    return pattern + (0.0,) * (4 - len(pattern))
+
+def _line_shader(files: tuple):
+    """Load one of the line shaders (once). Returns None if it can't be loaded."""
+    if files not in _LINE_SHADERS:
+        _LINE_SHADERS[files] = Shader.load(Shader.SL_GLSL, *files) or False
+        if not _LINE_SHADERS[files]:
+            print(f"Warning: could not load {files[0]}")
+    return _LINE_SHADERS[files] or None
+
+def set_line_style(node_path, linestyle: int, dash_offset: float = 0.0, thick: bool = False) -> bool:
+    """
+    Apply a line style to lines with the `line_vertex_format` (e.g. drawn by `draw_path`),
+    or to thick lines (see `thick_lines_node`).
+
+    The dashes are cut by a shader from the arc length of the vertices, so
+    changing the style or animating `dash_offset` doesn't touch the geometry.
+    Nodes below `node_path` can set a `dash_start` shader input to shift the
+    pattern (e.g. the chunks of a `ChunkedPolyline`).
+
+    Args:
+        node_path (NodePath): The lines.
+        linestyle (int): See `LINE_STYLES`.
+        dash_offset (float, optional): Shift of the pattern along the lines. Defaults to 0.
+        thick (bool, optional): The lines are thick lines. Defaults to False.
+    Returns:
+        bool: False if the lines are drawn solid because the shader couldn't be loaded.
+    """
+    pattern = line_style_pattern(linestyle)
+    if pattern is None and not thick:
+        node_path.setShaderOff()
+        return True
+    shader = _line_shader(THICK_LINE_SHADER if thick else LINE_STYLE_SHADER)
+    if shader is None:
+        node_path.setShaderOff()
+        return False
+    node_path.setShader(shader)
+    node_path.setShaderInput("dash_pattern", pattern or (1.0, 0.0, 0.0, 0.0))
+    node_path.setShaderInput("dash_start", 0.0)
+    node_path.setShaderInput("dash_offset", float(dash_offset))
+    return True
+
+def use_thick_lines(parent) -> bool:
+    """
+    Whether the lines of the app `parent` can be drawn as thick lines (see `thick_lines_node`).
+
+    The first call also starts keeping the `line_viewport` shader input of
+    `parent.render` (used by the thick line shader) equal to the window size.
+
+    Returns:
+        bool: False if the thick lines aren't supported (the lines should then be GL lines).
+    """
+    if getattr(parent, "_line_viewport", None) is None:
+        gsg = parent.win.getGsg() if parent.win is not None else None
+        supported = gsg is not None and gsg.getSupportsGlsl() and _line_shader(THICK_LINE_SHADER) is not None
+        parent._line_viewport = (0, 0) if supported else False
+
+        def line_viewport_task(et):
+            size = (parent.win.getXSize(), parent.win.getYSize())
+            if size != parent._line_viewport:
+                parent._line_viewport = size
+                parent.render.setShaderInput("line_viewport", (float(max(size[0], 1)), float(max(size[1], 1))))
+
+        if supported:
+            line_viewport_task(None)
+            parent.add_task(line_viewport_task, "LineViewportTask", nopause=True)
+    return parent._line_viewport is not False
+
+def thick_line_vertex_format() -> GeomVertexFormat:
+    """The vertex format of the thick lines: position, color, other end of the segment, and line parameters."""
+    global _THICK_LINE_FORMAT
+    if _THICK_LINE_FORMAT is None:
+        array_format = GeomVertexArrayFormat()
+        array_format.addColumn(InternalName.getVertex(), 3, Geom.NT_float32, Geom.C_point)
+        array_format.addColumn(InternalName.getColor(), 4, Geom.NT_uint8, Geom.C_color)
+        array_format.addColumn(InternalName.make("line_other"), 3, Geom.NT_float32, Geom.C_point)
+        array_format.addColumn(InternalName.make("line_params"), 4, Geom.NT_float32, Geom.C_other)
+        _THICK_LINE_FORMAT = GeomVertexFormat.registerFormat(array_format)
+    return _THICK_LINE_FORMAT
+
+def thick_lines_node(name: str, polylines, colors=(1, 1, 1, 1), widths=2.0) -> GeomNode:
+    """
+    Build polylines with a width in pixels, as one Geom (so they are drawn in one call).
+
+    Each segment is a quad that the thick line shader expands on the screen, so
+    the width doesn't depend on the driver's line width support. Apply the shader
+    with `set_line_style(..., thick=True)`; the app must `use_thick_lines`.
+
+    Args:
+        name (str): Name of the node.
+        polylines (list): List of (n, 3) arrays of points.
+        colors (tuple or list, optional): RGBA color for all the lines, or one entry per polyline:
+            an RGBA color or (n, 4) colors. Defaults to white.
+        widths (float or list, optional): Width in pixels for all the lines, or one entry per polyline:
+            a width or (n,) widths. Defaults to 2.
+    Returns:
+        GeomNode: The node.
+    """
+    polylines = [np.asarray(p, dtype=float).reshape(-1, 3) for p in polylines]
+    sizes = [len(p) for p in polylines]
+    if len(colors) == 4 and np.isscalar(colors[0]):
+        colors = [colors] * len(polylines)
+    if np.isscalar(widths):
+        widths = [widths] * len(polylines)
+    points = np.vstack(polylines) if polylines else np.zeros((0, 3))
+    point_colors = np.vstack([np.broadcast_to(np.asarray(c, dtype=float), (n, 4)) for c, n in zip(colors, sizes)]
+                             ) if polylines else np.zeros((0, 4))
+    point_widths = np.concatenate([np.broadcast_to(np.asarray(w, dtype=float), (n,)) for w, n in zip(widths, sizes)]
+                                  ) if polylines else np.zeros(0)
+
+    # the segments: consecutive points of the same polyline
+    starts = np.cumsum([0] + sizes[:-1])
+    in_polyline = np.ones(max(len(points) - 1, 0), dtype=bool)
+    in_polyline[starts[1:] - 1] = False
+    a = np.flatnonzero(in_polyline)
+    b = a + 1
+    # arc length along each polyline
+    lengths = np.zeros(len(points))
+    lengths[b] = np.linalg.norm(points[b] - points[a], axis=1)
+    arcs = np.cumsum(lengths)
+    arcs -= np.repeat(arcs[starts], sizes) if len(points) else 0.0
+
+    # 4 vertices per segment: (a, -1), (a, +1), (b, +1), (b, -1)
+    ends = np.column_stack((a, a, b, b)).ravel()
+    others = np.column_stack((b, b, a, a)).ravel()
+    sides = np.tile((-1.0, 1.0, 1.0, -1.0), len(a))
+    params = np.column_stack((sides, point_widths[ends], arcs[ends], np.zeros(len(ends))))
+    quads = 4 * np.arange(len(a))[:, None] + np.array([0, 2, 1, 1, 2, 3])
+    return make_geom_node(name, thick_line_vertex_format(),
+                          {'vertex': points[ends], 'color': point_colors[ends],
+                           'line_other': points[others], 'line_params': params},
+                          quads.reshape(-1, 3))
+
+def draw_path(parent, pts, linestyle: int = 0, colors=None, width: float = None):
     """
     Draw a path with optional per-point colors and line styles.
 
@@ -233,117 +381,101 @@ def draw_path(parent, pts, linestyle: int = 0, colors=None):
         pts (list): List of Point3 or Vec3 points to connect.
         linestyle (int, optional): See `LINE_STYLES` for options. Defaults to 0 (solid).
         colors (list, optional): List of (r, g, b, a) tuples, one per point. If provided, enables per-vertex color.
+        width (float, optional): Width in pixels, to draw a thick line (see `thick_lines_node`).
+            Defaults to None (GL lines).
     Returns:
         NodePath: The created line NodePath.
     """
-    if not pts or len(pts) < 2:
+    if pts is None or len(pts) < 2:
         return None
     if colors is not None and len(colors) != len(pts):
         raise ValueError("colors must be the same length as pts")
 
-    fmt = GeomVertexFormat.getV3cp()
-    vdata = GeomVertexData('line', fmt, Geom.UHStatic)
-    vertex = GeomVertexWriter(vdata, 'vertex')
-    color_writer = GeomVertexWriter(vdata, 'color')
-
-    geom = Geom(vdata)
-    node = GeomNode('line_path')
-
-    if linestyle == 0:
-        # Solid line (as a single linestrip)
-        for pt, col in zip(pts, colors if colors else [None]*len(pts)):
-            vertex.addData3(pt)
-            if colors:
-                color_writer.addData4f(*col)
-            else:
-                color_writer.addData4f(1, 1, 1, 1)
-        linestrip = GeomLinestrips(Geom.UHStatic)
-        for i in range(len(pts)):
-            linestrip.addVertex(i)
-        linestrip.closePrimitive()
-        geom.addPrimitive(linestrip)
-    else:
-        # Dashed or patterned lines: draw as individual segments
-        s = LINE_STYLES[linestyle]
-        pattern_len = len(s)
-        pattern_idx = 0
-        remaining = s[pattern_idx]
-        drawing = True
-
-        vtx_idx = 0
-        i = 0
-        while i < len(pts) - 1:
-            p0 = pts[i]
-            p1 = pts[i+1]
-            c0 = colors[i] if colors else (1, 1, 1, 1)
-            c1 = colors[i+1] if colors else (1, 1, 1, 1)
-            seg_vec = p1 - p0
-            seg_len = seg_vec.length()
-            seg_dir = seg_vec.normalized() if seg_len > 0 else Point3(0,0,0)
-            seg_pos = 0.0
-            while seg_pos < seg_len:
-                step = min(remaining, seg_len - seg_pos)
-                p_start = p0 + seg_dir * seg_pos
-                p_end = p0 + seg_dir * (seg_pos + step)
-                # Interpolate color for the segment ends
-                t0 = seg_pos / seg_len if seg_len > 0 else 0
-                t1 = (seg_pos + step) / seg_len if seg_len > 0 else 1
-                col_start = tuple(c0[j] + (c1[j] - c0[j]) * t0 for j in range(4))
-                col_end = tuple(c0[j] + (c1[j] - c0[j]) * t1 for j in range(4))
-                if drawing:
-                    vertex.addData3(p_start)
-                    color_writer.addData4f(*col_start)
-                    vertex.addData3(p_end)
-                    color_writer.addData4f(*col_end)
-                    line = GeomLines(Geom.UHStatic)
-                    line.addVertices(vtx_idx, vtx_idx + 1)
-                    geom.addPrimitive(line)
-                    vtx_idx += 2
-                seg_pos += step
-                remaining -= step
-                if remaining <= 1e-8:
-                    pattern_idx = (pattern_idx + 1) % pattern_len
-                    remaining = s[pattern_idx]
-                    drawing = not drawing
-            i += 1
-
-    node.addGeom(geom)
+    points = np.array([(p[0], p[1], p[2]) for p in pts], dtype=float)
+    if width is not None:
+        path_np = parent.attachNewNode(thick_lines_node('line_path', [points],
+                                                        [colors if colors is not None else (1, 1, 1, 1)], width))
+        path_np.setTransparency(True)
+        path_np.setLightOff()
+        path_np.setTwoSided(True)
+        set_line_style(path_np, linestyle, thick=True)
+        return path_np
+    n = len(points)
+    node = make_geom_node('line_path', line_vertex_format(),
+                          {'vertex': points,
+                           'color': colors if colors is not None else (1, 1, 1, 1),
+                           'arc_length': arc_lengths(points)},
+                          np.column_stack((np.arange(n - 1), np.arange(1, n))), primitive=GeomLines)
     path_np = parent.attachNewNode(node)
     path_np.setTransparency(True)
     path_np.setLightOff()
     path_np.setTwoSided(True)
+    if linestyle != 0:
+        set_line_style(path_np, linestyle)
     return path_np
 
 def simple_propagator(radius: float, inclination_deg: float, et: float, speed: float = 1.0) -> np.array:
-    """Simple propagator for an orbit, given radius and inclination."""
+    """Simple propagator for an orbit, given radius and inclination.
+
+    `et` can also be an array of times, in which case each component is an array."""
     # Analytic orbit for testing purposes
 
-    angle = et * speed
+    angle = np.multiply(et, speed)
     inclination = np.radians(inclination_deg)  # Convert inclination to radians
-    x = radius * math.cos(angle)
-    y = radius * math.sin(angle) * math.cos(inclination)
-    z = radius * math.sin(angle) * math.sin(inclination)
+    x = radius * np.cos(angle)
+    y = radius * np.sin(angle) * np.cos(inclination)
+    z = radius * np.sin(angle) * np.sin(inclination)
     return np.array([x, y, z])  #Point3(x, y, z)
 
+def simplify_polyline(points, tolerance) -> np.ndarray:
+    """
+    Simplify a polyline with the Douglas-Peucker algorithm.
+
+    All the segments of a level of the recursion are split at once (with numpy),
+    so this is fast even for hundreds of thousands of points.
+
+    Args:
+        points (np.ndarray): (n, 3) array of points.
+        tolerance (float or np.ndarray): Maximum distance from a removed point to the
+            simplified polyline. Either one value, or one value per point.
+    Returns:
+        np.ndarray: The sorted indices of the points to keep (the end points are always kept).
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    if n < 3:
+        return np.arange(n)
+    tolerance = np.maximum(np.broadcast_to(np.asarray(tolerance, dtype=float), (n,)), 1e-12)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    while True:
+        kept = np.flatnonzero(keep)
+        # the segment of the simplified polyline that each point would be removed from
+        seg = np.minimum(np.searchsorted(kept, np.arange(n), side='right') - 1, len(kept) - 2)
+        a = points[kept[seg]]
+        ab = points[kept[seg + 1]] - a
+        ap = points - a
+        len2 = np.einsum('ij,ij->i', ab, ab)
+        s = np.clip(np.einsum('ij,ij->i', ap, ab) / np.where(len2 > 0, len2, 1.0), 0.0, 1.0)
+        excess = np.linalg.norm(ap - s[:, None] * ab, axis=1) / tolerance
+        excess[keep] = 0.0
+        # split each segment at its farthest point, if that one is out of tolerance
+        seg_max = np.maximum.reduceat(excess, kept[:-1])
+        split = seg_max > 1.0
+        if not split.any():
+            return kept
+        candidates = np.flatnonzero(split[seg] & (excess == seg_max[seg]))
+        _, first = np.unique(seg[candidates], return_index=True)
+        keep[candidates[first]] = True
+
 def create_circle(radius=1.0, color=(1,1,1,1), segments=64, axis='z', thickness=3):
     """Create a 3D circle NodePath in the X-Y plane, or around another axis."""
-    vformat = GeomVertexFormat.getV3c4()
-    vdata = GeomVertexData('circle', vformat, Geom.UHStatic)
-    vertex = GeomVertexWriter(vdata, 'vertex')
-    color_writer = GeomVertexWriter(vdata, 'color')
-    for i in range(segments+1):
-        theta = 2 * np.pi * i / segments
-        x = radius * np.cos(theta)
-        y = radius * np.sin(theta)
-        vertex.addData3(x, y, 0)
-        color_writer.addData4f(*color)
-    lines = GeomLines(Geom.UHStatic)
-    for i in range(segments):
-        lines.addVertices(i, i+1)
-    geom = Geom(vdata)
-    geom.addPrimitive(lines)
-    node = GeomNode('circle')
-    node.addGeom(geom)
+    theta = 2 * np.pi * np.arange(segments + 1) / segments
+    vertices = np.column_stack((radius * np.cos(theta), radius * np.sin(theta), np.zeros_like(theta)))
+    lines = np.column_stack((np.arange(segments), np.arange(1, segments + 1)))
+    node = make_geom_node('circle', GeomVertexFormat.getV3c4(),
+                          {'vertex': vertices, 'color': color},
+                          lines, primitive=GeomLines)
     np_circle = NodePath(node)
     np_circle.setRenderModeThickness(thickness)  # Use the new parameter
     np_circle.setRenderModeThickness(3)
@@ -354,4 +486,341 @@ def create_circle(radius=1.0, color=(1,1,1,1), segments=64, axis='z', thickness=
         np_circle.setHpr(90, 0, 0)
     np_circle.setLightOff()
 
-    return np_circle
\ No newline at end of file
+    return np_circle
+
+def parallel_transport_frames(points):
+    """
+    Compute rotation-minimizing (parallel transport) frames along a polyline.
+
+    The frames are computed in one vectorized pass: a reference frame is built
+    at every point, the twist of each reference frame relative to the previous
+    one carried along the curve is measured, and the accumulated twist is
+    removed.
+
+    Args:
+        points (array-like): (N, 3) array of points along the curve.
+    Returns:
+        tuple: (tangents, normals, binormals), each an (N, 3) array of unit vectors.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    tangents = np.empty_like(points)
+    tangents[:-1] = points[1:] - points[:-1]
+    tangents[-1] = tangents[-2] if n > 1 else (0, 0, 1)
+    lengths = np.linalg.norm(tangents, axis=1)
+    # repeated points: reuse the last good tangent
+    good = lengths > 0
+    if not good.any():
+        tangents[:] = (0, 0, 1)
+        lengths[:] = 1.0
+        good[:] = True
+    idx = np.maximum.accumulate(np.where(good, np.arange(n), 0))
+    idx[:np.argmax(good)] = np.argmax(good)
+    tangents = tangents[idx] / lengths[idx, None]
+
+    # reference frame at each point
+    up = np.zeros_like(tangents)
+    use_x = np.abs(tangents[:, 2]) > 0.99
+    up[~use_x, 2] = 1.0
+    up[use_x, 0] = 1.0
+    ref = np.cross(tangents, up)
+    ref /= np.linalg.norm(ref, axis=1, keepdims=True)
+
+    # carry each reference normal to the next point with the minimal rotation
+    # taking one tangent to the next (Rodrigues), then measure the twist
+    t0, t1, r0 = tangents[:-1], tangents[1:], ref[:-1]
+    v = np.cross(t0, t1)
+    c = np.einsum('ij,ij->i', t0, t1)
+    k = 1.0 / np.maximum(1.0 + c, 1e-12)
+    carried = (r0 * c[:, None] + np.cross(v, r0)
+               + v * (k * np.einsum('ij,ij->i', v, r0))[:, None])
+    twist = np.arctan2(np.einsum('ij,ij->i', np.cross(ref[1:], carried), t1),
+                       np.einsum('ij,ij->i', ref[1:], carried))
+    angle = np.concatenate(([0.0], np.cumsum(twist)))
+
+    # rotate the reference frames by the accumulated twist
+    ref_b = np.cross(tangents, ref)
+    cos_a = np.cos(angle)[:, None]
+    sin_a = np.sin(angle)[:, None]
+    normals = ref * cos_a + ref_b * sin_a
+    binormals = np.cross(tangents, normals)
+    return tangents, normals, binormals
+
+def create_tube(points, radius=0.2, num_sides=12, color=(1, 1, 1, 1), name='tube'):
+    """
+    Create a tube mesh along a polyline using parallel transport frames.
+
+    Args:
+        points (array-like): (N, 3) array of points along the tube center line.
+        radius (float, optional): Tube radius. Defaults to 0.2.
+        num_sides (int, optional): Number of sides of the tube cross-section. Defaults to 12.
+        color (tuple, optional): RGBA color. Defaults to (1, 1, 1, 1).
+        name (str, optional): Node name. Defaults to 'tube'.
+    Returns:
+        GeomNode: The tube geometry.
+    """
+    points = np.asarray(points, dtype=float)
+    _, normals, binormals = parallel_transport_frames(points)
+    theta = 2 * np.pi * np.arange(num_sides) / num_sides
+    offsets = (normals[:, None, :] * np.cos(theta)[None, :, None]
+               + binormals[:, None, :] * np.sin(theta)[None, :, None])
+    vertices = (points[:, None, :] + radius * offsets).reshape(-1, 3)
+
+    i, j = np.meshgrid(np.arange(len(points) - 1), np.arange(num_sides), indexing='ij')
+    a = (i * num_sides + j).ravel()
+    b = (i * num_sides + (j + 1) % num_sides).ravel()
+    c = a + num_sides
+    d = b + num_sides
+    tris = np.column_stack((a, b, c, b, d, c)).reshape(-1, 3)
+
+    return make_geom_node(name, GeomVertexFormat.getV3n3c4(),
+                          {'vertex': vertices, 'normal': offsets.reshape(-1, 3), 'color': color},
+                          tris)
+
+def make_geom_node(name, vertex_format, columns, indices, primitive=GeomTriangles):
+    """
+    Build a GeomNode by uploading NumPy arrays directly into the vertex buffer.
+
+    Args:
+        name (str): Name of the GeomNode.
+        vertex_format (GeomVertexFormat): Single-array vertex format.
+        columns (dict): Column name to (N, k) array. A single row (e.g. an RGBA
+            tuple for 'color') is broadcast to all vertices. Colors are given as
+            floats in [0, 1] whatever the column's numeric type.
+        indices (array-like): (M, k) array of vertex indices (k=3 for triangles, 2 for lines).
+        primitive (type, optional): GeomPrimitive class. Defaults to GeomTriangles.
+    Returns:
+        GeomNode: The new node.
+    """
+    num_rows = len(columns['vertex'])
+    data = np.zeros(num_rows, dtype=vertex_dtype(vertex_format))
+    for column_name, values in columns.items():
+        values = np.asarray(values, dtype=float)
+        if data.dtype[column_name].base == np.uint8:
+            values = np.clip(np.round(values * 255), 0, 255)
+        data[column_name] = values
+
+    vdata = GeomVertexData(name, vertex_format, Geom.UHStatic)
+    vdata.uncleanSetNumRows(num_rows)
+    vdata.modifyArrayHandle(0).copyDataFrom(data)
+
+    prim = primitive(Geom.UHStatic)
+    prim.setIndexType(Geom.NT_uint32)
+    indices = np.ascontiguousarray(indices, dtype=np.uint32).ravel()
+    index_array = prim.modifyVertices()
+    index_array.uncleanSetNumRows(len(indices))
+    index_array.modifyHandle().copyDataFrom(indices)
+
+    geom = Geom(vdata)
+    geom.addPrimitive(prim)
+    node = GeomNode(name)
+    node.addGeom(geom)
+    return node
+
+def vertex_dtype(vertex_format) -> np.dtype:
+    """The numpy structured dtype matching the rows of the first array of a GeomVertexFormat."""
+    array_format = vertex_format.getArray(0)
+    names, formats, offsets = [], [], []
+    for i in range(array_format.getNumColumns()):
+        column = array_format.getColumn(i)
+        names.append(column.getName().getName())
+        num_components = column.getNumComponents()
+        numpy_type = _NUMPY_TYPES[column.getNumericType()]
+        formats.append((numpy_type, num_components) if num_components > 1 else numpy_type)
+        offsets.append(column.getStart())
+    return np.dtype({'names': names, 'formats': formats, 'offsets': offsets,
+                     'itemsize': array_format.getStride()})
+
+# numpy types for the GeomVertexColumn numeric types used above
+_NUMPY_TYPES = {Geom.NT_uint8: np.uint8,
+                Geom.NT_uint16: np.uint16,
+                Geom.NT_uint32: np.uint32,
+                Geom.NT_float32: np.float32,
+                Geom.NT_float64: np.float64}
+
+
+class GeometryCache:
+    """
+    Memoizing factory for the sphere, arrow and circle meshes.
+
+    Each distinct shape is built once at unit size (with white vertex colors)
+    and stored as a `Geom`. Every request returns a new `GeomNode` sharing that
+    Geom, sized with `setScale` and colored with `setColor`, so no vertex data is
+    rebuilt for repeated shapes. The least recently used Geoms are evicted once
+    more than `max_size` distinct shapes are cached.
+
+    Note that the instances carry a scale, so anything attached to them as a
+    child is scaled too.
+    """
+
+    def __init__(self, max_size: int = 64):
+        """
+        Args:
+            max_size (int, optional): Maximum number of distinct Geoms to keep. Defaults to 64.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._geoms = OrderedDict()
+
+    def __len__(self):
+        return len(self._geoms)
+
+    def clear(self):
+        """Drop all the cached Geoms (existing instances keep their copy)."""
+        self._geoms.clear()
+
+    def _get_geom(self, key, build):
+        """Return the cached Geom for `key`, building it with `build()` on a miss."""
+        geom = self._geoms.get(key)
+        if geom is None:
+            self.misses += 1
+            geom = build().node().modifyGeom(0)
+            self._geoms[key] = geom
+            while len(self._geoms) > self.max_size:
+                self._geoms.popitem(last=False)
+        else:
+            self.hits += 1
+            self._geoms.move_to_end(key)
+        return geom
+
+    @staticmethod
+    def _instance(name, geom, scale, color):
+        node = GeomNode(name)
+        node.addGeom(geom)
+        instance = NodePath(node)
+        instance.setScale(scale)
+        if color is not None:
+            instance.setColor(*color)
+        return instance
+
+    def sphere(self, radius=1.0, num_lat=16, num_lon=32, color=(1, 1, 1, 1)):
+        """
+        Drop-in replacement for `create_sphere` returning a shared-geometry instance.
+
+        Args:
+            radius (float, optional): Sphere radius (applied as a scale). Defaults to 1.0.
+            num_lat (int, optional): Number of latitude divisions. Defaults to 16.
+            num_lon (int, optional): Number of longitude divisions. Defaults to 32.
+            color (tuple, optional): RGBA color, or None to keep the white vertex colors.
+        Returns:
+            NodePath: The sphere instance.
+        """
+        geom = self._get_geom(('sphere', num_lat, num_lon),
+                              lambda: create_sphere(1.0, num_lat, num_lon))
+        return self._instance('sphere', geom, radius, color)
+
+    def arrow(self, shaft_length=4.0, shaft_radius=0.1, head_length=0.6, head_radius=0.3, color=(1, 1, 1, 1)):
+        """
+        Drop-in replacement for `create_arrow` returning a shared-geometry instance.
+
+        The arrow proportions (relative to its total length) form the cache key,
+        and the total length is applied as a uniform scale.
+
+        Returns:
+            NodePath: The arrow instance, pointing along +Y.
+        """
+        length = shaft_length + head_length
+        if length <= 0:
+            return NodePath('empty_arrow')
+        key = ('arrow',) + tuple(round(x / length, 6) for x in (shaft_length, shaft_radius, head_length, head_radius))
+        geom = self._get_geom(key, lambda: create_arrow(*key[1:]))
+        arrow_np = self._instance('arrow', geom, length, color)
+        arrow_np.setTwoSided(True)
+        return arrow_np
+
+    def arrow_parts(self, segments=24):
+        """
+        Unit-size shaft and head of an arrow, for arrows that are stretched with
+        non-uniform scales (see `EndpointArrow`).
+
+        Returns:
+            tuple: (shaft, head) instances. The shaft is a cylinder of radius 1 from
+            y=0 to y=1, the head a cone with a base of radius 1 at y=0 and its tip at y=1.
+        """
+        def build(mesh):
+            vertices, normals, tris = mesh
+            return NodePath(make_geom_node('arrow_part', GeomVertexFormat.getV3n3c4(),
+                                           {'vertex': vertices, 'normal': normals, 'color': (1, 1, 1, 1)},
+                                           tris))
+        shaft = self._get_geom(('arrow_shaft', segments), lambda: build(_arrow_shaft_mesh(1.0, 1.0, segments)))
+        head = self._get_geom(('arrow_head', segments), lambda: build(_arrow_head_mesh(1.0, 1.0, segments)))
+        return self._instance('arrow_shaft', shaft, 1.0, None), self._instance('arrow_head', head, 1.0, None)
+
+    def circle(self, radius=1.0, color=(1, 1, 1, 1), segments=64, axis='z', thickness=3):
+        """
+        Drop-in replacement for `create_circle` returning a shared-geometry instance.
+
+        Returns:
+            NodePath: The circle instance.
+        """
+        geom = self._get_geom(('circle', segments), lambda: create_circle(1.0, segments=segments))
+        np_circle = self._instance('circle', geom, radius, color)
+        np_circle.setRenderModeThickness(thickness)
+        if axis == 'x':
+            np_circle.setHpr(0, 90, 0)
+        elif axis == 'y':
+            np_circle.setHpr(90, 0, 0)
+        np_circle.setLightOff()
+        return np_circle
+
+
+# shared cache used throughout the package
+GEOMETRY_CACHE = GeometryCache()
+
+
+class EndpointArrow:
+    """
+    An arrow between two points that is moved with transforms only.
+
+    Equivalent to `create_arrow_with_endpoints`, but the shaft and the head are
+    instances of cached unit meshes, so `set_endpoints` only sets a position, a
+    rotation and the scales of the two parts: no vertex data is rebuilt. The head
+    keeps its length as the arrow is stretched.
+    """
+
+    def __init__(self, parent: NodePath, color=(1, 1, 0, 1), thickness=0.05, head_size=0.15, name='arrow'):
+        """
+        Args:
+            parent (NodePath): Node to attach the arrow to (the endpoints are in its coordinate system).
+            color (tuple, optional): RGBA color. Defaults to (1, 1, 0, 1).
+            thickness (float, optional): Radius of the shaft (the head is twice as wide). Defaults to 0.05.
+            head_size (float, optional): Length of the head. Defaults to 0.15.
+            name (str, optional): Name of the arrow node. Defaults to 'arrow'.
+        """
+        self.thickness = thickness
+        self.head_size = head_size
+        self.root = parent.attachNewNode(name)
+        self.root.setColor(*color)
+        self.root.setTwoSided(True)
+        self.shaft, self.head = GEOMETRY_CACHE.arrow_parts()
+        self.shaft.reparentTo(self.root)
+        self.head.reparentTo(self.root)
+        self.root.hide()  # until the endpoints are set
+
+    def set_endpoints(self, start, end):
+        """Point the arrow from `start` to `end`."""
+        start = Vec3(*start)
+        direction = Vec3(*end) - start
+        length = direction.length()
+        if length == 0:
+            self.root.hide()
+            return
+        shaft_length = length - self.head_size
+        head_size = self.head_size
+        if shaft_length < 0:
+            shaft_length = length * 0.7
+            head_size = length * 0.3
+        self.root.setPos(start)
+        self.root.setQuat(quat_from_to(Vec3(0, 1, 0), direction))
+        if shaft_length > 0:
+            self.shaft.setScale(self.thickness, shaft_length, self.thickness)
+            self.shaft.show()
+        else:  # (a zero scale would make the transform singular)
+            self.shaft.hide()
+        self.head.setPos(0, shaft_length, 0)
+        self.head.setScale(2 * self.thickness, head_size, 2 * self.thickness)
+        self.root.show()
+
+    def remove(self):
+        self.root.removeNode()